@@ -0,0 +1,268 @@
+"""
+Этот файл содержит сборку статических файлов (CSS, изображений оформления) и их раздачу.
+
+При сборке каждый файл копируется в каталог STATIC_BUILD_DIR под именем с хешем содержимого
+(например, css/base_page_style.css -> dist/css/base_page_style.1f2e3d4c5b6a.css), а для текстовых файлов
+дополнительно создаются сжатые варианты .gz и .br. Ссылки url(...) в CSS заменяются на собранные копии.
+Соответствие исходных и собранных путей записывается в manifest.json.
+
+Шаблоны формируют адреса статических файлов функцией static_url, которая возвращает адрес собранной копии,
+если она есть. Так как содержимое файла по такому адресу не меняется, он отдается с заголовком
+Cache-Control: immutable, и браузер не перепроверяет его при каждом просмотре страницы.
+
+Сборка выполняется при запуске приложения (настройка STATIC_BUILD_ON_STARTUP) или командой (из корня проекта):
+    python -m assets.assets [--clean]
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import posixpath
+import re
+import stat
+from functools import lru_cache
+from pathlib import Path
+from urllib.parse import quote
+import anyio
+import brotli
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+from settings import settings
+from utils.compression import accepted_encodings
+
+# Настройка логирования
+logger = logging.getLogger('log')
+
+# Количество символов хеша содержимого в имени собранного файла
+HASH_LENGTH = 12
+# Расширения файлов, для которых создаются сжатые варианты (изображения уже сжаты своим форматом)
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.txt', '.html')
+# Сжатые варианты в порядке предпочтения: кодировка (Content-Encoding) и расширение файла
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+# Имя файла соответствия исходных и собранных путей
+MANIFEST_NAME = 'manifest.json'
+# Ссылки на файлы в CSS: url(...), url('...'), url("...")
+CSS_URL = re.compile(r'''url\(\s*(['"]?)([^'")]+)\1\s*\)''')
+
+
+def _relative(path: str) -> str:
+    """
+    Возвращает путь относительно каталога статических файлов с разделителем '/'.
+    """
+    return Path(os.path.relpath(path, settings.STATIC_DIR)).as_posix()
+
+
+def collect_sources() -> list[str]:
+    """
+    Возвращает исходные статические файлы для сборки.
+
+    Собранные файлы и изображения туров не включаются: изображения туров загружаются во время работы
+    приложения и уже сохраняются под именами по хешу содержимого.
+
+    Возвращает:
+        list[str]: Пути относительно каталога статических файлов; файлы CSS в конце списка, чтобы при их
+            сборке уже были известны собранные пути изображений, на которые они ссылаются.
+    """
+    excluded = {os.path.normpath(settings.STATIC_BUILD_DIR), os.path.normpath(settings.TOUR_IMAGE_DIR)}
+    sources = []
+    for directory, subdirectories, filenames in os.walk(settings.STATIC_DIR):
+        subdirectories[:] = sorted(name for name in subdirectories
+                                   if os.path.normpath(os.path.join(directory, name)) not in excluded)
+        sources.extend(_relative(os.path.join(directory, name)) for name in sorted(filenames))
+    return sorted(sources, key=lambda path: path.endswith('.css'))
+
+
+def rewrite_css_urls(css: str, path: str, manifest: dict[str, str]) -> str:
+    """
+    Заменяет ссылки url(...) в CSS на адреса собранных копий файлов.
+
+    Параметры:
+        css (str): Текст CSS.
+        path (str): Путь файла CSS относительно каталога статических файлов.
+        manifest (dict[str, str]): Уже собранные файлы: исходный путь -> собранный путь.
+
+    Возвращает:
+        str: Текст CSS с замененными ссылками. Внешние ссылки, data: URL и ссылки на несобранные файлы
+            не изменяются.
+    """
+    def replace(match: re.Match) -> str:
+        url = match.group(2).strip()
+        if url.startswith('/static/'):
+            source = url[len('/static/'):]
+        elif url.startswith(('/', '#', 'data:')) or '://' in url:
+            return match.group(0)
+        else:
+            source = posixpath.normpath(posixpath.join(posixpath.dirname(path), url))
+        target = manifest.get(source.split('?')[0].split('#')[0])
+        if target is None:
+            return match.group(0)
+        return f"url('/static/{quote(target)}')"
+
+    return CSS_URL.sub(replace, css)
+
+
+def _write_file(path: str, content: bytes):
+    """
+    Атомарно записывает файл, если его еще нет (имена собранных файлов определяются содержимым).
+    """
+    if os.path.exists(path):
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'wb') as file:
+        file.write(content)
+    os.replace(temp_path, path)
+
+
+def build_assets(clean: bool = False) -> dict[str, str]:
+    """
+    Собирает статические файлы: копии с хешем содержимого в имени, сжатые варианты и manifest.json.
+
+    Уже собранные файлы не перезаписываются, поэтому повторная сборка без изменений только вычисляет хеши.
+    Копии от предыдущих сборок сохраняются (на них могут ссылаться страницы в кеше браузеров), пока сборка
+    не запущена с параметром clean.
+
+    Параметры:
+        clean (bool): Удалить собранные файлы, не относящиеся к текущей сборке.
+
+    Возвращает:
+        dict[str, str]: Соответствие исходных и собранных путей относительно каталога статических файлов.
+    """
+    build_prefix = _relative(settings.STATIC_BUILD_DIR)
+    manifest = {}
+    built = {MANIFEST_NAME}
+    for source in collect_sources():
+        with open(os.path.join(settings.STATIC_DIR, source), 'rb') as file:
+            content = file.read()
+        if source.endswith('.css'):
+            content = rewrite_css_urls(content.decode('utf-8'), source, manifest).encode('utf-8')
+        stem, extension = posixpath.splitext(source)
+        target = f'{build_prefix}/{stem}.{hashlib.sha256(content).hexdigest()[:HASH_LENGTH]}{extension}'
+        manifest[source] = target
+        target_path = os.path.join(settings.STATIC_DIR, target)
+        _write_file(target_path, content)
+        built.add(target)
+        if extension not in COMPRESSIBLE_EXTENSIONS:
+            continue
+        for suffix, compressed in (('.gz', gzip.compress(content, compresslevel=9, mtime=0)),
+                                   ('.br', brotli.compress(content, quality=11))):
+            # Сжатый вариант сохраняется, только если он меньше исходного файла
+            if len(compressed) < len(content):
+                _write_file(target_path + suffix, compressed)
+                built.add(target + suffix)
+
+    manifest_path = os.path.join(settings.STATIC_BUILD_DIR, MANIFEST_NAME)
+    temp_path = f'{manifest_path}.{os.getpid()}.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        json.dump(manifest, file, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(temp_path, manifest_path)
+
+    if clean:
+        for directory, _, filenames in os.walk(settings.STATIC_BUILD_DIR):
+            for name in filenames:
+                path = os.path.join(directory, name)
+                if os.path.relpath(path, settings.STATIC_BUILD_DIR) != MANIFEST_NAME and _relative(path) not in built:
+                    os.remove(path)
+    load_manifest.cache_clear()
+    logger.info("Собрано статических файлов: %s", len(manifest))
+    return manifest
+
+
+@lru_cache(maxsize=None)
+def load_manifest() -> dict[str, str]:
+    """
+    Загружает соответствие исходных и собранных путей статических файлов.
+
+    Возвращает:
+        dict[str, str]: Соответствие путей; пустой словарь, если сборка еще не выполнялась.
+    """
+    try:
+        with open(os.path.join(settings.STATIC_BUILD_DIR, MANIFEST_NAME), encoding='utf-8') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        logger.warning("Статические файлы не собраны, используются исходные файлы")
+        return {}
+
+
+def static_url(path: str) -> str:
+    """
+    Возвращает адрес статического файла для шаблонов Jinja2 (замена url_for('static', path=...)).
+
+    Параметры:
+        path (str): Путь файла относительно каталога статических файлов.
+
+    Возвращает:
+        str: Адрес собранной копии файла или, если файл не собирался (например, изображение тура),
+            адрес исходного файла.
+    """
+    return '/static/' + quote(load_manifest().get(path, path))
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    Раздача статических файлов, отдающая для собранных файлов заранее сжатые варианты.
+
+    Собранные файлы (каталог STATIC_BUILD_DIR) отдаются с заголовками Cache-Control: immutable и
+    Vary: Accept-Encoding, а при поддержке клиентом - в виде файла .br или .gz с заголовком Content-Encoding.
+    Остальные файлы отдаются как в StaticFiles, с проверкой актуальности по ETag и Last-Modified.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.build_prefix = _relative(settings.STATIC_BUILD_DIR) + '/'
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        path = Path(path).as_posix()
+        if not path.startswith(self.build_prefix):
+            return await super().get_response(path, scope)
+        response = await self.precompressed_response(path, scope)
+        if response is None:
+            response = await super().get_response(path, scope)
+        response.headers['Cache-Control'] = f'public, max-age={settings.STATIC_MAX_AGE}, immutable'
+        response.headers['Vary'] = 'Accept-Encoding'
+        return response
+
+    async def precompressed_response(self, path: str, scope: Scope) -> Response | None:
+        """
+        Возвращает сжатый вариант собранного файла, если клиент его принимает и вариант существует.
+
+        Параметры:
+            path (str): Путь запрошенного файла относительно каталога статических файлов.
+            scope (Scope): ASGI scope запроса.
+
+        Возвращает:
+            Response | None: Ответ со сжатым файлом (или 304 Not Modified) либо None.
+        """
+        if scope['method'] not in ('GET', 'HEAD'):
+            return None
+        request_headers = Headers(scope=scope)
+        accepted = accepted_encodings(request_headers.get('accept-encoding', ''))
+        for encoding, suffix in ENCODINGS:
+            if encoding not in accepted:
+                continue
+            full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path + suffix)
+            if stat_result is None or not stat.S_ISREG(stat_result.st_mode):
+                continue
+            response = FileResponse(full_path, stat_result=stat_result, media_type=mimetypes.guess_type(path)[0],
+                                    headers={'Content-Encoding': encoding})
+            if self.is_not_modified(response.headers, request_headers):
+                return NotModifiedResponse(response.headers)
+            return response
+        return None
+
+
+if __name__ == '__main__':
+    from log_settings.log_settings import setup_logging
+
+    setup_logging()
+    parser = argparse.ArgumentParser(description='Сборка статических файлов с хешем содержимого в имени')
+    parser.add_argument('--clean', action='store_true', help='Удалить файлы предыдущих сборок')
+    args = parser.parse_args()
+    result = build_assets(clean=args.clean)
+    print(f'Собрано статических файлов: {len(result)}')
@@ -0,0 +1,180 @@
+"""
+Этот файл содержит нагрузочный тест бронирования: множество клиентов одновременно бронируют места в одном туре.
+
+Тест запускает приложение через uvicorn (несколько воркеров) на временной базе данных, создает тур с заданным
+количеством мест и отправляет конкурентные запросы бронирования. Часть клиентов повторяет свой запрос с тем же
+ключом идемпотентности, имитируя повтор после обрыва соединения. После нагрузки проверяется, что тур не
+перебронирован и повторы не создали лишних бронирований. Результат выводится в формате JSON.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_booking --seats 100 --clients 500 --concurrency 100 --workers 4
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+import httpx
+from database.migrations import run_migrations
+
+# Корневая директория проекта (рабочая директория для uvicorn)
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def seed_tour(database_path: str, seats: int) -> int:
+    """
+    Создает тур с заданным количеством свободных мест.
+
+    Параметры:
+        database_path (str): Путь к файлу базы данных.
+        seats (int): Количество свободных мест.
+
+    Возвращает:
+        int: ID созданного тура.
+    """
+    run_migrations(database_path)
+    with sqlite3.connect(database_path) as connection:
+        cursor = connection.execute(
+            "INSERT INTO tours (title, description, place, start_date_tour, duration, max_people, available_places, "
+            "occupied_places, price_per_person, image, version, updated_at) "
+            "VALUES ('Тест', 'Нагрузочный тест', 'Тест', '2030-01-01', 5, ?, ?, 0, 1000, 'test.jpg', 1, "
+            "datetime('now'))",
+            (seats, seats),
+        )
+        return cursor.lastrowid
+
+
+async def wait_until_ready(client: httpx.AsyncClient, timeout: float = 30.0):
+    """
+    Ожидает запуска сервера.
+    """
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            await client.get('/')
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError('Сервер не запустился')
+
+
+async def book(client: httpx.AsyncClient, semaphore: asyncio.Semaphore, tour_id: int, key: str, stats: dict):
+    """
+    Отправляет один запрос бронирования и учитывает результат.
+    """
+    async with semaphore:
+        started = time.perf_counter()
+        try:
+            response = await client.post(
+                f'/booking/tours/{tour_id}',
+                json={'seats': 1, 'customer_name': 'Нагрузка', 'customer_phone': '+70000000000'},
+                headers={'Idempotency-Key': key},
+            )
+        except httpx.HTTPError:
+            stats['transport_errors'] += 1
+            return
+        stats['latencies'].append(time.perf_counter() - started)
+    if response.status_code == 201 and response.headers.get('idempotent-replayed'):
+        stats['replayed'] += 1
+    elif response.status_code == 201:
+        stats['booked'] += 1
+    elif response.status_code == 409:
+        stats['sold_out'] += 1
+    else:
+        stats['other'][response.status_code] = stats['other'].get(response.status_code, 0) + 1
+
+
+async def run_load(args, tour_id: int) -> dict:
+    """
+    Выполняет конкурентные запросы бронирования.
+    """
+    stats = {'booked': 0, 'replayed': 0, 'sold_out': 0, 'transport_errors': 0, 'other': {}, 'latencies': []}
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=f'http://127.0.0.1:{args.port}', limits=limits, timeout=60) as client:
+        await wait_until_ready(client)
+        semaphore = asyncio.Semaphore(args.concurrency)
+        tasks = []
+        for _ in range(args.clients):
+            key = uuid.uuid4().hex
+            tasks.append(book(client, semaphore, tour_id, key, stats))
+            if random.random() < args.retry_ratio:
+                tasks.append(book(client, semaphore, tour_id, key, stats))
+        random.shuffle(tasks)
+        started = time.perf_counter()
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+    latencies = sorted(stats.pop('latencies'))
+    stats['requests'] = len(tasks)
+    stats['rps'] = round(len(tasks) / elapsed, 1)
+    if latencies:
+        stats['latency_ms'] = {
+            'p50': round(statistics.median(latencies) * 1000, 2),
+            'p95': round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 2),
+            'max': round(latencies[-1] * 1000, 2),
+        }
+    return stats
+
+
+def verify(database_path: str, tour_id: int, seats: int, stats: dict) -> dict:
+    """
+    Проверяет согласованность данных после нагрузки.
+    """
+    with sqlite3.connect(database_path) as connection:
+        available, occupied = connection.execute(
+            "SELECT available_places, occupied_places FROM tours WHERE id = ?", (tour_id,)
+        ).fetchone()
+        booked_seats = connection.execute(
+            "SELECT coalesce(sum(seats), 0) FROM bookings WHERE tour_id = ?", (tour_id,)
+        ).fetchone()[0]
+    return {
+        'available_places': available,
+        'occupied_places': occupied,
+        'booked_seats': booked_seats,
+        'not_oversold': available >= 0 and occupied <= seats,
+        'consistent': occupied == booked_seats == stats['booked'] and available + occupied == seats,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Нагрузочный тест бронирования мест в одном туре')
+    parser.add_argument('--seats', type=int, default=100)
+    parser.add_argument('--clients', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--retry-ratio', type=float, default=0.2)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_path = os.path.join(tmp, 'bench.db')
+        tour_id = seed_tour(database_path, args.seats)
+        # Нагрузка создается с одного адреса, поэтому ограничение частоты запросов клиента отключено
+        # (включается переменной окружения ADMISSION_ENABLED=1)
+        env = dict(os.environ, DATABASE_PATH=database_path,
+                   ADMISSION_ENABLED=os.environ.get('ADMISSION_ENABLED', '0'))
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', 'main:app', '--port', str(args.port), '--workers', str(args.workers),
+             '--log-level', 'warning'],
+            cwd=BASE_DIR, env=env,
+        )
+        try:
+            stats = asyncio.run(run_load(args, tour_id))
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+        report = {'params': vars(args), 'results': stats, 'checks': verify(database_path, tour_id, args.seats, stats)}
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if not (report['checks']['not_oversold'] and report['checks']['consistent']):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
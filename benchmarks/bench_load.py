@@ -0,0 +1,365 @@
+"""
+Этот файл содержит воспроизводимый нагрузочный тест публичных и административных маршрутов.
+
+Для каждого размера каталога (например, 1000, 10000 и 100000 туров) тест создает временную базу данных
+с синтетическими турами, запускает приложение через uvicorn и по очереди нагружает маршруты заданным
+количеством одновременных клиентов:
+    - list: /views/tours/ (случайная страница и фильтры);
+    - tour: /views/tours/current_tour/{id};
+    - admin_list: /admin/get_tours_admin;
+    - upload, update, delete: добавление, изменение и удаление туров через админ-панель.
+
+Для каждого сценария выводятся RPS и задержки p50/p95/p99 в формате JSON. Результат можно сохранить
+(--output) и сравнить с результатом другого коммита (--baseline): сценарии, у которых p95 или RPS ухудшились
+больше допустимого порога, перечисляются в отчете, а тест завершается с кодом 1.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_load --sizes 1000,10000 --concurrency 32 --duration 10 --output bench.json
+    python -m benchmarks.bench_load --sizes 1000,10000 --baseline bench.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from typing import Optional
+import httpx
+from benchmarks.bench_booking import wait_until_ready
+from database.migrations import run_migrations
+from settings import settings
+
+# Корневая директория проекта (рабочая директория для uvicorn)
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Сценарии нагрузки в порядке выполнения (удаление последним, чтобы не влиять на остальные сценарии)
+SCENARIOS = ('list', 'tour', 'admin_list', 'upload', 'update', 'delete')
+# Сценарии записи. Загрузка и обновление включают создание уменьшенных копий изображения и нагружают процессор
+# значительно сильнее чтения, поэтому для них задается отдельное (меньшее) количество клиентов.
+WRITE_SCENARIOS = ('upload', 'update', 'delete')
+
+# Места проведения синтетических туров (для фильтров по месту)
+PLACES = ('Карелия', 'Камчатка', 'Алтай', 'Байкал', 'Грузия', 'Дагестан', 'Кавказ', 'Урал', 'Крым', 'Сахалин')
+
+
+def seed_catalog(database_path: str, image_dir: str, tours: int) -> list[str]:
+    """
+    Создает базу данных с синтетическим каталогом туров.
+
+    Изображения туров копируются из каталога изображений проекта во временный каталог, чтобы загрузки
+    и удаления во время теста не затрагивали файлы проекта.
+
+    Параметры:
+        database_path (str): Путь к файлу базы данных.
+        image_dir (str): Временный каталог изображений туров.
+        tours (int): Количество туров.
+
+    Возвращает:
+        list[str]: Пути к изображениям, используемым для загрузки.
+    """
+    os.makedirs(image_dir, exist_ok=True)
+    images = sorted(entry.name for entry in os.scandir(settings.TOUR_IMAGE_DIR) if entry.is_file())
+    for name in images:
+        shutil.copy(os.path.join(settings.TOUR_IMAGE_DIR, name), image_dir)
+
+    run_migrations(database_path)
+    rng = random.Random(tours)
+    start = date(2030, 1, 1)
+    rows = []
+    for number in range(tours):
+        places = rng.randint(0, 30)
+        rows.append((
+            f'Тур {number}', f'Синтетический тур номер {number} для нагрузочного теста. ' * 5,
+            PLACES[number % len(PLACES)], (start + timedelta(days=rng.randint(0, 365))).isoformat(),
+            rng.randint(1, 14), 30, places, 30 - places, rng.randint(5, 200) * 1000, images[number % len(images)],
+        ))
+    with sqlite3.connect(database_path) as connection:
+        connection.executemany(
+            "INSERT INTO tours (title, description, place, start_date_tour, duration, max_people, "
+            "available_places, occupied_places, price_per_person, image, version, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1, datetime('now'))",
+            rows,
+        )
+    return [os.path.join(BASE_DIR, 'example_image', name) for name in sorted(os.listdir(
+        os.path.join(BASE_DIR, 'example_image')))]
+
+
+def tour_params(rng: random.Random, prefix: str = '') -> dict:
+    """
+    Формирует случайные параметры тура для загрузки или обновления.
+    """
+    return {
+        f'{prefix}title': f'Нагрузка {rng.randint(0, 10 ** 6)}',
+        f'{prefix}description': 'Тур, созданный нагрузочным тестом.',
+        f'{prefix}place': rng.choice(PLACES),
+        f'{prefix}start_date_tour': '2031-06-01',
+        f'{prefix}duration': 5,
+        f'{prefix}max_people': 20,
+        f'{prefix}available_places': 20,
+        f'{prefix}price_per_person': 10000,
+    }
+
+
+def unique_image(images: list[bytes], rng: random.Random) -> bytes:
+    """
+    Возвращает изображение с уникальным содержимым.
+
+    Байты после конца JPEG игнорируются декодерами, но меняют хеш файла, поэтому каждая загрузка
+    сохраняется и обрабатывается как новое изображение.
+    """
+    return rng.choice(images) + rng.randbytes(16)
+
+
+class Scenario:
+    """
+    Сценарий нагрузки: формирует очередной запрос к приложению.
+
+    Атрибуты:
+        name (str): Имя сценария.
+        tours (int): Количество туров в каталоге.
+        images (list[bytes]): Изображения для загрузки.
+    """
+
+    def __init__(self, name: str, tours: int, images: list[bytes]):
+        self.name = name
+        self.tours = tours
+        self.images = images
+        # ID туров для удаления: с конца каталога, каждый удаляется один раз
+        self._delete_ids = list(range(1, tours + 1))
+
+    def request(self, rng: random.Random) -> Optional[dict]:
+        """
+        Возвращает параметры очередного запроса для httpx.AsyncClient.request или None, если запросы исчерпаны.
+        """
+        if self.name == 'list':
+            params = {'after_id': rng.randint(0, self.tours)}
+            if rng.random() < 0.3:
+                params['place'] = rng.choice(PLACES)
+            if rng.random() < 0.3:
+                params['has_places'] = 'true'
+            return {'method': 'GET', 'url': '/views/tours/', 'params': params}
+        if self.name == 'tour':
+            return {'method': 'GET', 'url': f'/views/tours/current_tour/{rng.randint(1, self.tours)}'}
+        if self.name == 'admin_list':
+            return {'method': 'GET', 'url': '/admin/get_tours_admin',
+                    'params': {'after_id': rng.randint(0, self.tours), 'limit': 50}}
+        if self.name == 'upload':
+            return {'method': 'POST', 'url': '/admin/upload_tour_admin', 'params': tour_params(rng),
+                    'files': {'image': ('bench.jpg', unique_image(self.images, rng), 'image/jpeg')}}
+        if self.name == 'update':
+            params = tour_params(rng, 'new_')
+            params['tour_id'] = rng.randint(1, self.tours // 2)
+            return {'method': 'PUT', 'url': '/admin/update_tour_admin', 'params': params,
+                    'files': {'new_image': ('bench.jpg', unique_image(self.images, rng), 'image/jpeg')}}
+        if self.name == 'delete':
+            if not self._delete_ids:
+                return None
+            return {'method': 'DELETE', 'url': '/admin/delete_tour_admin',
+                    'params': {'tour_id': self._delete_ids.pop()}}
+        raise ValueError(f'Неизвестный сценарий: {self.name}')
+
+
+def percentile(values: list[float], percent: float) -> float:
+    """
+    Возвращает перцентиль (метод ближайшего ранга) отсортированного списка.
+    """
+    index = max(0, min(len(values) - 1, math.ceil(percent / 100 * len(values)) - 1))
+    return values[index]
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: Scenario, concurrency: int, duration: float,
+                       seed: int) -> dict:
+    """
+    Нагружает приложение запросами сценария в течение duration секунд.
+
+    Каждый из concurrency клиентов отправляет следующий запрос сразу после получения ответа на предыдущий.
+
+    Параметры:
+        client (httpx.AsyncClient): HTTP-клиент.
+        scenario (Scenario): Сценарий нагрузки.
+        concurrency (int): Количество одновременных клиентов.
+        duration (float): Длительность нагрузки в секундах.
+        seed (int): Начальное значение генератора случайных чисел.
+
+    Возвращает:
+        dict: Количество запросов, RPS, коды ответов и задержки.
+    """
+    latencies = []
+    statuses: dict[str, int] = {}
+    deadline = time.perf_counter() + duration
+
+    async def worker(number: int):
+        rng = random.Random(seed * 1000 + number)
+        while time.perf_counter() < deadline:
+            request = scenario.request(rng)
+            if request is None:
+                return
+            started = time.perf_counter()
+            try:
+                response = await client.request(**request)
+                status = str(response.status_code)
+            except httpx.HTTPError as exc:
+                status = type(exc).__name__
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(number) for number in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    errors = sum(count for status, count in statuses.items() if not status.startswith(('2', '3')))
+    result = {'requests': len(latencies), 'rps': round(len(latencies) / elapsed, 1), 'errors': errors,
+              'status': statuses}
+    if latencies:
+        result['latency_ms'] = {
+            name: round(percentile(latencies, percent) * 1000, 2)
+            for name, percent in (('p50', 50), ('p95', 95), ('p99', 99), ('max', 100))
+        }
+    return result
+
+
+async def run_size(args, port: int, tours: int, images: list[bytes]) -> dict:
+    """
+    Выполняет все выбранные сценарии для одного размера каталога.
+    """
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=f'http://127.0.0.1:{port}', limits=limits, timeout=60) as client:
+        await wait_until_ready(client)
+        results = {}
+        for number, name in enumerate(args.scenarios):
+            scenario = Scenario(name, tours, images)
+            concurrency = args.write_concurrency if name in WRITE_SCENARIOS else args.concurrency
+            if args.warmup:
+                await run_scenario(client, scenario, concurrency, args.warmup, seed=-1 - number)
+            results[name] = await run_scenario(client, scenario, concurrency, args.duration, seed=number)
+            print(f"{tours} туров, {name}: {results[name]['rps']} rps, "
+                  f"p95 {results[name].get('latency_ms', {}).get('p95')} мс", file=sys.stderr)
+        return results
+
+
+def benchmark_size(args, tours: int) -> dict:
+    """
+    Создает каталог заданного размера, запускает приложение и выполняет сценарии.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        database_path = os.path.join(tmp, 'bench.db')
+        image_dir = os.path.join(tmp, 'img_tour')
+        started = time.perf_counter()
+        upload_images = seed_catalog(database_path, image_dir, tours)
+        print(f"Создан каталог из {tours} туров за {time.perf_counter() - started:.1f} с", file=sys.stderr)
+        images = []
+        for path in upload_images:
+            with open(path, 'rb') as file:
+                images.append(file.read())
+
+        # Нагрузка создается с одного адреса, поэтому ограничение частоты запросов клиента отключено
+        # (включается переменной окружения ADMISSION_ENABLED=1)
+        env = dict(os.environ, DATABASE_PATH=database_path, TOUR_IMAGE_DIR=image_dir,
+                   CACHE_BACKEND=args.cache_backend, CACHE_SQLITE_PATH=os.path.join(tmp, 'cache.db'),
+                   LOG_FILE=os.path.join(tmp, 'bench.log'), APP_ENV='production', DB_MIGRATE_ON_STARTUP='0',
+                   ADMISSION_ENABLED=os.environ.get('ADMISSION_ENABLED', '0'))
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', 'main:app', '--port', str(args.port), '--workers', str(args.workers),
+             '--log-level', 'warning'],
+            cwd=BASE_DIR, env=env,
+        )
+        try:
+            return asyncio.run(run_size(args, args.port, tours, images))
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+def git_commit() -> Optional[str]:
+    """
+    Возвращает хеш текущего коммита (для сравнения результатов разных версий).
+    """
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR, text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> list[dict]:
+    """
+    Сравнивает результаты с базовыми и возвращает сценарии, производительность которых ухудшилась.
+
+    Параметры:
+        report (dict): Текущий результат.
+        baseline (dict): Базовый результат (например, предыдущего коммита).
+        threshold (float): Допустимое ухудшение p95 и RPS в долях (0.2 = 20%).
+
+    Возвращает:
+        list[dict]: Сценарии с ухудшением.
+    """
+    regressions = []
+    for size, scenarios in report['results'].items():
+        for name, result in scenarios.items():
+            base = baseline.get('results', {}).get(size, {}).get(name)
+            if not base or 'latency_ms' not in base or 'latency_ms' not in result:
+                continue
+            p95_ratio = result['latency_ms']['p95'] / max(base['latency_ms']['p95'], 0.001)
+            rps_ratio = result['rps'] / max(base['rps'], 0.001)
+            if p95_ratio > 1 + threshold or rps_ratio < 1 - threshold:
+                regressions.append({'size': size, 'scenario': name, 'p95_ratio': round(p95_ratio, 2),
+                                    'rps_ratio': round(rps_ratio, 2)})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Нагрузочный тест публичных и административных маршрутов')
+    parser.add_argument('--sizes', default='1000,10000,100000', help='Размеры каталога через запятую')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='Сценарии через запятую')
+    parser.add_argument('--concurrency', type=int, default=32, help='Количество клиентов для сценариев чтения')
+    parser.add_argument('--write-concurrency', type=int, default=4, help='Количество клиентов для сценариев записи')
+    parser.add_argument('--duration', type=float, default=10.0, help='Длительность сценария в секундах')
+    parser.add_argument('--warmup', type=float, default=2.0, help='Прогрев перед сценарием в секундах')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--cache-backend', default='memory', choices=('memory', 'sqlite'))
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--output', help='Файл для сохранения результата в формате JSON')
+    parser.add_argument('--baseline', help='Файл результата для сравнения')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Допустимое ухудшение p95 и RPS (доля)')
+    args = parser.parse_args()
+    args.scenarios = [name for name in args.scenarios.split(',') if name]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f'Неизвестные сценарии: {", ".join(sorted(unknown))}')
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'params': {key: value for key, value in vars(args).items() if key not in ('output', 'baseline')},
+        },
+        'results': {str(size): benchmark_size(args, size) for size in sizes},
+    }
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as file:
+            baseline = json.load(file)
+        report['comparison'] = {'baseline_commit': baseline.get('meta', {}).get('commit'),
+                                'regressions': compare(report, baseline, args.threshold)}
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(text)
+    print(text)
+    if report.get('comparison', {}).get('regressions'):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
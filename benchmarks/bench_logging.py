@@ -0,0 +1,116 @@
+"""
+Этот файл содержит микротест накладных расходов логирования на один запрос.
+
+Один "запрос" повторяет сообщения, которые пишет обработчик обновления тура: несколько сообщений DEBUG
+(включая текст SQL-запроса) и INFO. Сравниваются конфигурации:
+    - before: FileHandler с уровнем DEBUG и f-строками (форматирование и запись на диск в потоке запроса);
+    - after: очередь и поток записи (setup_logging), уровень INFO и отложенное форматирование %-аргументов;
+    - after-debug: то же, но с уровнем DEBUG (все сообщения форматируются и передаются в очередь).
+
+Измеряется время в потоке, вызывающем логгер (именно оно блокирует цикл событий). Результат выводится
+в формате JSON.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_logging --requests 20000
+"""
+
+import argparse
+import json
+import logging
+import os
+import tempfile
+import time
+from sqlalchemy import select
+from database.db import TourTable
+from log_settings import log_settings
+from settings import settings
+
+
+def request_eager(logger: logging.Logger, tour_id: int, query):
+    """
+    Сообщения одного запроса в исходном виде (f-строки вычисляются всегда).
+    """
+    logger.debug(f"Запрос на обновление тура с ID: {tour_id}")
+    logger.debug(f"Выполнение запроса: {query}")
+    logger.info(f"Обновление тура с ID: {tour_id}")
+    logger.debug(f"Изображение {tour_id}.jpg уже сохранено, используется существующий файл")
+    logger.info(f"Тур с ID: {tour_id} успешно обновлён")
+
+
+def request_lazy(logger: logging.Logger, tour_id: int, query):
+    """
+    Сообщения одного запроса с отложенным форматированием (аргументы подставляются только для записанных сообщений).
+    """
+    logger.debug("Запрос на обновление тура с ID: %s", tour_id)
+    logger.debug("Выполнение запроса: %s", query)
+    logger.info("Обновление тура с ID: %s", tour_id)
+    logger.debug("Изображение %s.jpg уже сохранено, используется существующий файл", tour_id)
+    logger.info("Тур с ID: %s успешно обновлён", tour_id)
+
+
+def configure_before(log_file: str) -> logging.Logger:
+    """
+    Исходная конфигурация: синхронная запись в файл, уровень DEBUG.
+    """
+    logger = logging.getLogger('bench.before')
+    handler = logging.FileHandler(log_file, encoding='utf-8')
+    handler.setFormatter(logging.Formatter('[{asctime}] - [{levelname}] - {module} - /{filename} : {message}',
+                                           style='{'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    return logger
+
+
+def configure_after(log_file: str, level: str) -> logging.Logger:
+    """
+    Новая конфигурация приложения (setup_logging) с заданным уровнем.
+    """
+    log_settings.LOGGING['handlers']['file']['filename'] = log_file
+    log_settings.LOGGING['handlers']['file']['formatter'] = 'json_format'
+    log_settings.LOGGING['loggers']['log']['level'] = level
+    log_settings.setup_logging()
+    logger = logging.getLogger('log')
+    logger.propagate = False
+    return logger
+
+
+def measure(name: str, logger: logging.Logger, request, requests: int, log_file: str) -> dict:
+    """
+    Выполняет заданное количество "запросов" и возвращает время на запрос в потоке вызова.
+
+    Запросы SQLAlchemy строятся заранее, чтобы измерялось только логирование.
+    """
+    queries = [select(TourTable).where(TourTable.id == tour_id) for tour_id in range(requests)]
+    started = time.perf_counter()
+    for tour_id, query in enumerate(queries):
+        request(logger, tour_id, query)
+    elapsed = time.perf_counter() - started
+    log_settings._stop_listener()
+    for handler in logger.handlers:
+        handler.flush()
+    # Размер логов с учетом файлов, созданных при ротации
+    directory, prefix = os.path.split(log_file)
+    log_bytes = sum(entry.stat().st_size for entry in os.scandir(directory) if entry.name.startswith(prefix))
+    return {'config': name, 'us_per_request': round(elapsed / requests * 1e6, 2), 'log_bytes': log_bytes}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Микротест накладных расходов логирования на запрос')
+    parser.add_argument('--requests', type=int, default=20000)
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        log_file = os.path.join(tmp, 'before.log')
+        results.append(measure('before', configure_before(log_file), request_eager, args.requests, log_file))
+        log_file = os.path.join(tmp, 'after.log')
+        results.append(measure('after', configure_after(log_file, 'INFO'), request_lazy, args.requests, log_file))
+        log_file = os.path.join(tmp, 'after-debug.log')
+        results.append(measure('after-debug', configure_after(log_file, 'DEBUG'), request_lazy, args.requests,
+                               log_file))
+    print(json.dumps({'requests': args.requests, 'app_env': settings.APP_ENV, 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
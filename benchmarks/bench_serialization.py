@@ -0,0 +1,109 @@
+"""
+Этот файл содержит микротест сериализации списка туров в ответах административного API.
+
+Туры берутся в том виде, в котором их хранит кеш (словари значений столбцов). Сравниваются:
+    - before: jsonable_encoder и JSONResponse (стандартный json) - так FastAPI сериализует ответ без
+      response_model;
+    - after: проверка по response_model list[TourOut] (pydantic-core) и ORJSONResponse - так сериализуется
+      ответ /admin/get_tours_admin.
+
+Для сериализованного ответа также измеряются размер и время сжатия gzip и brotli с настройками приложения.
+Время приводится на 1000 туров, результат выводится в формате JSON.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_serialization --tours 1000 --repeat 50
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from datetime import date, datetime, timedelta
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from schemas.schem import TourOut
+from settings import settings
+from utils.compression import StreamCompressor
+
+
+def make_tours(count: int) -> list[dict]:
+    """
+    Создает синтетические туры в виде словарей столбцов (как в кеше туров).
+    """
+    start = date(2030, 1, 1)
+    updated = datetime(2030, 1, 1, 12, 0, 0)
+    return [{
+        'id': number, 'title': f'Тур {number}',
+        'description': f'Синтетический тур номер {number} для теста сериализации. ' * 5,
+        'place': 'Карелия', 'start_date_tour': start + timedelta(days=number % 365), 'duration': 1 + number % 14,
+        'max_people': 30, 'available_places': number % 31, 'occupied_places': 30 - number % 31,
+        'price_per_person': 1000 * (5 + number % 200), 'image': f'{number:016x}.jpg', 'version': 1,
+        'updated_at': updated + timedelta(seconds=number),
+    } for number in range(count)]
+
+
+def serialize_before(tours: list[dict]) -> bytes:
+    """
+    Сериализация ответа без response_model.
+    """
+    return JSONResponse(jsonable_encoder(tours)).body
+
+
+# Поле ответа, которое FastAPI создает для response_model=list[TourOut]
+RESPONSE_FIELD = create_model_field('Response_get_tours', list[TourOut], mode='serialization')
+# Цикл событий для вызова асинхронной функции сериализации FastAPI
+LOOP = asyncio.new_event_loop()
+
+
+def serialize_after(tours: list[dict]) -> bytes:
+    """
+    Сериализация ответа с response_model=list[TourOut] и ORJSONResponse.
+    """
+    content = LOOP.run_until_complete(serialize_response(field=RESPONSE_FIELD, response_content=tours))
+    return ORJSONResponse(content).body
+
+
+def measure(function, tours: list[dict], repeat: int) -> tuple[float, bytes]:
+    """
+    Возвращает лучшее время одного вызова в микросекундах на 1000 туров и результат вызова.
+    """
+    best = float('inf')
+    result = b''
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function(tours)
+        best = min(best, time.perf_counter() - started)
+    return round(best * 1e6 * 1000 / len(tours), 1), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Микротест сериализации списка туров')
+    parser.add_argument('--tours', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    tours = make_tours(args.tours)
+    results = []
+    for name, function in (('before', serialize_before), ('after', serialize_after)):
+        us_per_1k, body = measure(function, tours, args.repeat)
+        results.append({'config': name, 'us_per_1k_tours': us_per_1k, 'bytes': len(body)})
+
+    assert json.loads(serialize_before(tours)) == json.loads(serialize_after(tours))
+    compression = []
+    for encoding in ('gzip', 'br'):
+        us_per_1k, compressed = measure(lambda _: StreamCompressor(encoding).compress(body, final=True), tours,
+                                        args.repeat)
+        compression.append({'encoding': encoding, 'us_per_1k_tours': us_per_1k, 'bytes': len(compressed)})
+    print(json.dumps({
+        'tours': args.tours,
+        'gzip_level': settings.COMPRESSION_GZIP_LEVEL,
+        'brotli_quality': settings.COMPRESSION_BROTLI_QUALITY,
+        'results': results,
+        'compression': compression,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""
+Этот файл содержит нагрузочный тест конкурентного доступа к SQLite.
+
+Сравниваются две конфигурации движка:
+    - baseline: настройки SQLite и пула по умолчанию (журнал DELETE);
+    - tuned: журнал WAL, PRAGMA и размер пула из settings (как в database/db.py).
+
+Для каждой конфигурации сначала измеряется пропускная способность чтения без записи, затем та же нагрузка
+выполняется вместе с постоянно работающими писателями. Результат выводится в формате JSON.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_sqlite_concurrency --rows 5000 --readers 8 --writers 2 --duration 5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from database.db import POOL_OPTIONS, apply_sqlite_pragmas
+
+
+async def seed(engine, rows: int):
+    """
+    Создает таблицу туров и заполняет ее синтетическими данными.
+
+    Параметры:
+        engine (AsyncEngine): Движок базы данных.
+        rows (int): Количество туров.
+    """
+    async with engine.begin() as conn:
+        await conn.execute(text(
+            "CREATE TABLE tours (id INTEGER PRIMARY KEY, title VARCHAR, place VARCHAR, "
+            "available_places INTEGER, price_per_person INTEGER)"
+        ))
+        await conn.execute(
+            text("INSERT INTO tours (title, place, available_places, price_per_person) VALUES (:t, :p, :a, :c)"),
+            [{'t': f'Тур {i}', 'p': f'Место {i % 50}', 'a': 20, 'c': 1000 + i} for i in range(rows)],
+        )
+
+
+async def reader(engine, rows: int, deadline: float, stats: dict):
+    """
+    Выполняет запросы чтения до наступления deadline.
+    """
+    while time.perf_counter() < deadline:
+        start_id = random.randint(0, rows)
+        async with engine.connect() as conn:
+            result = await conn.execute(
+                text("SELECT id, title, place, price_per_person FROM tours WHERE id > :id ORDER BY id LIMIT 20"),
+                {'id': start_id},
+            )
+            result.all()
+        stats['reads'] += 1
+
+
+async def writer(engine, rows: int, deadline: float, stats: dict):
+    """
+    Выполняет запросы записи до наступления deadline.
+    """
+    while time.perf_counter() < deadline:
+        try:
+            async with engine.begin() as conn:
+                await conn.execute(
+                    text("UPDATE tours SET price_per_person = price_per_person + 1 WHERE id = :id"),
+                    {'id': random.randint(1, rows)},
+                )
+            stats['writes'] += 1
+        except Exception:
+            stats['write_errors'] += 1
+
+
+async def run_phase(engine, rows: int, readers: int, writers: int, duration: float) -> dict:
+    """
+    Запускает одну фазу нагрузки и возвращает количество операций в секунду.
+    """
+    stats = {'reads': 0, 'writes': 0, 'write_errors': 0}
+    deadline = time.perf_counter() + duration
+    tasks = [reader(engine, rows, deadline, stats) for _ in range(readers)]
+    tasks += [writer(engine, rows, deadline, stats) for _ in range(writers)]
+    await asyncio.gather(*tasks)
+    return {
+        'reads_per_sec': round(stats['reads'] / duration, 1),
+        'writes_per_sec': round(stats['writes'] / duration, 1),
+        'write_errors': stats['write_errors'],
+    }
+
+
+async def run_config(name: str, args) -> dict:
+    """
+    Измеряет производительность одной конфигурации движка на новой временной базе данных.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}"
+        if name == 'tuned':
+            engine = create_async_engine(url, poolclass=AsyncAdaptedQueuePool, **POOL_OPTIONS)
+            event.listen(engine.sync_engine, 'connect', apply_sqlite_pragmas)
+        else:
+            engine = create_async_engine(url)
+        try:
+            await seed(engine, args.rows)
+            read_only = await run_phase(engine, args.rows, args.readers, 0, args.duration)
+            mixed = await run_phase(engine, args.rows, args.readers, args.writers, args.duration)
+        finally:
+            await engine.dispose()
+    retained = mixed['reads_per_sec'] / read_only['reads_per_sec'] if read_only['reads_per_sec'] else 0
+    return {'read_only': read_only, 'with_writers': mixed, 'read_throughput_retained': round(retained, 3)}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description='Нагрузочный тест конкурентного чтения и записи SQLite')
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--duration', type=float, default=5.0)
+    args = parser.parse_args()
+
+    report = {'params': vars(args)}
+    for name in ('baseline', 'tuned'):
+        report[name] = await run_config(name, args)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,404 @@
+"""
+Этот файл содержит кеш для публичных страниц туров: результатов запросов к базе данных и готового HTML.
+
+Кеш состоит из хранилища (backend) и надстройки TourCache, которая формирует ключи, считает попадания и промахи
+и выполняет инвалидацию при изменении туров через административные маршруты.
+
+Хранилище выбирается настройкой CACHE_BACKEND:
+    - memory: словарь в памяти процесса с ограничением времени жизни (TTL) и вытеснением LRU;
+    - sqlite: файл SQLite, который могут использовать одновременно несколько воркеров (локальная замена Redis).
+
+Отдельно хранятся готовые карточки туров (FragmentCache): они ищутся во время отрисовки шаблона, поэтому
+всегда хранятся в памяти процесса.
+"""
+
+import logging
+import pickle
+from abc import ABC, abstractmethod
+import sqlite3
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Hashable, Iterator, Optional
+from starlette.concurrency import run_in_threadpool
+from settings import settings
+
+# Настройка логирования
+logger = logging.getLogger('log')
+
+# Ключ счетчика поколений списков туров
+LIST_GENERATION_KEY = 'tours:list:generation'
+# Ключ счетчика поколений записей отдельного тура
+TOUR_GENERATION_KEY = 'tour:{tour_id}:generation'
+
+
+class CacheBackend(ABC):
+    """
+    Базовый класс хранилища кеша.
+
+    Записи имеют время жизни и могут быть вытеснены. Счетчики (incr/get_counter) хранятся отдельно
+    от записей и не вытесняются, так как на них основана инвалидация.
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Any]:
+        """Возвращает значение по ключу или None, если записи нет или она устарела."""
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl: int):
+        """Сохраняет значение по ключу на ttl секунд."""
+
+    @abstractmethod
+    async def delete(self, *keys: str):
+        """Удаляет записи по ключам."""
+
+    @abstractmethod
+    async def get_counter(self, key: str) -> int:
+        """Возвращает значение счетчика (0, если счетчик не создан)."""
+
+    @abstractmethod
+    async def incr(self, key: str) -> int:
+        """Увеличивает счетчик на 1 и возвращает новое значение."""
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    Хранилище кеша в памяти процесса с ограничением времени жизни и вытеснением LRU.
+
+    Атрибуты:
+        max_entries (int): Максимальное количество записей.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._counters: dict[str, int] = {}
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: int):
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def delete(self, *keys: str):
+        for key in keys:
+            self._entries.pop(key, None)
+
+    async def get_counter(self, key: str) -> int:
+        return self._counters.get(key, 0)
+
+    async def incr(self, key: str) -> int:
+        self._counters[key] = self._counters.get(key, 0) + 1
+        return self._counters[key]
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    Хранилище кеша в отдельном файле SQLite, общее для всех воркеров на одной машине.
+
+    Обращения к файлу выполняются в пуле потоков, чтобы не блокировать цикл событий.
+
+    Атрибуты:
+        path (str): Путь к файлу кеша.
+        max_entries (int): Максимальное количество записей.
+    """
+
+    def __init__(self, path: str, max_entries: int):
+        self.path = path
+        self.max_entries = max_entries
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries "
+                "(key TEXT PRIMARY KEY, value BLOB, expires_at REAL, accessed_at REAL)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS ix_cache_entries_accessed_at ON cache_entries (accessed_at)"
+            )
+            connection.execute("CREATE TABLE IF NOT EXISTS cache_counters (key TEXT PRIMARY KEY, value INTEGER)")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        connection = sqlite3.connect(self.path, timeout=5)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def _get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT value FROM cache_entries WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            if row is None:
+                return None
+            connection.execute("UPDATE cache_entries SET accessed_at = ? WHERE key = ?", (now, key))
+        return pickle.loads(row[0])
+
+    def _set(self, key: str, value: Any, ttl: int):
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO cache_entries VALUES (?, ?, ?, ?)",
+                (key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), now + ttl, now),
+            )
+            connection.execute(
+                "DELETE FROM cache_entries WHERE key IN (SELECT key FROM cache_entries ORDER BY accessed_at "
+                "LIMIT max(0, (SELECT count(*) FROM cache_entries) - ?))",
+                (self.max_entries,),
+            )
+
+    def _delete(self, keys: tuple[str, ...]):
+        with self._connect() as connection:
+            connection.executemany("DELETE FROM cache_entries WHERE key = ?", [(key,) for key in keys])
+
+    def _get_counter(self, key: str) -> int:
+        with self._connect() as connection:
+            row = connection.execute("SELECT value FROM cache_counters WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else 0
+
+    def _incr(self, key: str) -> int:
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT INTO cache_counters VALUES (?, 1) ON CONFLICT(key) DO UPDATE SET value = value + 1", (key,)
+            )
+            return connection.execute("SELECT value FROM cache_counters WHERE key = ?", (key,)).fetchone()[0]
+
+    async def get(self, key: str) -> Optional[Any]:
+        return await run_in_threadpool(self._get, key)
+
+    async def set(self, key: str, value: Any, ttl: int):
+        await run_in_threadpool(self._set, key, value, ttl)
+
+    async def delete(self, *keys: str):
+        await run_in_threadpool(self._delete, keys)
+
+    async def get_counter(self, key: str) -> int:
+        return await run_in_threadpool(self._get_counter, key)
+
+    async def incr(self, key: str) -> int:
+        return await run_in_threadpool(self._incr, key)
+
+
+class TourCache:
+    """
+    Кеш туров поверх хранилища CacheBackend.
+
+    Ключи списков содержат номер поколения: любое изменение набора туров увеличивает поколение, после чего
+    старые страницы списка становятся недоступны и со временем вытесняются. Это работает и для общего
+    хранилища нескольких воркеров, где перечислить все ключи списков было бы дорого. Ключи отдельного тура
+    (tour:{id}:...) содержат собственное поколение тура, которое увеличивается при изменении или удалении тура.
+
+    Поколение читается до загрузки данных из базы, поэтому запрос, загрузивший тур до его изменения, сохраняет
+    результат под ключом прежнего поколения, который больше не запрашивается. Удаление записи по ключу без
+    поколения не защищает от такой гонки: устаревшая страница была бы сохранена после удаления и отдавалась
+    бы до истечения TTL.
+
+    Атрибуты:
+        backend (CacheBackend): Хранилище кеша.
+        ttl (int): Время жизни записей в секундах.
+        hits (int): Количество попаданий в кеш.
+        misses (int): Количество промахов.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: int):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Optional[Any]:
+        """
+        Возвращает значение из кеша и учитывает попадание или промах.
+
+        Параметры:
+            key (str): Ключ записи.
+
+        Возвращает:
+            Any | None: Значение или None при промахе.
+        """
+        value = await self.backend.get(key)
+        if value is None:
+            self.misses += 1
+            logger.debug("Промах кеша: %s", key)
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: Any):
+        """
+        Сохраняет значение в кеш.
+
+        Параметры:
+            key (str): Ключ записи.
+            value (Any): Значение.
+        """
+        await self.backend.set(key, value, self.ttl)
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Возвращает значение из кеша, а при промахе получает его через loader и сохраняет.
+
+        Параметры:
+            key (str): Ключ записи.
+            loader (Callable): Асинхронная функция получения значения.
+
+        Возвращает:
+            Any: Значение.
+        """
+        value = await self.get(key)
+        if value is None:
+            value = await loader()
+            await self.set(key, value)
+        return value
+
+    async def list_key(self, kind: str, params: str) -> str:
+        """
+        Формирует ключ записи списка туров с учетом текущего поколения.
+
+        Параметры:
+            kind (str): Тип записи ('data' или 'html').
+            params (str): Параметры запроса (фильтры, курсор), приведенные к строке.
+
+        Возвращает:
+            str: Ключ записи.
+        """
+        generation = await self.backend.get_counter(LIST_GENERATION_KEY)
+        return f'tours:list:{generation}:{kind}:{params}'
+
+    async def tour_key(self, tour_id: int, kind: str, params: str = '') -> str:
+        """
+        Формирует ключ записи отдельного тура с учетом текущего поколения тура.
+
+        Параметры:
+            tour_id (int): ID тура.
+            kind (str): Тип записи ('data' или 'html').
+            params (str): Параметры, от которых зависит запись (например, адрес сайта для HTML).
+
+        Возвращает:
+            str: Ключ записи.
+        """
+        generation = await self.backend.get_counter(TOUR_GENERATION_KEY.format(tour_id=tour_id))
+        return f'tour:{tour_id}:{generation}:{kind}:{params}'
+
+    async def invalidate_lists(self):
+        """
+        Делает недействительными все страницы списка туров.
+        """
+        generation = await self.backend.incr(LIST_GENERATION_KEY)
+        logger.debug("Кеш списков туров сброшен, поколение: %s", generation)
+
+    async def invalidate_tour(self, tour_id: int):
+        """
+        Делает недействительными записи тура (увеличивает поколение тура) и страницы списка.
+
+        Параметры:
+            tour_id (int): ID тура.
+        """
+        generation = await self.backend.incr(TOUR_GENERATION_KEY.format(tour_id=tour_id))
+        logger.debug("Кеш тура с ID %s сброшен, поколение: %s", tour_id, generation)
+        await self.invalidate_lists()
+
+    def stats(self) -> dict:
+        """
+        Возвращает счетчики попаданий и промахов кеша текущего процесса.
+
+        Возвращает:
+            dict: Попадания, промахи и доля попаданий.
+        """
+        total = self.hits + self.misses
+        return {
+            'backend': type(self.backend).__name__,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+class FragmentCache:
+    """
+    Кеш готовых фрагментов HTML (карточек туров) в памяти процесса с вытеснением LRU.
+
+    Ключ фрагмента содержит версию тура, поэтому при изменении тура фрагмент не удаляется, а перестает
+    запрашиваться и со временем вытесняется. Поиск выполняется синхронно (словарь в памяти), поэтому кеш
+    можно использовать во время отрисовки шаблона.
+
+    Атрибуты:
+        max_entries (int): Максимальное количество фрагментов.
+        hits (int): Количество попаданий в кеш.
+        misses (int): Количество промахов.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, Any] = OrderedDict()
+
+    def get_or_render(self, key: Hashable, render: Callable[[], Any]) -> Any:
+        """
+        Возвращает фрагмент из кеша, а при промахе отрисовывает его и сохраняет.
+
+        Параметры:
+            key (Hashable): Ключ фрагмента (например, ID и версия тура).
+            render (Callable): Функция отрисовки фрагмента.
+
+        Возвращает:
+            Any: Фрагмент.
+        """
+        fragment = self._entries.get(key)
+        if fragment is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return fragment
+        self.misses += 1
+        fragment = self._entries[key] = render()
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return fragment
+
+    def stats(self) -> dict:
+        """
+        Возвращает количество фрагментов и счетчики попаданий и промахов.
+
+        Возвращает:
+            dict: Количество фрагментов, попадания, промахи и доля попаданий.
+        """
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+def create_backend() -> CacheBackend:
+    """
+    Создает хранилище кеша в соответствии с настройкой CACHE_BACKEND.
+
+    Возвращает:
+        CacheBackend: Хранилище кеша.
+    """
+    if settings.CACHE_BACKEND == 'sqlite':
+        return SQLiteCacheBackend(settings.CACHE_SQLITE_PATH, settings.CACHE_MAX_ENTRIES)
+    return MemoryCacheBackend(settings.CACHE_MAX_ENTRIES)
+
+
+# Общий кеш туров приложения
+tour_cache = TourCache(create_backend(), settings.CACHE_TTL)
+# Кеш карточек туров текущего процесса
+fragment_cache = FragmentCache(settings.FRAGMENT_CACHE_MAX_ENTRIES)
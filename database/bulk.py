@@ -0,0 +1,268 @@
+"""
+Этот файл содержит массовый импорт и экспорт туров в форматах NDJSON (одна запись JSON на строку) и CSV.
+
+Импорт читает файл построчно, проверяет каждую строку схемой SchemaTour и вставляет туры пакетами по
+BULK_BATCH_SIZE строк в одной транзакции. Ошибочные строки не прерывают импорт: они попадают в отчет
+с номером строки и описанием ошибок. Файл, который не удается прочитать (неверная кодировка, поврежденный
+CSV), останавливает импорт с ошибкой в строке, где чтение прервалось.
+
+Для импортированных туров, как и при добавлении одного тура, создаются задачи обработки изображений без
+уменьшенных копий и публикуются события свободных мест.
+
+Экспорт выдает таблицу туров пакетами по ключу (id), не загружая ее в память целиком, поэтому ответ можно
+передавать клиенту потоком.
+"""
+
+import csv
+import io
+import json
+import logging
+import os
+from typing import Any, AsyncIterator, BinaryIO, Iterator, Optional
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from database.db import AsyncSessionLocal, TourTable
+from events.broker import availability_broker
+from images.processing import load_manifest
+from jobs.queue import enqueue_job
+from schemas.schem import SchemaTour
+from settings import settings
+
+# Настройка логирования
+logger = logging.getLogger('log')
+
+# Поддерживаемые форматы: формат -> MIME-тип ответа экспорта
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+# Столбцы экспорта (и допустимые столбцы импорта; id при импорте игнорируется)
+EXPORT_COLUMNS = ('id', *SchemaTour.model_fields, 'image')
+
+
+def detect_format(filename: Optional[str], requested: Optional[str] = None) -> Optional[str]:
+    """
+    Определяет формат файла импорта по явно указанному формату или по расширению имени файла.
+
+    Параметры:
+        filename (str | None): Имя загруженного файла.
+        requested (str | None): Явно указанный формат.
+
+    Возвращает:
+        str | None: 'ndjson', 'csv' или None, если формат не поддерживается.
+    """
+    if requested:
+        return requested if requested in FORMATS else None
+    extension = os.path.splitext(filename or '')[1].lower()
+    if extension in ('.ndjson', '.jsonl'):
+        return 'ndjson'
+    if extension == '.csv':
+        return 'csv'
+    return None
+
+
+def _iter_rows(file: BinaryIO, file_format: str) -> Iterator[tuple[int, Any]]:
+    """
+    Читает строки файла импорта по одной.
+
+    Ошибка чтения файла (неверная кодировка UTF-8, поврежденная строка CSV) выдается как ошибка строки,
+    на которой чтение прервалось, после чего чтение прекращается: дальнейшее содержимое файла недостоверно.
+
+    Параметры:
+        file (BinaryIO): Файл импорта.
+        file_format (str): Формат файла ('ndjson' или 'csv').
+
+    Возвращает:
+        Iterator[tuple[int, Any]]: Номер строки файла и запись (словарь) либо исключение ValueError
+            с описанием ошибки строки.
+    """
+    text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    if file_format == 'csv':
+        reader = csv.DictReader(text)
+        try:
+            for row in reader:
+                # Пустые ячейки CSV означают отсутствующее значение (используется значение по умолчанию)
+                yield reader.line_num, {key: value for key, value in row.items() if key and value != ''}
+        except (UnicodeDecodeError, csv.Error) as exc:
+            yield reader.line_num + 1, ValueError(f"Файл не удалось прочитать, импорт остановлен: {exc}")
+        return
+    line_number = 0
+    try:
+        for line_number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except ValueError as exc:
+                yield line_number, ValueError(f"Некорректный JSON: {exc}")
+    except UnicodeDecodeError as exc:
+        yield line_number + 1, ValueError(f"Файл не удалось прочитать, импорт остановлен: {exc}")
+
+
+def _read_batch(rows: Iterator[tuple[int, Any]], size: int) -> list[tuple[int, Any]]:
+    """
+    Читает из файла очередной пакет строк (выполняется в пуле потоков).
+    """
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            break
+    return batch
+
+
+def validate_row(record: Any) -> dict:
+    """
+    Проверяет одну запись импорта и приводит ее к значениям столбцов таблицы туров.
+
+    Параметры:
+        record (Any): Запись из файла импорта.
+
+    Возвращает:
+        dict: Значения столбцов нового тура.
+
+    Исключения:
+        ValueError: Если строку не удалось разобрать, запись не является объектом, имя изображения
+            недопустимо или файл изображения не найден.
+        ValidationError: Если данные тура не прошли проверку SchemaTour.
+    """
+    if isinstance(record, Exception):
+        raise record
+    if not isinstance(record, dict):
+        raise ValueError("Строка должна содержать объект")
+    values = SchemaTour.model_validate(record).model_dump()
+    image = record.get('image')
+    if image is not None:
+        if not isinstance(image, str) or os.path.basename(image) != image \
+                or os.path.splitext(image)[1].lower() not in settings.ALLOWED_IMAGE_EXTENSIONS:
+            raise ValueError("Недопустимое имя файла изображения")
+        if not os.path.isfile(os.path.join(settings.TOUR_IMAGE_DIR, image)):
+            raise ValueError(f"Файл изображения не найден: {image}")
+    values['image'] = image
+    return values
+
+
+def _validate_batch(batch: list[tuple[int, Any]]) -> tuple[list[dict], list[tuple[int, Exception]]]:
+    """
+    Проверяет пакет строк импорта (выполняется в пуле потоков: проверка изображений обращается к диску).
+
+    Возвращает:
+        tuple[list[dict], list[tuple[int, Exception]]]: Значения корректных строк и ошибки остальных строк
+            с номерами строк.
+    """
+    values, errors = [], []
+    for line_number, record in batch:
+        try:
+            values.append(validate_row(record))
+        except (ValueError, ValidationError) as exc:
+            errors.append((line_number, exc))
+    return values, errors
+
+
+def _unprocessed_images(values: list[dict]) -> list[str]:
+    """
+    Возвращает имена изображений пакета, для которых еще не созданы уменьшенные копии.
+    """
+    images = {row['image'] for row in values if row['image']}
+    return sorted(image for image in images if load_manifest(image) is None)
+
+
+def _row_errors(exc: Exception) -> list[str]:
+    """
+    Формирует список описаний ошибок строки импорта.
+    """
+    if isinstance(exc, ValidationError):
+        return [f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in exc.errors()]
+    return [str(exc)]
+
+
+async def import_tours(session: AsyncSession, file: BinaryIO, file_format: str) -> dict:
+    """
+    Импортирует туры из файла NDJSON или CSV.
+
+    Строки читаются из файла в пуле потоков пакетами по BULK_BATCH_SIZE; каждая корректная часть пакета
+    вставляется одним запросом INSERT и фиксируется отдельной транзакцией вместе с задачами обработки
+    изображений без уменьшенных копий, поэтому ошибка в одной строке не отменяет уже импортированные туры.
+    После фиксации пакета публикуются свободные места новых туров.
+
+    Параметры:
+        session (AsyncSession): Асинхронная сессия базы данных.
+        file (BinaryIO): Файл импорта.
+        file_format (str): Формат файла ('ndjson' или 'csv').
+
+    Возвращает:
+        dict: Количество импортированных и отклоненных строк и описание ошибок.
+    """
+    rows = _iter_rows(file, file_format)
+    report = {'imported': 0, 'rejected': 0, 'errors': []}
+    while batch := await run_in_threadpool(_read_batch, rows, settings.BULK_BATCH_SIZE):
+        values, errors = await run_in_threadpool(_validate_batch, batch)
+        for line_number, exc in errors:
+            report['rejected'] += 1
+            if len(report['errors']) < settings.BULK_MAX_ERRORS:
+                report['errors'].append({'line': line_number, 'errors': _row_errors(exc)})
+        if values:
+            result = await session.execute(
+                insert(TourTable).returning(TourTable.id, TourTable.available_places, TourTable.version),
+                values,
+            )
+            tours = result.all()
+            for image in await run_in_threadpool(_unprocessed_images, values):
+                enqueue_job(session, 'process_image', filename=image)
+            await session.commit()
+            for tour in tours:
+                availability_broker.publish(tour.id, tour.available_places, tour.version)
+            report['imported'] += len(values)
+            logger.debug("Импортирован пакет туров: %s", len(values))
+    logger.info("Импорт туров: добавлено %s, отклонено %s", report['imported'], report['rejected'])
+    return report
+
+
+async def iter_tour_batches() -> AsyncIterator[list[dict]]:
+    """
+    Выдает все туры пакетами по BULK_BATCH_SIZE, упорядоченными по id.
+
+    Каждый пакет читается отдельной короткой сессией, поэтому медленный клиент не удерживает соединение
+    из пула и транзакцию чтения на все время передачи ответа.
+
+    Возвращает:
+        AsyncIterator[list[dict]]: Пакеты туров в виде словарей со столбцами EXPORT_COLUMNS.
+    """
+    columns = [getattr(TourTable, column) for column in EXPORT_COLUMNS]
+    last_id = 0
+    while True:
+        query = select(*columns).where(TourTable.id > last_id).order_by(TourTable.id).limit(settings.BULK_BATCH_SIZE)
+        async with AsyncSessionLocal() as session:
+            rows = (await session.execute(query)).mappings().all()
+        if not rows:
+            return
+        last_id = rows[-1]['id']
+        yield [dict(row) for row in rows]
+
+
+async def export_tours(file_format: str) -> AsyncIterator[str]:
+    """
+    Формирует содержимое файла экспорта туров по частям.
+
+    Параметры:
+        file_format (str): Формат файла ('ndjson' или 'csv').
+
+    Возвращает:
+        AsyncIterator[str]: Части файла экспорта (по одной на пакет туров).
+    """
+    if file_format == 'csv':
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+        writer.writeheader()
+        yield buffer.getvalue()
+    async for batch in iter_tour_batches():
+        if file_format == 'csv':
+            buffer = io.StringIO()
+            writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+            writer.writerows(batch)
+            yield buffer.getvalue()
+        else:
+            yield ''.join(json.dumps(row, ensure_ascii=False, default=str) + '\n' for row in batch)
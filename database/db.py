@@ -1,26 +1,89 @@
 """
 Этот файл отвечает за взаимодействие с базой данных. Он содержит функции для подключения к базе данных и
-выполнения операций, таких как создание таблиц, добавление, удаление и обновление записей.
+модели данных. Схема базы данных создается и обновляется миграциями (database/migrations.py).
 """
 
 import logging
-from sqlalchemy import Column, String, Integer
-from sqlalchemy import create_engine, MetaData
+from datetime import datetime, timezone
+from typing import AsyncIterator
+from sqlalchemy import Column, String, Integer, Date, DateTime, Index
+from sqlalchemy import create_engine, event, MetaData
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
+from metrics.metrics import after_cursor_execute, before_cursor_execute
+from profiling import profiling
+from settings import settings
 
 # Настройка логирования
 logger = logging.getLogger('log')
 
 # URL для подключения к базе данных
-DATABASE_URL = "sqlite:///./data.db"
+DATABASE_URL = f"sqlite:///{settings.DATABASE_PATH}"
 
-# Создание движка базы данных с использованием SQLite
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+# URL для асинхронного подключения к базе данных (драйвер aiosqlite)
+ASYNC_DATABASE_URL = f"sqlite+aiosqlite:///{settings.DATABASE_PATH}"
+
+# Параметры пула соединений, общие для синхронного и асинхронного движков
+POOL_OPTIONS = {
+    'pool_size': settings.DB_POOL_SIZE,
+    'max_overflow': settings.DB_MAX_OVERFLOW,
+    'pool_timeout': settings.DB_POOL_TIMEOUT,
+}
+
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    Применяет настройки SQLite к каждому новому соединению с базой данных.
+
+    Включает журнал WAL (читатели не блокируются писателем), режим синхронизации NORMAL,
+    отображение файла в память, размер страничного кеша и время ожидания блокировки.
+    Значения берутся из settings.
+
+    Параметры:
+        dbapi_connection: DBAPI-соединение с базой данных.
+        connection_record: Запись пула, связанная с соединением.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA cache_size={settings.SQLITE_CACHE_SIZE}")
+    cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT}")
+    cursor.close()
+
+
+# Создание движка базы данных с использованием SQLite.
+# Синхронный движок используется только вне цикла событий: создание таблиц и служебные скрипты.
+engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False},
+                       poolclass=QueuePool, **POOL_OPTIONS)
+event.listen(engine, 'connect', apply_sqlite_pragmas)
 
 # Создание локальной сессии для взаимодействия с базой данных
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Создание асинхронного движка базы данных, который используется в обработчиках запросов.
+# По умолчанию aiosqlite открывает новое соединение на каждый запрос (NullPool), поэтому пул задается явно.
+async_engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=AsyncAdaptedQueuePool, **POOL_OPTIONS)
+event.listen(async_engine.sync_engine, 'connect', apply_sqlite_pragmas)
+
+# Учет количества и времени запросов к базе данных в метриках приложения
+if settings.METRICS_ENABLED:
+    for _engine in (engine, async_engine.sync_engine):
+        event.listen(_engine, 'before_cursor_execute', before_cursor_execute)
+        event.listen(_engine, 'after_cursor_execute', after_cursor_execute)
+
+# Запись запросов к базе данных профилируемых HTTP-запросов (profiling/profiling.py)
+if profiling.is_enabled():
+    for _engine in (engine, async_engine.sync_engine):
+        event.listen(_engine, 'before_cursor_execute', profiling.before_cursor_execute)
+        event.listen(_engine, 'after_cursor_execute', profiling.after_cursor_execute)
+
+# Создание фабрики асинхронных сессий.
+# expire_on_commit=False позволяет читать атрибуты объектов после commit без повторного запроса к базе.
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 # Создание объекта MetaData для управления схемой базы данных
 metadata = MetaData()
 
@@ -28,6 +91,16 @@ metadata = MetaData()
 Base = declarative_base()
 
 
+def utcnow() -> datetime:
+    """
+    Возвращает текущее время в UTC без информации о часовом поясе (в таком виде оно хранится в SQLite).
+
+    Возвращает:
+        datetime: Текущее время в UTC.
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
 class TourTable(Base):
     """
     Модель базы данных для таблицы "tours", представляющая информацию о турах.
@@ -37,37 +110,120 @@ class TourTable(Base):
     title (str): Название тура.
     description (str): Описание тура.
     place (str): Место проведения тура.
-    start_date_tour (str): Дата начала тура.
+    start_date_tour (date): Дата начала тура.
     duration (int): Продолжительность тура в днях.
     max_people (int): Максимальное количество человек.
     available_places (int): Количество доступных мест.
     occupied_places (int): Количество занятых мест.
     price_per_person (int): Цена за человека.
     image (str): URL или путь к изображению тура.
+    version (int): Номер версии строки, увеличивается при каждом изменении тура.
+    updated_at (datetime): Время последнего изменения тура (UTC).
+
+    Индексы по полям фильтрации используются при постраничном выводе списка туров. В SQLite каждый индекс
+    неявно содержит rowid (здесь это id), поэтому условие "place = ? AND id > ? ORDER BY id" читает
+    только нужную страницу индекса без сортировки. Составной индекс (place, start_date_tour) обслуживает
+    выборку туров по месту в диапазоне дат, индекс по image - подсчет ссылок на файл изображения.
+    Индексы создаются миграциями и перечислены здесь для полноты модели.
     """
     __tablename__ = 'tours'
+    __table_args__ = (
+        Index('ix_tours_place', 'place'),
+        Index('ix_tours_place_start_date_tour', 'place', 'start_date_tour'),
+        Index('ix_tours_start_date_tour', 'start_date_tour'),
+        Index('ix_tours_price_per_person', 'price_per_person'),
+        Index('ix_tours_available_places', 'available_places'),
+        Index('ix_tours_image', 'image'),
+    )
 
     id = Column(Integer, primary_key=True)
     title = Column(String)
     description = Column(String)
     place = Column(String)
-    start_date_tour = Column(String)
+    start_date_tour = Column(Date)
     duration = Column(Integer)
     max_people = Column(Integer)
     available_places = Column(Integer)
     occupied_places = Column(Integer)
     price_per_person = Column(Integer)
     image = Column(String)
+    version = Column(Integer, nullable=False, default=1)
+    updated_at = Column(DateTime, default=utcnow, onupdate=utcnow)
+
+    # SQLAlchemy увеличивает version при каждом изменении объекта через ORM
+    __mapper_args__ = {'version_id_col': version}
+
+
+class BookingTable(Base):
+    """
+    Модель базы данных для таблицы "bookings", представляющая бронирования мест в турах.
+
+    Атрибуты:
+    id (int): Уникальный идентификатор бронирования (первичный ключ).
+    tour_id (int): ID забронированного тура.
+    seats (int): Количество забронированных мест.
+    customer_name (str): Имя клиента.
+    customer_phone (str): Телефон клиента.
+    idempotency_key (str): Ключ идемпотентности запроса (уникальный).
+    created_at (datetime): Время создания бронирования (UTC).
+    """
+    __tablename__ = 'bookings'
+    __table_args__ = (
+        Index('ix_bookings_tour_id', 'tour_id'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    tour_id = Column(Integer, nullable=False)
+    seats = Column(Integer, nullable=False)
+    customer_name = Column(String)
+    customer_phone = Column(String)
+    idempotency_key = Column(String, nullable=False, unique=True)
+    created_at = Column(DateTime, nullable=False, default=utcnow)
+
+
+class JobTable(Base):
+    """
+    Модель базы данных для таблицы "jobs", представляющая фоновые задачи (jobs/queue.py).
+
+    Атрибуты:
+    id (int): Уникальный идентификатор задачи (первичный ключ).
+    kind (str): Тип задачи (имя обработчика).
+    payload (str): Параметры задачи в формате JSON.
+    status (str): Статус: 'pending' (ожидает), 'running' (выполняется) или 'failed' (попытки исчерпаны).
+        Выполненные задачи удаляются.
+    attempts (int): Количество начатых попыток выполнения.
+    max_attempts (int): Максимальное количество попыток.
+    run_at (datetime): Время, не раньше которого задача будет выполнена; для выполняемой задачи - время,
+        после которого она считается прерванной и выполняется заново (UTC).
+    created_at (datetime): Время создания задачи (UTC).
+    last_error (str): Ошибка последней неудачной попытки.
+    """
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        Index('ix_jobs_status_run_at', 'status', 'run_at'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String, nullable=False)
+    payload = Column(String, nullable=False)
+    status = Column(String, nullable=False, default='pending')
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False)
+    run_at = Column(DateTime, nullable=False, default=utcnow)
+    created_at = Column(DateTime, nullable=False, default=utcnow)
+    last_error = Column(String)
 
 
-def create_tables():
+async def get_session() -> AsyncIterator[AsyncSession]:
     """
-    Создает таблицы в базе данных на основе определенных моделей.
+    Зависимость FastAPI, предоставляющая асинхронную сессию базы данных.
 
-    Эта функция использует SQLAlchemy для создания всех таблиц, определенных в моделях,
-    наследуемых от базового класса Base. В данном случае создается таблица "tours".
+    Сессия открывается на время обработки запроса и закрывается после формирования ответа,
+    при этом запросы к SQLite выполняются драйвером aiosqlite в отдельном потоке и не блокируют цикл событий.
 
-    Логирует информацию о создании базы данных и добавлении таблицы.
+    Возвращает:
+        AsyncIterator[AsyncSession]: Асинхронная сессия базы данных.
     """
-    Base.metadata.create_all(bind=engine)
-    logger.info(f'База данных создана. Добавлена таблица: "{TourTable.__tablename__}"')
+    async with AsyncSessionLocal() as session:
+        logger.debug("Открытие сессии базы данных")
+        yield session
@@ -0,0 +1,303 @@
+"""
+Этот файл содержит миграции схемы базы данных и функции для их применения.
+
+Текущая версия схемы хранится в PRAGMA user_version файла базы данных. Каждая миграция выполняется в отдельной
+транзакции вместе с изменением версии, поэтому прерванная миграция не оставляет базу в промежуточном состоянии,
+а повторный запуск применяет только недостающие миграции.
+
+Запуск из корня проекта:
+    python -m database.migrations
+"""
+
+import logging
+import sqlite3
+from datetime import datetime
+from typing import Callable
+from database.db import apply_sqlite_pragmas
+from settings import settings
+
+# Настройка логирования
+logger = logging.getLogger('log')
+
+# Форматы дат, которые встречаются в строковом столбце start_date_tour старых баз данных
+LEGACY_DATE_FORMATS = ('%Y-%m-%d', '%d.%m.%Y', '%d/%m/%Y', '%Y.%m.%d')
+# Максимальное количество нераспознанных дат, перечисляемых в ошибке миграции 2
+MAX_LISTED_INVALID_DATES = 50
+
+
+def _create_tours_table(connection: sqlite3.Connection):
+    """
+    Миграция 1: создает исходную таблицу "tours", если ее еще нет (новая база данных).
+    """
+    connection.execute(
+        """
+        CREATE TABLE IF NOT EXISTS tours (
+            id INTEGER NOT NULL,
+            title VARCHAR,
+            description VARCHAR,
+            place VARCHAR,
+            start_date_tour VARCHAR,
+            duration INTEGER,
+            max_people INTEGER,
+            available_places INTEGER,
+            occupied_places INTEGER,
+            price_per_person INTEGER,
+            image VARCHAR,
+            PRIMARY KEY (id)
+        )
+        """
+    )
+
+
+def _normalize_date(value):
+    """
+    Приводит строковую дату из старой схемы к формату ISO (YYYY-MM-DD).
+
+    Параметры:
+        value: Исходное значение столбца start_date_tour.
+
+    Возвращает:
+        str | None: Дата в формате ISO или None, если дата не указана.
+
+    Исключения:
+        ValueError: Если значение не удалось распознать ни в одном из форматов LEGACY_DATE_FORMATS.
+    """
+    if value is None or not str(value).strip():
+        return None
+    for date_format in LEGACY_DATE_FORMATS:
+        try:
+            return datetime.strptime(str(value).strip(), date_format).date().isoformat()
+        except ValueError:
+            continue
+    raise ValueError(f"Не удалось распознать дату начала тура: {value!r}")
+
+
+def _typed_start_date_and_indexes(connection: sqlite3.Connection):
+    """
+    Миграция 2: переводит start_date_tour в тип DATE и создает индексы для фильтрации.
+
+    SQLite не поддерживает изменение типа столбца, поэтому таблица пересоздается с копированием данных.
+    Даты приводятся к формату ISO, в котором они хранятся столбцом Date SQLAlchemy и корректно
+    сравниваются в условиях диапазона.
+
+    Если какие-либо даты не удалось распознать, миграция прерывается до изменения таблицы, а в ошибке
+    перечисляются ID туров и исходные значения: их нужно исправить вручную и запустить миграции повторно.
+
+    Исключения:
+        ValueError: Если в таблице есть нераспознанные даты.
+    """
+    connection.execute(
+        """
+        CREATE TABLE tours_new (
+            id INTEGER NOT NULL,
+            title VARCHAR,
+            description VARCHAR,
+            place VARCHAR,
+            start_date_tour DATE,
+            duration INTEGER,
+            max_people INTEGER,
+            available_places INTEGER,
+            occupied_places INTEGER,
+            price_per_person INTEGER,
+            image VARCHAR,
+            PRIMARY KEY (id)
+        )
+        """
+    )
+    rows = connection.execute(
+        "SELECT id, title, description, place, start_date_tour, duration, max_people, "
+        "available_places, occupied_places, price_per_person, image FROM tours"
+    ).fetchall()
+    converted, invalid = [], []
+    for row in rows:
+        try:
+            converted.append(row[:4] + (_normalize_date(row[4]),) + row[5:])
+        except ValueError:
+            invalid.append(row)
+    if invalid:
+        listed = ', '.join(f'{row[0]}: {row[4]!r}' for row in invalid[:MAX_LISTED_INVALID_DATES])
+        if len(invalid) > MAX_LISTED_INVALID_DATES:
+            listed += f' и еще {len(invalid) - MAX_LISTED_INVALID_DATES}'
+        raise ValueError(f"Не удалось распознать даты начала туров ({len(invalid)}), ID тура и значение: {listed}")
+    connection.executemany("INSERT INTO tours_new VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", converted)
+    connection.execute("DROP TABLE tours")
+    connection.execute("ALTER TABLE tours_new RENAME TO tours")
+    connection.execute("CREATE INDEX ix_tours_place ON tours (place)")
+    connection.execute("CREATE INDEX ix_tours_place_start_date_tour ON tours (place, start_date_tour)")
+    connection.execute("CREATE INDEX ix_tours_start_date_tour ON tours (start_date_tour)")
+    connection.execute("CREATE INDEX ix_tours_price_per_person ON tours (price_per_person)")
+    connection.execute("CREATE INDEX ix_tours_available_places ON tours (available_places)")
+
+
+def _row_version_and_updated_at(connection: sqlite3.Connection):
+    """
+    Миграция 3: добавляет номер версии строки и время последнего изменения тура.
+
+    Эти столбцы используются для формирования заголовков ETag и Last-Modified. Существующим турам
+    назначается версия 1 и текущее время.
+    """
+    connection.execute("ALTER TABLE tours ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+    connection.execute("ALTER TABLE tours ADD COLUMN updated_at DATETIME")
+    connection.execute("UPDATE tours SET updated_at = datetime('now')")
+
+
+def _image_index(connection: sqlite3.Connection):
+    """
+    Миграция 4: создает индекс по имени изображения.
+
+    Индекс используется для подсчета ссылок на файл изображения перед его удалением.
+    """
+    connection.execute("CREATE INDEX ix_tours_image ON tours (image)")
+
+
+def _bookings_table(connection: sqlite3.Connection):
+    """
+    Миграция 5: создает таблицу бронирований "bookings".
+
+    Уникальный ключ идемпотентности не позволяет повторному запросу клиента создать второе бронирование.
+    """
+    connection.execute(
+        """
+        CREATE TABLE bookings (
+            id INTEGER NOT NULL,
+            tour_id INTEGER NOT NULL,
+            seats INTEGER NOT NULL,
+            customer_name VARCHAR,
+            customer_phone VARCHAR,
+            idempotency_key VARCHAR NOT NULL,
+            created_at DATETIME NOT NULL,
+            PRIMARY KEY (id),
+            UNIQUE (idempotency_key)
+        )
+        """
+    )
+    connection.execute("CREATE INDEX ix_bookings_tour_id ON bookings (tour_id)")
+
+
+def _tours_fts(connection: sqlite3.Connection):
+    """
+    Миграция 6: создает полнотекстовый индекс FTS5 по названию, описанию и месту проведения тура.
+
+    Индекс хранит только токены (content='tours'), текст читается из таблицы туров. Триггеры обновляют
+    индекс при любом добавлении, удалении и изменении текстовых столбцов тура, включая массовый импорт.
+    Триггер изменения срабатывает только для текстовых столбцов, поэтому бронирование мест не затрагивает
+    индекс. Префиксные индексы ускоряют поиск по началу слова.
+    """
+    connection.execute(
+        """
+        CREATE VIRTUAL TABLE tours_fts USING fts5(
+            title, description, place,
+            content='tours', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+        """
+    )
+    connection.execute(
+        """
+        CREATE TRIGGER tours_fts_insert AFTER INSERT ON tours BEGIN
+            INSERT INTO tours_fts (rowid, title, description, place)
+            VALUES (new.id, new.title, new.description, new.place);
+        END
+        """
+    )
+    connection.execute(
+        """
+        CREATE TRIGGER tours_fts_delete AFTER DELETE ON tours BEGIN
+            INSERT INTO tours_fts (tours_fts, rowid, title, description, place)
+            VALUES ('delete', old.id, old.title, old.description, old.place);
+        END
+        """
+    )
+    connection.execute(
+        """
+        CREATE TRIGGER tours_fts_update AFTER UPDATE OF title, description, place ON tours BEGIN
+            INSERT INTO tours_fts (tours_fts, rowid, title, description, place)
+            VALUES ('delete', old.id, old.title, old.description, old.place);
+            INSERT INTO tours_fts (rowid, title, description, place)
+            VALUES (new.id, new.title, new.description, new.place);
+        END
+        """
+    )
+    connection.execute("INSERT INTO tours_fts (tours_fts) VALUES ('rebuild')")
+
+
+def _jobs_table(connection: sqlite3.Connection):
+    """
+    Миграция 7: создает таблицу фоновых задач "jobs".
+
+    Индекс по статусу и времени запуска используется воркерами для выбора следующей задачи.
+    """
+    connection.execute(
+        """
+        CREATE TABLE jobs (
+            id INTEGER NOT NULL,
+            kind VARCHAR NOT NULL,
+            payload VARCHAR NOT NULL,
+            status VARCHAR NOT NULL,
+            attempts INTEGER NOT NULL,
+            max_attempts INTEGER NOT NULL,
+            run_at DATETIME NOT NULL,
+            created_at DATETIME NOT NULL,
+            last_error VARCHAR,
+            PRIMARY KEY (id)
+        )
+        """
+    )
+    connection.execute("CREATE INDEX ix_jobs_status_run_at ON jobs (status, run_at)")
+
+
+# Список миграций в порядке применения: (версия схемы, описание, функция миграции)
+MIGRATIONS: list[tuple[int, str, Callable[[sqlite3.Connection], None]]] = [
+    (1, 'Создание таблицы tours', _create_tours_table),
+    (2, 'Тип DATE для start_date_tour и индексы для фильтрации', _typed_start_date_and_indexes),
+    (3, 'Версия строки и время изменения тура', _row_version_and_updated_at),
+    (4, 'Индекс по имени изображения', _image_index),
+    (5, 'Таблица бронирований', _bookings_table),
+    (6, 'Полнотекстовый индекс туров (FTS5)', _tours_fts),
+    (7, 'Таблица фоновых задач', _jobs_table),
+]
+
+
+def run_migrations(database_path: str = settings.DATABASE_PATH) -> int:
+    """
+    Применяет к базе данных все недостающие миграции.
+
+    Транзакция открывается в режиме IMMEDIATE, поэтому при одновременном запуске нескольких воркеров
+    миграции применяет только один из них, а остальные после ожидания видят актуальную версию схемы.
+
+    Параметры:
+        database_path (str): Путь к файлу базы данных.
+
+    Возвращает:
+        int: Версия схемы после применения миграций.
+    """
+    connection = sqlite3.connect(database_path, isolation_level=None)
+    try:
+        apply_sqlite_pragmas(connection, None)
+        for version, description, migration in MIGRATIONS:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                current_version = connection.execute("PRAGMA user_version").fetchone()[0]
+                if current_version >= version:
+                    connection.execute("COMMIT")
+                    continue
+                logger.info("Применение миграции %s: %s", version, description)
+                migration(connection)
+                connection.execute(f"PRAGMA user_version = {version}")
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                logger.exception("Ошибка при применении миграции %s", version)
+                raise
+        current_version = connection.execute("PRAGMA user_version").fetchone()[0]
+        logger.info("Версия схемы базы данных: %s", current_version)
+        return current_version
+    finally:
+        connection.close()
+
+
+if __name__ == '__main__':
+    from log_settings.log_settings import setup_logging
+
+    setup_logging()
+    print(f"Версия схемы базы данных: {run_migrations()}")
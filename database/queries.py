@@ -0,0 +1,280 @@
+"""
+Этот файл содержит построение запросов к таблице туров: фильтрацию и постраничный вывод по ключу (keyset).
+"""
+
+import logging
+import re
+from datetime import datetime
+from typing import Iterable, Optional
+from sqlalchemy import func, select, Select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.db import TourTable
+from schemas.schem import TourFilter
+from settings import settings
+from utils.conditional import make_etag
+
+# Настройка логирования
+logger = logging.getLogger('log')
+
+# Маркеры начала и конца совпадения во фрагменте результата поиска. Используются управляющие символы, которых
+# нет в тексте туров, чтобы при выводе сначала экранировать текст, а затем заменить маркеры на теги <mark>.
+SNIPPET_START = '\x02'
+SNIPPET_END = '\x03'
+
+# Веса столбцов title, description и place в ранжировании bm25: совпадение в названии важнее, чем в описании
+SEARCH_WEIGHTS = (10.0, 1.0, 5.0)
+
+# Запрос поиска по индексу FTS5 с ранжированием bm25 и фрагментом описания с выделенными совпадениями
+SEARCH_QUERY = text(
+    "SELECT tours.*, bm25(tours_fts, {}, {}, {}) AS rank, "
+    "snippet(tours_fts, 1, :start, :end, '…', 16) AS snippet "
+    "FROM tours_fts JOIN tours ON tours.id = tours_fts.rowid "
+    "WHERE tours_fts MATCH :match ORDER BY rank LIMIT :limit".format(*SEARCH_WEIGHTS)
+)
+
+
+def filter_tours_query(filters: TourFilter) -> Select:
+    """
+    Строит запрос к таблице туров с условиями фильтрации, без сортировки и ограничения.
+
+    Параметры:
+        filters (TourFilter): Параметры фильтрации.
+
+    Возвращает:
+        Select: Запрос SQLAlchemy.
+    """
+    query = select(TourTable)
+    if filters.place:
+        query = query.where(TourTable.place == filters.place)
+    if filters.price_min is not None:
+        query = query.where(TourTable.price_per_person >= filters.price_min)
+    if filters.price_max is not None:
+        query = query.where(TourTable.price_per_person <= filters.price_max)
+    if filters.start_date_from:
+        query = query.where(TourTable.start_date_tour >= filters.start_date_from)
+    if filters.start_date_to:
+        query = query.where(TourTable.start_date_tour <= filters.start_date_to)
+    if filters.has_places:
+        query = query.where(TourTable.available_places > 0)
+    return query
+
+
+def tours_page_query(filters: TourFilter) -> Select:
+    """
+    Строит запрос одной страницы туров.
+
+    Страница начинается после курсора after_id и упорядочена по id. Запрашивается на одну запись больше limit,
+    чтобы без отдельного COUNT определить, есть ли следующая страница.
+
+    Параметры:
+        filters (TourFilter): Параметры фильтрации и постраничного вывода.
+
+    Возвращает:
+        Select: Запрос SQLAlchemy.
+    """
+    query = filter_tours_query(filters)
+    if filters.after_id is not None:
+        query = query.where(TourTable.id > filters.after_id)
+    return query.order_by(TourTable.id).limit(filters.limit + 1)
+
+
+async def fetch_tours_page(session: AsyncSession, filters: TourFilter) -> tuple[list[TourTable], Optional[int]]:
+    """
+    Получает одну страницу туров.
+
+    Параметры:
+        session (AsyncSession): Асинхронная сессия базы данных.
+        filters (TourFilter): Параметры фильтрации и постраничного вывода.
+
+    Возвращает:
+        tuple[list[TourTable], int | None]: Туры страницы и курсор следующей страницы
+        (None, если страница последняя).
+    """
+    query = tours_page_query(filters)
+    logger.debug("Выполнение запроса: %s", query)
+    result = await session.execute(query)
+    tour_models = list(result.scalars().all())
+    next_cursor = None
+    if len(tour_models) > filters.limit:
+        tour_models = tour_models[:filters.limit]
+        next_cursor = tour_models[-1].id
+    return tour_models, next_cursor
+
+
+def tour_as_dict(tour: TourTable) -> dict:
+    """
+    Преобразует объект тура в словарь значений столбцов.
+
+    Словари, в отличие от объектов ORM, не связаны с сессией и могут храниться в кеше.
+
+    Параметры:
+        tour (TourTable): Объект тура.
+
+    Возвращает:
+        dict: Значения столбцов тура.
+    """
+    return {column.name: getattr(tour, column.name) for column in TourTable.__table__.columns}
+
+
+async def fetch_tours_page_data(session: AsyncSession, filters: TourFilter) -> tuple[list[dict], Optional[int]]:
+    """
+    Получает одну страницу туров в виде словарей (для хранения в кеше).
+
+    Параметры:
+        session (AsyncSession): Асинхронная сессия базы данных.
+        filters (TourFilter): Параметры фильтрации и постраничного вывода.
+
+    Возвращает:
+        tuple[list[dict], int | None]: Туры страницы и курсор следующей страницы.
+    """
+    tour_models, next_cursor = await fetch_tours_page(session, filters)
+    return [tour_as_dict(tour) for tour in tour_models], next_cursor
+
+
+async def fetch_tours_page_versions(session: AsyncSession, filters: TourFilter) -> list[dict]:
+    """
+    Получает ID, версии и время изменения туров страницы без загрузки остальных столбцов.
+
+    Используется для проверки условных запросов (If-None-Match / If-Modified-Since) до загрузки
+    и отрисовки страницы.
+
+    Параметры:
+        session (AsyncSession): Асинхронная сессия базы данных.
+        filters (TourFilter): Параметры фильтрации и постраничного вывода.
+
+    Возвращает:
+        list[dict]: Словари с ключами id, version и updated_at.
+    """
+    query = tours_page_query(filters).with_only_columns(TourTable.id, TourTable.version, TourTable.updated_at)
+    result = await session.execute(query)
+    return [row._asdict() for row in result.all()[:filters.limit]]
+
+
+async def fetch_tour_version(session: AsyncSession, tour_id: int) -> Optional[dict]:
+    """
+    Получает версию и время изменения одного тура.
+
+    Параметры:
+        session (AsyncSession): Асинхронная сессия базы данных.
+        tour_id (int): ID тура.
+
+    Возвращает:
+        dict | None: Словарь с ключами id, version и updated_at или None, если тур не найден.
+    """
+    query = select(TourTable.id, TourTable.version, TourTable.updated_at).where(TourTable.id == tour_id)
+    result = await session.execute(query)
+    row = result.first()
+    return row._asdict() if row else None
+
+
+def tours_validators(params: str, tours: Iterable[dict],
+                     with_last_modified: bool = False) -> tuple[str, Optional[datetime]]:
+    """
+    Вычисляет ETag и Last-Modified для набора туров.
+
+    ETag зависит от параметров запроса и пар (ID, версия) туров, поэтому меняется при любом изменении,
+    добавлении или удалении тура на странице.
+
+    Last-Modified вычисляется только для страницы отдельного тура (with_last_modified=True). Для списков он не
+    формируется: удаление тура со страницы списка не увеличивает время изменения оставшихся туров, и клиент,
+    проверяющий ответ только по If-Modified-Since, получил бы 304 со списком, в котором остался удаленный тур.
+    Поэтому актуальность списков проверяется только по ETag.
+
+    Параметры:
+        params (str): Параметры запроса, приведенные к строке.
+        tours (Iterable[dict]): Туры со значениями id, version и updated_at.
+        with_last_modified (bool): Вычислить время последнего изменения.
+
+    Возвращает:
+        tuple[str, datetime | None]: ETag и время последнего изменения (None для списков).
+    """
+    tours = list(tours)
+    etag = make_etag(params, [(tour['id'], tour['version']) for tour in tours])
+    last_modified = None
+    if with_last_modified:
+        last_modified = max((tour['updated_at'] for tour in tours if tour['updated_at']), default=None)
+    return etag, last_modified
+
+
+def fts_match_expression(query: str) -> Optional[str]:
+    """
+    Преобразует строку поиска посетителя в выражение MATCH для FTS5.
+
+    Из строки берутся только слова; каждое слово заключается в кавычки, поэтому операторы и спецсимволы FTS5
+    в строке поиска не интерпретируются. Последнее слово ищется по префиксу, чтобы находить туры по мере набора.
+
+    Параметры:
+        query (str): Строка поиска.
+
+    Возвращает:
+        str | None: Выражение MATCH или None, если в строке нет слов.
+    """
+    words = re.findall(r'\w+', query)
+    if not words:
+        return None
+    return ' '.join(f'"{word}"' for word in words) + '*'
+
+
+async def search_tours(session: AsyncSession, query: str, limit: int) -> list[dict]:
+    """
+    Ищет туры по названию, описанию и месту проведения с помощью полнотекстового индекса FTS5.
+
+    Результаты упорядочены по релевантности (bm25). Для каждого тура возвращается фрагмент описания,
+    в котором совпадения обрамлены маркерами SNIPPET_START и SNIPPET_END.
+
+    Параметры:
+        session (AsyncSession): Асинхронная сессия базы данных.
+        query (str): Строка поиска.
+        limit (int): Максимальное количество результатов.
+
+    Возвращает:
+        list[dict]: Значения столбцов найденных туров и фрагмент описания (ключ snippet).
+    """
+    match = fts_match_expression(query)
+    if match is None:
+        return []
+    result = await session.execute(
+        SEARCH_QUERY.columns(start_date_tour=TourTable.start_date_tour.type, updated_at=TourTable.updated_at.type),
+        {'match': match, 'limit': limit, 'start': SNIPPET_START, 'end': SNIPPET_END},
+    )
+    return [dict(row) for row in result.mappings().all()]
+
+
+async def fetch_tour_facets(session: AsyncSession, filters: TourFilter) -> dict:
+    """
+    Считает фасеты списка туров с учетом фильтров: количество туров по местам, ценовым диапазонам
+    (шириной FACET_PRICE_BAND), месяцам начала и длительности.
+
+    Каждый фасет считается одним запросом GROUP BY в базе данных, туры в приложение не загружаются.
+    Параметры постраничного вывода (after_id, limit) не учитываются.
+
+    Параметры:
+        session (AsyncSession): Асинхронная сессия базы данных.
+        filters (TourFilter): Параметры фильтрации.
+
+    Возвращает:
+        dict: Фасеты в формате схемы TourFacets.
+    """
+    band = settings.FACET_PRICE_BAND
+    base = filter_tours_query(filters)
+    count = func.count().label('count')
+
+    async def group_by(expression) -> list:
+        query = base.with_only_columns(expression.label('value'), count).group_by(expression)
+        return (await session.execute(query)).all()
+
+    places = await group_by(TourTable.place)
+    price_bands = await group_by((TourTable.price_per_person // band) * band)
+    start_months = await group_by(func.strftime('%Y-%m', TourTable.start_date_tour))
+    durations = await group_by(TourTable.duration)
+    return {
+        'total': sum(row.count for row in places),
+        'places': [{'value': row.value, 'count': row.count}
+                   for row in sorted(places, key=lambda row: (-row.count, row.value or '')) if row.value],
+        'price_bands': [{'min': row.value, 'max': row.value + band, 'count': row.count}
+                        for row in sorted(price_bands, key=lambda row: row.value or 0) if row.value is not None],
+        'start_months': [{'value': row.value, 'count': row.count}
+                         for row in sorted(start_months, key=lambda row: row.value or '') if row.value],
+        'durations': [{'value': row.value, 'count': row.count}
+                      for row in sorted(durations, key=lambda row: row.value or 0) if row.value is not None],
+    }
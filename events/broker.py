@@ -0,0 +1,144 @@
+"""
+Этот файл содержит публикацию изменений количества свободных мест в турах и подписку на них (pub/sub в памяти
+процесса) для потока Server-Sent Events.
+
+Подписчик хранит не очередь событий, а только последнее еще не отправленное состояние каждого тура. Поэтому
+медленный клиент не накапливает события: при нескольких изменениях тура подряд он получит только актуальное
+количество мест. Если у подписчика накопилось больше SSE_MAX_PENDING неотправленных туров, подписка
+закрывается, а браузер переподключается и продолжает получать актуальные данные.
+
+Публикация выполняется синхронно в цикле событий воркера и не ждет клиентов. Подписчики получают изменения,
+сделанные в том же процессе; при нескольких воркерах каждый из них обслуживает своих подписчиков.
+"""
+
+import asyncio
+import logging
+from typing import Optional
+from metrics.metrics import sse_subscribers
+from settings import settings
+
+# Настройка логирования
+logger = logging.getLogger('log')
+
+
+class Subscription:
+    """
+    Подписка одного клиента на изменения одного тура или всего каталога.
+
+    Атрибуты:
+        tour_id (int | None): ID тура или None для подписки на все туры.
+        closed (bool): Подписка закрыта из-за переполнения (клиент не успевает получать события).
+    """
+
+    def __init__(self, tour_id: Optional[int]):
+        self.tour_id = tour_id
+        self.closed = False
+        self._pending: dict[int, dict] = {}
+        self._ready = asyncio.Event()
+
+    def push(self, tour_id: int, payload: dict) -> bool:
+        """
+        Сохраняет изменение тура для отправки клиенту, заменяя предыдущее неотправленное изменение этого тура.
+
+        Параметры:
+            tour_id (int): ID тура.
+            payload (dict): Данные события.
+
+        Возвращает:
+            bool: False, если подписка переполнена и должна быть закрыта.
+        """
+        self._pending.pop(tour_id, None)
+        self._pending[tour_id] = payload
+        self._ready.set()
+        return len(self._pending) <= settings.SSE_MAX_PENDING
+
+    async def wait(self, timeout: float) -> list[dict]:
+        """
+        Ожидает изменения и возвращает все неотправленные изменения.
+
+        Параметры:
+            timeout (float): Максимальное время ожидания в секундах.
+
+        Возвращает:
+            list[dict]: Изменения туров в порядке поступления (пустой список, если время ожидания истекло).
+        """
+        if not self._pending and not self.closed:
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+        self._ready.clear()
+        events = list(self._pending.values())
+        self._pending.clear()
+        return events
+
+    def close(self):
+        """
+        Закрывает подписку и пробуждает ожидающий поток событий.
+        """
+        self.closed = True
+        self._ready.set()
+
+
+class AvailabilityBroker:
+    """
+    Брокер изменений свободных мест: рассылает изменения подписчикам тура и подписчикам всего каталога.
+    """
+
+    def __init__(self):
+        self._subscribers: dict[Optional[int], set[Subscription]] = {}
+
+    def subscribe(self, tour_id: Optional[int] = None) -> Subscription:
+        """
+        Создает подписку на изменения тура (или всех туров, если tour_id не указан).
+
+        Параметры:
+            tour_id (int | None): ID тура.
+
+        Возвращает:
+            Subscription: Подписка.
+        """
+        subscription = Subscription(tour_id)
+        self._subscribers.setdefault(tour_id, set()).add(subscription)
+        sse_subscribers.inc()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """
+        Удаляет подписку.
+
+        Параметры:
+            subscription (Subscription): Подписка.
+        """
+        subscribers = self._subscribers.get(subscription.tour_id)
+        if subscribers is None or subscription not in subscribers:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscribers[subscription.tour_id]
+        sse_subscribers.dec()
+
+    def publish(self, tour_id: int, available_places: Optional[int], version: Optional[int] = None,
+                deleted: bool = False):
+        """
+        Публикует новое количество свободных мест в туре.
+
+        Параметры:
+            tour_id (int): ID тура.
+            available_places (int | None): Количество свободных мест.
+            version (int | None): Версия строки тура (для упорядочивания событий у клиента).
+            deleted (bool): Тур удален.
+        """
+        payload = {'tour_id': tour_id, 'available_places': available_places, 'version': version}
+        if deleted:
+            payload['deleted'] = True
+        for key in (tour_id, None):
+            for subscription in list(self._subscribers.get(key, ())):
+                if not subscription.push(tour_id, payload):
+                    logger.warning("Подписчик на изменения туров не успевает получать события, подписка закрыта")
+                    subscription.close()
+                    self.unsubscribe(subscription)
+
+
+# Общий брокер изменений свободных мест
+availability_broker = AvailabilityBroker()
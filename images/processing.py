@@ -0,0 +1,260 @@
+"""
+Этот файл содержит обработку изображений туров: создание уменьшенных копий разных размеров в форматах
+AVIF, WebP и JPEG и формирование атрибутов srcset для шаблонов.
+
+Копии создаются фоновой задачей после загрузки изображения через админ-панель (jobs/tasks.py). Для уже
+загруженных изображений их можно создать командой (из корня проекта):
+    python -m images.processing [--force]
+
+Имена копий содержат полное имя исходного файла (a.jpg-card.webp), поэтому копии файлов a.jpg и a.png не
+совпадают. Список созданных копий и их фактическая ширина записываются в описание копий
+({имя файла}.json в каталоге копий): srcset формируется только из созданных копий, без обращения к файлам
+каждой копии при отрисовке.
+"""
+
+import argparse
+import json
+import logging
+import os
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Optional
+from PIL import Image, ImageOps, features
+from settings import settings
+
+# Настройка логирования
+logger = logging.getLogger('log')
+
+# Размеры копий: имя копии и ширина в пикселях
+VARIANTS = {
+    'thumb': 160,
+    'card': 320,
+    'card2x': 640,
+    'full': 1280,
+}
+
+# Префикс имен временных файлов незавершенных загрузок в каталоге изображений
+UPLOAD_TEMP_PREFIX = '.upload-'
+# Максимальное количество описаний копий, хранимых в памяти процесса
+MANIFEST_CACHE_MAX_ENTRIES = 10000
+
+# Параметры сохранения для каждого формата: расширение, MIME-тип и параметры Pillow
+FORMATS = {
+    'avif': ('avif', 'image/avif', {'quality': 55, 'speed': 6}),
+    'webp': ('webp', 'image/webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('jpg', 'image/jpeg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+@lru_cache(maxsize=None)
+def supported_formats() -> tuple[str, ...]:
+    """
+    Возвращает форматы, которые может сохранять установленная сборка Pillow.
+
+    Возвращает:
+        tuple[str, ...]: Имена форматов в порядке предпочтения (AVIF, WebP, JPEG).
+    """
+    formats = []
+    if features.check('avif'):
+        formats.append('avif')
+    if features.check('webp'):
+        formats.append('webp')
+    formats.append('jpeg')
+    return tuple(formats)
+
+
+def variant_filename(filename: str, variant: str, image_format: str) -> str:
+    """
+    Возвращает имя файла копии изображения.
+
+    Параметры:
+        filename (str): Имя исходного файла изображения.
+        variant (str): Имя копии (thumb, card, card2x, full).
+        image_format (str): Формат копии (avif, webp, jpeg).
+
+    Возвращает:
+        str: Имя файла копии в каталоге копий.
+    """
+    extension = FORMATS[image_format][0]
+    return f'{filename}-{variant}.{extension}'
+
+
+def manifest_path(filename: str) -> str:
+    """
+    Возвращает путь к описанию копий изображения.
+
+    Параметры:
+        filename (str): Имя исходного файла изображения.
+
+    Возвращает:
+        str: Путь к файлу описания в каталоге копий.
+    """
+    return os.path.join(settings.TOUR_IMAGE_VARIANTS_DIR, f'{filename}.json')
+
+
+# Описания копий изображений, прочитанные из файлов: имя файла изображения -> описание
+_manifests: OrderedDict[str, dict] = OrderedDict()
+
+
+def load_manifest(filename: str) -> Optional[dict]:
+    """
+    Возвращает описание копий изображения.
+
+    Прочитанные описания хранятся в памяти процесса: имя изображения вычисляется по содержимому, поэтому
+    его копии не меняются (кроме пересоздания командой с --force, после которой нужен перезапуск). Отсутствие
+    описания не запоминается, так как копии может создать фоновая задача другого процесса.
+
+    Параметры:
+        filename (str): Имя исходного файла изображения.
+
+    Возвращает:
+        dict | None: Форматы (formats) и ширина созданных копий (widths) или None, если копии не созданы.
+    """
+    manifest = _manifests.get(filename)
+    if manifest is not None:
+        _manifests.move_to_end(filename)
+        return manifest
+    try:
+        with open(manifest_path(filename), encoding='utf-8') as file:
+            manifest = json.load(file)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError):
+        logger.exception("Не удалось прочитать описание копий изображения %s", filename)
+        return None
+    _manifests[filename] = manifest
+    while len(_manifests) > MANIFEST_CACHE_MAX_ENTRIES:
+        _manifests.popitem(last=False)
+    return manifest
+
+
+def _write_manifest(filename: str, manifest: dict):
+    """
+    Атомарно записывает описание копий изображения.
+    """
+    path = manifest_path(filename)
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        json.dump(manifest, file)
+    os.replace(temp_path, path)
+
+
+def process_image(filename: str, force: bool = False) -> list[str]:
+    """
+    Создает уменьшенные копии изображения тура во всех поддерживаемых форматах и их описание.
+
+    Изображение поворачивается по данным EXIF и приводится к RGB. Копии не увеличиваются: если исходное
+    изображение уже не шире очередной копии, эта копия (исходного размера) создается последней, а более
+    крупные копии не создаются.
+
+    Параметры:
+        filename (str): Имя файла изображения в каталоге изображений туров.
+        force (bool): Пересоздать уже существующие копии.
+
+    Возвращает:
+        list[str]: Имена созданных файлов копий.
+    """
+    os.makedirs(settings.TOUR_IMAGE_VARIANTS_DIR, exist_ok=True)
+    created = []
+    widths = {}
+    with Image.open(os.path.join(settings.TOUR_IMAGE_DIR, filename)) as source:
+        image = ImageOps.exif_transpose(source).convert('RGB')
+    for variant, width in VARIANTS.items():
+        resized = image.copy()
+        resized.thumbnail((width, width * 4), Image.Resampling.LANCZOS)
+        if resized.width in widths.values():
+            break
+        widths[variant] = resized.width
+        for image_format in supported_formats():
+            name = variant_filename(filename, variant, image_format)
+            path = os.path.join(settings.TOUR_IMAGE_VARIANTS_DIR, name)
+            if os.path.exists(path) and not force:
+                continue
+            resized.save(path, format=image_format.upper(), **FORMATS[image_format][2])
+            created.append(name)
+    _write_manifest(filename, {'formats': list(supported_formats()), 'widths': widths})
+    _manifests.pop(filename, None)
+    logger.info("Созданы копии изображения %s: %s", filename, len(created))
+    return created
+
+
+def delete_variants(filename: str):
+    """
+    Удаляет все копии изображения тура и их описание.
+
+    Параметры:
+        filename (str): Имя исходного файла изображения.
+    """
+    _manifests.pop(filename, None)
+    paths = [manifest_path(filename)]
+    for variant in VARIANTS:
+        for image_format in FORMATS:
+            paths.append(os.path.join(settings.TOUR_IMAGE_VARIANTS_DIR,
+                                      variant_filename(filename, variant, image_format)))
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def image_sources(filename: Optional[str]) -> list[dict]:
+    """
+    Формирует источники для элемента <picture>: по одному на каждый формат с атрибутом srcset.
+
+    Используется в шаблонах Jinja2. srcset содержит только созданные копии с их фактической шириной. Если
+    копии изображения еще не созданы, возвращается пустой список, и шаблон выводит исходное изображение.
+
+    Параметры:
+        filename (str | None): Имя исходного файла изображения (None, если у тура нет изображения).
+
+    Возвращает:
+        list[dict]: Словари с ключами type (MIME-тип), srcset и src (копия card или наибольшая копия, если
+            исходное изображение меньше card).
+    """
+    manifest = load_manifest(filename) if filename else None
+    if manifest is None:
+        return []
+    url_prefix = settings.TOUR_IMAGE_VARIANTS_URL + '/'
+    widths = manifest['widths']
+    src_variant = 'card' if 'card' in widths else list(widths)[-1]
+    sources = []
+    for image_format in manifest['formats']:
+        srcset = ', '.join(
+            f'{url_prefix}{variant_filename(filename, variant, image_format)} {width}w'
+            for variant, width in widths.items()
+        )
+        sources.append({'type': FORMATS[image_format][1], 'srcset': srcset,
+                        'src': url_prefix + variant_filename(filename, src_variant, image_format)})
+    return sources
+
+
+def backfill(force: bool = False) -> int:
+    """
+    Создает копии для всех изображений в каталоге изображений туров.
+
+    Параметры:
+        force (bool): Пересоздать уже существующие копии.
+
+    Возвращает:
+        int: Количество обработанных изображений.
+    """
+    processed = 0
+    for entry in sorted(os.scandir(settings.TOUR_IMAGE_DIR), key=lambda item: item.name):
+        # Временные файлы загрузок, которые еще записываются (images/storage.py)
+        if not entry.is_file() or entry.name.startswith(UPLOAD_TEMP_PREFIX):
+            continue
+        try:
+            process_image(entry.name, force=force)
+            processed += 1
+        except OSError:
+            logger.exception("Не удалось обработать изображение %s", entry.name)
+    return processed
+
+
+if __name__ == '__main__':
+    from log_settings.log_settings import setup_logging
+
+    setup_logging()
+    parser = argparse.ArgumentParser(description='Создание уменьшенных копий изображений туров')
+    parser.add_argument('--force', action='store_true', help='Пересоздать существующие копии')
+    arguments = parser.parse_args()
+    print(f"Обработано изображений: {backfill(force=arguments.force)}")
@@ -0,0 +1,142 @@
+"""
+Этот файл содержит хранение загружаемых изображений туров.
+
+Файл записывается на диск блоками через асинхронный файловый ввод-вывод, не блокируя цикл событий, с проверкой
+максимального размера. Имя файла формируется по хешу содержимого (SHA-256), поэтому одинаковые изображения
+хранятся один раз, а изображения с одинаковым исходным именем не перезаписывают друг друга. Файл удаляется
+только тогда, когда на него не ссылается ни один тур.
+
+Ссылка на файл появляется только после фиксации транзакции тура, а удаление выполняет фоновая задача другого
+запроса. Чтобы задача не удалила файл, который повторно загружен, но еще не записан в тур, каждое сохранение
+обновляет время изменения файла, а файлы, сохраненные позже IMAGE_RELEASE_GRACE_SECONDS назад, не удаляются.
+"""
+
+import hashlib
+import logging
+import os
+import time
+import uuid
+from pathlib import Path
+import anyio
+from fastapi import HTTPException, UploadFile
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from database.db import TourTable
+from images.processing import UPLOAD_TEMP_PREFIX, delete_variants
+from metrics.metrics import observe_upload
+from settings import settings
+
+# Настройка логирования
+logger = logging.getLogger('log')
+
+
+async def save_upload(upload: UploadFile) -> tuple[str, bool]:
+    """
+    Сохраняет загруженное изображение под именем, вычисленным по его содержимому.
+
+    Файл сначала записывается во временный файл в каталоге изображений, затем атомарно переименовывается.
+    Если файл с таким содержимым уже есть, временный файл удаляется, а время изменения существующего файла
+    обновляется, чтобы ожидающая задача удаления не удалила его до фиксации ссылки (release_image).
+
+    Параметры:
+        upload (UploadFile): Загруженный файл.
+
+    Возвращает:
+        tuple[str, bool]: Имя сохраненного файла и признак того, что файл создан впервые.
+
+    Исключения:
+        HTTPException: 415, если расширение файла не поддерживается; 413, если файл больше MAX_UPLOAD_SIZE.
+    """
+    extension = Path(upload.filename or '').suffix.lower()
+    if extension not in settings.ALLOWED_IMAGE_EXTENSIONS:
+        logger.warning("Загружен файл с неподдерживаемым расширением: %s", upload.filename)
+        raise HTTPException(status_code=415, detail="Неподдерживаемый формат изображения")
+    if upload.size is not None and upload.size > settings.MAX_UPLOAD_SIZE:
+        logger.warning("Загружен слишком большой файл: %s байт", upload.size)
+        raise HTTPException(status_code=413, detail="Слишком большой файл изображения")
+
+    await anyio.Path(settings.TOUR_IMAGE_DIR).mkdir(parents=True, exist_ok=True)
+    temp_path = os.path.join(settings.TOUR_IMAGE_DIR, f'{UPLOAD_TEMP_PREFIX}{uuid.uuid4().hex}.tmp')
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async with await anyio.open_file(temp_path, 'wb') as buffer:
+            while chunk := await upload.read(settings.UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > settings.MAX_UPLOAD_SIZE:
+                    logger.warning("Загружен слишком большой файл: более %s байт", settings.MAX_UPLOAD_SIZE)
+                    raise HTTPException(status_code=413, detail="Слишком большой файл изображения")
+                digest.update(chunk)
+                await buffer.write(chunk)
+
+        observe_upload(size)
+        filename = f'{digest.hexdigest()[:32]}{extension}'
+        final_path = anyio.Path(settings.TOUR_IMAGE_DIR, filename)
+        if await final_path.exists():
+            await anyio.Path(temp_path).unlink()
+            await final_path.touch()
+            logger.debug("Изображение %s уже сохранено, используется существующий файл", filename)
+            return filename, False
+        await anyio.Path(temp_path).replace(final_path)
+        logger.info("Сохранено изображение %s (%s байт)", filename, size)
+        return filename, True
+    except BaseException:
+        await anyio.Path(temp_path).unlink(missing_ok=True)
+        raise
+
+
+def _delete_image_files(filename: str, min_age: float) -> float:
+    """
+    Удаляет файл изображения и все его уменьшенные копии, если файл не сохранялся последние min_age секунд.
+
+    Параметры:
+        filename (str): Имя файла изображения.
+        min_age (float): Минимальное время в секундах с последнего сохранения файла.
+
+    Возвращает:
+        float: 0, если файл удален (или уже отсутствовал), иначе время в секундах, через которое его можно
+            будет удалить.
+    """
+    path = os.path.join(settings.TOUR_IMAGE_DIR, filename)
+    try:
+        remaining = min_age - (time.time() - os.stat(path).st_mtime)
+        if remaining > 0:
+            return remaining
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    delete_variants(filename)
+    return 0.0
+
+
+async def release_image(session: AsyncSession, filename: str,
+                        min_age: float = settings.IMAGE_RELEASE_GRACE_SECONDS) -> float:
+    """
+    Удаляет файл изображения, если на него больше не ссылается ни один тур.
+
+    Вызывается после фиксации транзакции, которая убрала ссылку на изображение. Количество ссылок
+    считается по индексу ix_tours_image. Файл, сохраненный менее min_age секунд назад, не удаляется: его мог
+    повторно загрузить запрос, который еще не зафиксировал ссылку на него.
+
+    Параметры:
+        session (AsyncSession): Асинхронная сессия базы данных.
+        filename (str): Имя файла изображения.
+        min_age (float): Минимальное время в секундах с последнего сохранения файла (0 - удалить сразу,
+            например, загрузку запроса, завершившегося ошибкой).
+
+    Возвращает:
+        float: 0, если файл удален или на него ссылаются туры; иначе время в секундах, после которого
+            проверку нужно повторить (файл сохранен недавно).
+    """
+    references = await session.scalar(select(func.count()).where(TourTable.image == filename))
+    if references:
+        logger.debug("Изображение %s используется турами: %s", filename, references)
+        return 0.0
+    remaining = await run_in_threadpool(_delete_image_files, filename, min_age)
+    if remaining:
+        logger.info("Изображение %s сохранено недавно и может использоваться новым туром, проверка через %.0f с",
+                    filename, remaining)
+        return remaining
+    logger.info("Изображение %s удалено", filename)
+    return 0.0
@@ -0,0 +1,265 @@
+"""
+Этот файл содержит очередь фоновых задач: работу, которую не нужно выполнять до ответа на запрос
+(создание уменьшенных копий изображений, удаление файлов, обновление индексов).
+
+Задачи хранятся в таблице jobs базы данных и добавляются в той же транзакции, что и изменение, которое их
+вызвало: задача появляется, только если изменение зафиксировано, и не теряется при перезапуске приложения.
+Задачи выполняют воркеры (JOB_WORKERS задач asyncio в каждом процессе приложения или отдельный процесс
+python -m jobs.worker). Воркер забирает задачу одним запросом UPDATE ... RETURNING, поэтому одну задачу не
+выполнят два воркера, в том числе из разных процессов. Неудачная попытка повторяется с удваивающейся
+задержкой, после JOB_MAX_ATTEMPTS попыток задача получает статус 'failed' и остается в таблице для разбора.
+Задача прерванного процесса выполняется заново через JOB_LEASE_SECONDS.
+
+Обработчики задач регистрируются декоратором job_handler (jobs/tasks.py).
+"""
+
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Optional
+from sqlalchemy import func, select, update, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.db import AsyncSessionLocal, JobTable, utcnow
+from metrics.metrics import job_duration_seconds, job_latency_seconds, job_queue_depth, jobs_total
+from settings import settings
+
+# Настройка логирования
+logger = logging.getLogger('log')
+
+# Статусы задач в таблице jobs (выполненные задачи удаляются)
+STATUSES = ('pending', 'running', 'failed')
+# Максимальная длина текста ошибки, сохраняемого в задаче
+MAX_ERROR_LENGTH = 2000
+
+# Обработчики задач: тип задачи -> асинхронная функция, принимающая параметры задачи
+_handlers: dict[str, Callable[..., Awaitable[Any]]] = {}
+
+
+def job_handler(kind: str) -> Callable:
+    """
+    Декоратор, регистрирующий асинхронную функцию как обработчик задач указанного типа.
+
+    Параметры:
+        kind (str): Тип задачи.
+
+    Возвращает:
+        Callable: Декоратор.
+    """
+    def decorator(function: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        _handlers[kind] = function
+        return function
+
+    return decorator
+
+
+def enqueue_job(session: AsyncSession, kind: str, *, run_at: Optional[datetime] = None, **payload: Any):
+    """
+    Добавляет задачу в сессию; задача сохраняется при фиксации транзакции вместе с остальными изменениями.
+
+    После фиксации следует вызвать job_queue.wake(), чтобы воркеры этого процесса сразу начали выполнение.
+
+    Параметры:
+        session (AsyncSession): Сессия базы данных запроса.
+        kind (str): Тип задачи.
+        run_at (datetime | None): Время (UTC), не раньше которого задача будет выполнена; по умолчанию - сразу.
+        payload (Any): Параметры задачи (значения, сериализуемые в JSON).
+    """
+    session.add(JobTable(kind=kind, payload=json.dumps(payload, ensure_ascii=False),
+                         max_attempts=settings.JOB_MAX_ATTEMPTS, run_at=run_at or utcnow()))
+
+
+class JobQueue:
+    """
+    Пул воркеров, выполняющих задачи из таблицы jobs.
+    """
+
+    def __init__(self):
+        self._wakeup = asyncio.Event()
+        self._workers: list[asyncio.Task] = []
+        self._stopping = False
+
+    def wake(self):
+        """
+        Сообщает воркерам о новых задачах.
+        """
+        self._wakeup.set()
+
+    def start(self, workers: int = settings.JOB_WORKERS):
+        """
+        Запускает воркеры в текущем цикле событий.
+
+        Параметры:
+            workers (int): Количество воркеров.
+        """
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(workers)]
+        if workers:
+            logger.info("Запущено воркеров фоновых задач: %s", workers)
+
+    async def stop(self, timeout: float = 10):
+        """
+        Останавливает воркеры: выполняемые задачи завершаются в течение timeout секунд, затем воркеры
+        отменяются (их задачи будут выполнены заново после JOB_LEASE_SECONDS).
+
+        Параметры:
+            timeout (float): Время ожидания завершения выполняемых задач в секундах.
+        """
+        self._stopping = True
+        self._wakeup.set()
+        if not self._workers:
+            return
+        _, pending = await asyncio.wait(self._workers, timeout=timeout)
+        for worker in pending:
+            worker.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        self._workers = []
+
+    async def _worker(self):
+        """
+        Цикл воркера: выполняет готовые задачи, а при их отсутствии ждет новых задач или JOB_POLL_INTERVAL.
+        """
+        while not self._stopping:
+            self._wakeup.clear()
+            try:
+                job = await self.claim()
+            except Exception:
+                logger.exception("Не удалось получить фоновую задачу")
+                job = None
+            if job is not None:
+                await self.execute(job)
+                continue
+            try:
+                await self.refresh_depth()
+            except Exception:
+                logger.exception("Не удалось подсчитать фоновые задачи")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), settings.JOB_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    async def claim(self) -> Optional[dict]:
+        """
+        Забирает следующую готовую задачу: ожидающую, время запуска которой наступило, или прерванную.
+
+        Задача получает статус 'running', а время run_at переносится на JOB_LEASE_SECONDS вперед.
+
+        Возвращает:
+            dict | None: Задача (id, kind, payload, attempts, max_attempts, created_at) или None.
+        """
+        now = utcnow()
+        candidate = (
+            select(JobTable.id)
+            .where(JobTable.status.in_(('pending', 'running')), JobTable.run_at <= now)
+            .order_by(JobTable.run_at, JobTable.id)
+            .limit(1)
+            .scalar_subquery()
+        )
+        query = (
+            update(JobTable)
+            .where(JobTable.id == candidate)
+            .values(status='running', attempts=JobTable.attempts + 1,
+                    run_at=now + timedelta(seconds=settings.JOB_LEASE_SECONDS))
+            .returning(JobTable.id, JobTable.kind, JobTable.payload, JobTable.attempts, JobTable.max_attempts,
+                       JobTable.created_at)
+        )
+        async with AsyncSessionLocal() as session:
+            job = (await session.execute(query)).mappings().one_or_none()
+            await session.commit()
+        return dict(job) if job is not None else None
+
+    async def execute(self, job: dict) -> bool:
+        """
+        Выполняет задачу и записывает результат: выполненная задача удаляется, неудачная повторяется позже
+        или получает статус 'failed'.
+
+        Параметры:
+            job (dict): Задача, полученная методом claim.
+
+        Возвращает:
+            bool: True, если задача выполнена.
+        """
+        kind = job['kind']
+        started = time.perf_counter()
+        try:
+            handler = _handlers.get(kind)
+            if handler is None:
+                raise LookupError(f"Нет обработчика задач типа {kind}")
+            await handler(**json.loads(job['payload']))
+        except Exception as error:
+            job_duration_seconds.observe(time.perf_counter() - started, kind)
+            await self._record_failure(job, error)
+            return False
+
+        job_duration_seconds.observe(time.perf_counter() - started, kind)
+        job_latency_seconds.observe((utcnow() - job['created_at']).total_seconds(), kind)
+        jobs_total.inc(kind, 'done')
+        async with AsyncSessionLocal() as session:
+            await session.execute(delete(JobTable).where(JobTable.id == job['id']))
+            await session.commit()
+        logger.debug("Фоновая задача %s (%s) выполнена", job['id'], kind)
+        return True
+
+    async def _record_failure(self, job: dict, error: Exception):
+        """
+        Записывает неудачную попытку: назначает повтор с удваивающейся задержкой или, если попытки исчерпаны
+        (или для задачи нет обработчика), переводит задачу в статус 'failed'.
+        """
+        kind = job['kind']
+        final = job['attempts'] >= job['max_attempts'] or kind not in _handlers
+        values = {'last_error': f'{type(error).__name__}: {error}'[:MAX_ERROR_LENGTH]}
+        if final:
+            values['status'] = 'failed'
+            jobs_total.inc(kind, 'failed')
+            logger.error("Фоновая задача %s (%s) не выполнена после %s попыток: %s",
+                         job['id'], kind, job['attempts'], error, exc_info=error)
+        else:
+            delay = settings.JOB_RETRY_DELAY * 2 ** (job['attempts'] - 1)
+            values['status'] = 'pending'
+            values['run_at'] = utcnow() + timedelta(seconds=delay)
+            jobs_total.inc(kind, 'retry')
+            logger.warning("Фоновая задача %s (%s) завершилась ошибкой, повтор через %s с: %s",
+                           job['id'], kind, delay, error)
+        async with AsyncSessionLocal() as session:
+            await session.execute(update(JobTable).where(JobTable.id == job['id']).values(**values))
+            await session.commit()
+
+    async def refresh_depth(self) -> dict[str, int]:
+        """
+        Подсчитывает задачи по статусам и обновляет метрику job_queue_depth.
+
+        Возвращает:
+            dict[str, int]: Количество задач по статусам.
+        """
+        async with AsyncSessionLocal() as session:
+            rows = await session.execute(select(JobTable.status, func.count()).group_by(JobTable.status))
+        counts = dict.fromkeys(STATUSES, 0)
+        counts.update(dict(rows.all()))
+        for status, count in counts.items():
+            job_queue_depth.set(count, status)
+        return counts
+
+    async def stats(self) -> dict:
+        """
+        Возвращает количество задач по статусам и последние невыполненные задачи.
+
+        Возвращает:
+            dict: Количество задач по статусам (counts) и до 20 последних задач со статусом 'failed' (failed).
+        """
+        counts = await self.refresh_depth()
+        async with AsyncSessionLocal() as session:
+            failed = await session.execute(
+                select(JobTable.id, JobTable.kind, JobTable.payload, JobTable.attempts, JobTable.created_at,
+                       JobTable.last_error)
+                .where(JobTable.status == 'failed')
+                .order_by(JobTable.id.desc())
+                .limit(20)
+            )
+            failed_jobs = [dict(row) for row in failed.mappings()]
+        return {'counts': counts, 'failed': failed_jobs}
+
+
+# Общая очередь фоновых задач процесса
+job_queue = JobQueue()
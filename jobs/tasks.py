@@ -0,0 +1,84 @@
+"""
+Этот файл содержит обработчики фоновых задач (jobs/queue.py):
+    - process_image: создание уменьшенных копий изображения тура;
+    - release_image: удаление изображения, на которое больше не ссылаются туры;
+    - optimize_search_index: объединение сегментов полнотекстового индекса после массового импорта.
+
+Обработчики должны быть идемпотентными: задача прерванного процесса или задача, завершившаяся ошибкой,
+выполняется повторно.
+"""
+
+import logging
+from datetime import timedelta
+from sqlalchemy import text, update
+from starlette.concurrency import run_in_threadpool
+from cache.cache import tour_cache
+from database.db import AsyncSessionLocal, TourTable, utcnow
+from images.processing import process_image
+from images.storage import release_image
+from jobs.queue import enqueue_job, job_handler
+from snapshot.snapshot import snapshot_updater
+
+# Настройка логирования
+logger = logging.getLogger('log')
+
+
+@job_handler('process_image')
+async def process_image_job(filename: str):
+    """
+    Создает уменьшенные копии изображения и увеличивает версию туров с этим изображением.
+
+    Карточки и страницы туров, отрисованные до появления копий, выводят исходное изображение; новая версия
+    тура делает недействительными кеш карточек, ETag страниц и подписи страниц статической копии.
+
+    Параметры:
+        filename (str): Имя файла изображения.
+    """
+    await run_in_threadpool(process_image, filename)
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            update(TourTable)
+            .where(TourTable.image == filename)
+            .values(version=TourTable.version + 1, updated_at=utcnow())
+            .returning(TourTable.id)
+            .execution_options(synchronize_session=False)
+        )
+        tour_ids = result.scalars().all()
+        await session.commit()
+    for tour_id in tour_ids:
+        await tour_cache.invalidate_tour(tour_id)
+    if tour_ids:
+        snapshot_updater.request_update()
+    logger.info("Обновлена версия туров с изображением %s: %s", filename, len(tour_ids))
+
+
+@job_handler('release_image')
+async def release_image_job(filename: str):
+    """
+    Удаляет файл изображения и его копии, если на него больше не ссылается ни один тур.
+
+    Недавно сохраненный файл может ожидать фиксации ссылки из другого запроса, поэтому для него добавляется
+    новая задача на время окончания IMAGE_RELEASE_GRACE_SECONDS.
+
+    Параметры:
+        filename (str): Имя файла изображения.
+    """
+    async with AsyncSessionLocal() as session:
+        retry_after = await release_image(session, filename)
+        if retry_after:
+            enqueue_job(session, 'release_image', run_at=utcnow() + timedelta(seconds=retry_after + 1),
+                        filename=filename)
+            await session.commit()
+
+
+@job_handler('optimize_search_index')
+async def optimize_search_index_job():
+    """
+    Объединяет сегменты полнотекстового индекса туров (FTS5 optimize).
+
+    После массового импорта индекс состоит из множества сегментов, и поиск читает каждый из них.
+    """
+    async with AsyncSessionLocal() as session:
+        await session.execute(text("INSERT INTO tours_fts (tours_fts) VALUES ('optimize')"))
+        await session.commit()
+    logger.info("Полнотекстовый индекс туров оптимизирован")
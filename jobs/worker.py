@@ -0,0 +1,48 @@
+"""
+Этот файл содержит запуск воркеров фоновых задач в отдельном процессе (без веб-приложения).
+
+Отдельный процесс используется, если в процессах приложения воркеры отключены (JOB_WORKERS=0), или для
+выполнения накопившихся задач. Запуск из корня проекта:
+    python -m jobs.worker [--workers N] [--drain]
+"""
+
+import argparse
+import asyncio
+from database.db import async_engine
+from jobs.queue import job_queue
+from settings import settings
+import jobs.tasks  # noqa: F401 - регистрация обработчиков фоновых задач
+
+
+async def run_worker(workers: int, drain: bool):
+    """
+    Выполняет фоновые задачи до остановки процесса.
+
+    Параметры:
+        workers (int): Количество воркеров.
+        drain (bool): Выполнить готовые задачи и завершиться, не дожидаясь новых.
+    """
+    try:
+        if drain:
+            while (job := await job_queue.claim()) is not None:
+                await job_queue.execute(job)
+            return
+        job_queue.start(workers)
+        await asyncio.Event().wait()
+    finally:
+        await job_queue.stop()
+        await async_engine.dispose()
+
+
+if __name__ == '__main__':
+    from log_settings.log_settings import setup_logging
+
+    setup_logging()
+    parser = argparse.ArgumentParser(description='Выполнение фоновых задач из таблицы jobs')
+    parser.add_argument('--workers', type=int, default=max(settings.JOB_WORKERS, 1), help='Количество воркеров')
+    parser.add_argument('--drain', action='store_true', help='Выполнить готовые задачи и завершиться')
+    args = parser.parse_args()
+    try:
+        asyncio.run(run_worker(args.workers, args.drain))
+    except KeyboardInterrupt:
+        pass
@@ -1,13 +1,73 @@
 """
 Этот файл содержит настройки логирования для приложения. Он определяет конфигурацию логирования,
 такую как уровень логирования, формат сообщений и обработчики.
+
+Запись в файл выполняется в отдельном потоке: логгер приложения передает записи в очередь (QueueHandler),
+а поток QueueListener форматирует их и записывает в файл с ротацией. Поэтому обработчики запросов
+не блокируют цикл событий на записи на диск. Уровень и формат логов зависят от окружения (см. settings).
 """
 
-# Импортируем класс Path из модуля pathlib для работы с файловыми путями.
-from pathlib import Path
+# Импортируем модули для работы с JSON, очередью и обработчиками логирования.
+import atexit
+import copy
+import json
+import logging
+import logging.config
+import queue
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+from settings import settings
+
+# Атрибуты стандартной записи лога; остальные атрибуты (переданные через extra) выводятся в JSON отдельными полями.
+RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Форматтер, записывающий каждое сообщение одной строкой JSON.
+
+    Помимо времени, уровня, модуля и текста сообщения в запись попадают поля, переданные через
+    параметр extra (например, logger.info("...", extra={'tour_id': 1})).
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'module': record.module,
+            'line': record.lineno,
+            'message': record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRIBUTES:
+                entry[key] = value
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class PreparedQueueHandler(QueueHandler):
+    """
+    Обработчик, передающий записи в очередь для записи в отдельном потоке.
+
+    В отличие от стандартного QueueHandler не форматирует запись целиком в потоке приложения: подставляются
+    только аргументы сообщения и текст исключения, а итоговый формат (текст или JSON) применяет
+    обработчик файла в потоке QueueListener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
 
-# Определяем BASE_DIR как путь к директории, в которой находится текущий файл, с разрешением на абсолютный путь.
-BASE_DIR = Path(__file__).resolve().parent.parent
 
 # Определяем словарь конфигурации для логирования.
 LOGGING = {
@@ -23,6 +83,9 @@ LOGGING = {
             # Указываем стиль форматирования (используем фигурные скобки).
             'style': '{',
         },
+        'json_format': {  # Форматтер для структурированных логов (одна запись JSON на строку).
+            '()': JsonFormatter,
+        },
     },
 
     'handlers': {  # Определяем обработчики логирования, которые будут записывать сообщения.
@@ -31,23 +94,67 @@ LOGGING = {
             # Применяем форматтер 'main_format' к этому обработчику.
             'formatter': 'main_format',
         },
-        'file': {  # Обработчик для записи логов в файл.
+        'file': {  # Обработчик для записи логов в файл с ротацией по размеру.
             # Указываем класс обработчика для записи в файл.
-            'class': 'logging.FileHandler',
-            # Применяем форматер 'main_format' к этому обработчику.
-            'formatter': 'main_format',
-            # Указываем имя файла для записи логов, используя BASE_DIR.
-            'filename': BASE_DIR / 'logs.log'
+            'class': 'logging.handlers.RotatingFileHandler',
+            # Применяем форматтер в зависимости от настройки LOG_FORMAT.
+            'formatter': 'json_format' if settings.LOG_FORMAT == 'json' else 'main_format',
+            # Указываем имя файла для записи логов.
+            'filename': settings.LOG_FILE,
+            # Размер файла, после которого начинается новый файл, и количество хранимых файлов.
+            'maxBytes': settings.LOG_MAX_BYTES,
+            'backupCount': settings.LOG_BACKUP_COUNT,
+            'encoding': 'utf-8',
+            # Файл открывается при первой записи (в потоке QueueListener).
+            'delay': True,
         },
     },
 
     'loggers': {  # Определяем логгеры, которые будут использоваться в приложении.
         'log': {  # Имя логгера.
-            # Указываем, что логгер будет использовать обработчик 'file'.
+            # Указываем, что логгер будет использовать обработчик 'file' (через очередь, см. setup_logging).
             'handlers': ['file'],
-            'level': 'DEBUG',  # Устанавливаем уровень логирования на 'DEBUG'.
+            # Уровень логирования зависит от окружения (DEBUG при разработке, INFO в production).
+            'level': settings.LOG_LEVEL,
             # Указываем, что сообщения этого логгера будут передаваться родительским логгерам.
             'propagate': True,
         },
     },
 }
+
+# Поток записи логов, запущенный setup_logging
+_listener: Optional[QueueListener] = None
+
+
+def _stop_listener():
+    """
+    Останавливает поток записи логов, дождавшись записи всех сообщений из очереди.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def setup_logging():
+    """
+    Применяет конфигурацию LOGGING и переводит обработчики логгера приложения на запись через очередь.
+
+    Обработчики из конфигурации передаются потоку QueueListener, а логгер получает вместо них
+    PreparedQueueHandler. Поток останавливается при завершении процесса, дописав оставшиеся записи.
+    Повторный вызов перезапускает поток с новой конфигурацией.
+    """
+    global _listener
+    _stop_listener()
+    logging.config.dictConfig(LOGGING)
+    logger = logging.getLogger('log')
+    handlers = logger.handlers[:]
+    log_queue = queue.SimpleQueue()
+    for handler in handlers:
+        logger.removeHandler(handler)
+    logger.addHandler(PreparedQueueHandler(log_queue))
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+
+atexit.register(_stop_listener)
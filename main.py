@@ -2,35 +2,85 @@
 Этот файл является основным файлом приложения на FastAPI.
 """
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
-from fastapi.templating import Jinja2Templates
-from fastapi.staticfiles import StaticFiles
-from database.db import create_tables
+from fastapi.responses import ORJSONResponse, PlainTextResponse
+from starlette.concurrency import run_in_threadpool
+from assets.assets import PrecompressedStaticFiles, build_assets
+from database.db import async_engine
+from database.migrations import run_migrations
+from jobs.queue import job_queue
+from metrics.metrics import MetricsMiddleware, registry
+from profiling.profiling import ProfilingMiddleware
+from settings import settings
+from templating.templating import templates, warm_up_templates
+from utils.admission import AdmissionMiddleware
+from utils.compression import CompressionMiddleware
 from routers.routers_for_admin import router as admin_routers
 from routers.routers_for_views import router as views_routers
+from routers.routers_for_booking import router as booking_routers
+import jobs.tasks  # noqa: F401 - регистрация обработчиков фоновых задач
+from fastapi.exception_handlers import http_exception_handler as json_http_exception_handler
 from starlette.exceptions import HTTPException as StarletteHTTPException
-import logging.config
-from log_settings.log_settings import LOGGING
+import logging
+from log_settings.log_settings import setup_logging
 
 # Настройка логирования
-logging.config.dictConfig(LOGGING)
+setup_logging()
 logger = logging.getLogger('log')
 
-# Инициализация шаблонов Jinja2
-templates = Jinja2Templates(directory='templates')
 
-# Создание таблиц в базе данных
-create_tables()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Управляет жизненным циклом приложения.
+
+    При запуске применяет недостающие миграции базы данных и собирает статические файлы (если это не
+    отключено настройками DB_MIGRATE_ON_STARTUP и STATIC_BUILD_ON_STARTUP), загружает шаблоны Jinja2 и
+    запускает воркеры фоновых задач; при остановке дожидается выполняемых задач и закрывает соединения пула.
+
+    Параметры:
+        app (FastAPI): Экземпляр приложения.
+    """
+    if settings.DB_MIGRATE_ON_STARTUP:
+        await run_in_threadpool(run_migrations)
+    if settings.STATIC_BUILD_ON_STARTUP:
+        await run_in_threadpool(build_assets)
+    await run_in_threadpool(warm_up_templates)
+    job_queue.start()
+    yield
+    await job_queue.stop()
+    await async_engine.dispose()
+
+
+# Инициализация приложения FastAPI (ответы JSON сериализуются orjson)
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+
+# Сжатие ответов (brotli, gzip) по заголовку Accept-Encoding
+app.add_middleware(CompressionMiddleware)
+
+# Запись медленных запросов и профилирование запросов по требованию (/admin/profiles_admin)
+if settings.PROFILE_TOKEN or settings.PROFILE_SLOW_REQUEST_MS > 0:
+    app.add_middleware(ProfilingMiddleware)
 
-# Инициализация приложения FastAPI
-app = FastAPI()
+# Ограничение частоты запросов клиентов и количества одновременно обрабатываемых запросов (ответы 429 и 503)
+if settings.ADMISSION_ENABLED:
+    app.add_middleware(AdmissionMiddleware)
 
-# Подключение статических файлов
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# Учет времени обработки запросов и запросов к базе данных для /metrics
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+# Подключение статических файлов (собранные файлы отдаются сжатыми и с долгим кешированием)
+app.mount("/static", PrecompressedStaticFiles(directory=settings.STATIC_DIR), name="static")
 
 # Подключение маршрутов для администраторов и для просмотра
 app.include_router(admin_routers)
 app.include_router(views_routers)
+app.include_router(booking_routers)
+
+# Префиксы маршрутов API, ошибки которых возвращаются в формате JSON, а не HTML-страницей
+API_PREFIXES = ('/admin/', '/booking/')
 
 
 @app.get('/')
@@ -48,10 +98,24 @@ async def welcome_page(request: Request):
     return templates.TemplateResponse('base_page.html', {'request': request})
 
 
+@app.get('/metrics', include_in_schema=False)
+async def metrics():
+    """
+    Отдает метрики приложения в текстовом формате Prometheus.
+
+    Возвращает:
+        PlainTextResponse: Метрики текущего процесса.
+    """
+    return PlainTextResponse(registry.expose(), media_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 @app.exception_handler(StarletteHTTPException)
 async def http_exception_handler(request, exc):
     """
-    Обработчик исключений для несуществующих URL.
+    Обработчик исключений для несуществующих URL и других ошибок HTTP.
+
+    Страница ошибки возвращается с кодом состояния исключения (404, 413 и т.д.). Для маршрутов API
+    (админ-панель, бронирование) ошибка возвращается в формате JSON.
 
     Параметры:
         request (Request): Объект запроса.
@@ -60,8 +124,11 @@ async def http_exception_handler(request, exc):
     Возвращает:
         TemplateResponse: Шаблон страницы ошибки с контекстом запроса.
     """
-    logger.warning(f"Запрошен несуществующий адрес URL: {request.url}")
+    if request.url.path.startswith(API_PREFIXES):
+        logger.warning("Ошибка %s при обращении к API: %s - %s", exc.status_code, request.url, exc.detail)
+        return await json_http_exception_handler(request, exc)
+    logger.warning("Запрошен несуществующий адрес URL: %s", request.url)
     context = {
         'request': request,
     }
-    return templates.TemplateResponse('error_page.html', context)
+    return templates.TemplateResponse('error_page.html', context, status_code=exc.status_code)
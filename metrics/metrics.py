@@ -0,0 +1,383 @@
+"""
+Этот файл содержит метрики приложения в формате Prometheus (text exposition format) и средства их сбора.
+
+Собираются:
+    - время обработки HTTP-запросов по маршрутам (гистограммы) и количество ответов по кодам состояния;
+    - количество и суммарное время запросов к базе данных на один HTTP-запрос и время отдельных запросов;
+    - время отрисовки шаблонов Jinja2;
+    - объем загруженных изображений;
+    - очередь фоновых задач: количество задач, время выполнения и задержка от создания до выполнения;
+    - контроль нагрузки: принятые и отклоненные запросы по классам.
+
+Метрики хранятся в памяти процесса; при запуске нескольких воркеров каждый из них отдает свои значения.
+Запись значения - это поиск по словарю и bisect по границам корзин под блокировкой, поэтому сбор метрик
+можно оставлять включенным в production.
+"""
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Iterable, Iterator, Optional
+from jinja2 import Template
+from profiling.profiling import record_template
+
+# Границы корзин гистограмм времени (в секундах)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Границы корзин гистограмм количества запросов к базе данных на один HTTP-запрос
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50)
+# Границы корзин гистограммы размера загруженных файлов (в байтах)
+SIZE_BUCKETS = (16 * 1024, 64 * 1024, 256 * 1024, 1024 * 1024, 4 * 1024 * 1024, 16 * 1024 * 1024)
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = '') -> str:
+    """
+    Формирует строку меток Prometheus: {name="value",...}.
+    """
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value: str) -> str:
+    """
+    Экранирует значение метки по правилам формата Prometheus.
+    """
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    """
+    Приводит число к виду, принятому в формате Prometheus.
+    """
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric(ABC):
+    """
+    Базовый класс метрики с набором меток.
+
+    Атрибуты:
+        name (str): Имя метрики.
+        documentation (str): Описание метрики (строка HELP).
+        label_names (tuple[str, ...]): Имена меток.
+    """
+    metric_type = 'untyped'
+
+    def __init__(self, name: str, documentation: str, label_names: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def expose(self) -> list[str]:
+        """
+        Возвращает строки метрики в формате Prometheus.
+        """
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.metric_type}']
+        lines.extend(self._samples())
+        return lines
+
+    @abstractmethod
+    def _samples(self) -> list[str]:
+        """
+        Возвращает строки значений метрики (без строк HELP и TYPE).
+        """
+
+
+class Counter(Metric):
+    """
+    Монотонно возрастающий счетчик.
+    """
+    metric_type = 'counter'
+
+    def __init__(self, name: str, documentation: str, label_names: Iterable[str] = ()):
+        super().__init__(name, documentation, label_names)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1):
+        """
+        Увеличивает счетчик для заданных значений меток.
+
+        Параметры:
+            labels (str): Значения меток в порядке label_names.
+            amount (float): Величина увеличения.
+        """
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return [f'{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}'
+                for labels, value in values]
+
+
+class Gauge(Counter):
+    """
+    Значение, которое может увеличиваться и уменьшаться.
+    """
+    metric_type = 'gauge'
+
+    def dec(self, *labels: str, amount: float = 1):
+        """
+        Уменьшает значение для заданных значений меток.
+        """
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels: str):
+        """
+        Устанавливает значение для заданных значений меток.
+        """
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(Metric):
+    """
+    Гистограмма с фиксированными границами корзин.
+
+    Атрибуты:
+        buckets (tuple[float, ...]): Верхние границы корзин (по возрастанию).
+    """
+    metric_type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, label_names: Iterable[str] = (),
+                 buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(buckets)
+        # Для каждого набора меток: количества по корзинам (последняя - +Inf), сумма значений
+        self._values: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, *labels: str):
+        """
+        Добавляет наблюдение.
+
+        Параметры:
+            value (float): Наблюдаемое значение.
+            labels (str): Значения меток в порядке label_names.
+        """
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+            entry[0][index] += 1
+            entry[1][0] += value
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            values = [(labels, list(counts), total[0]) for labels, (counts, total) in self._values.items()]
+        lines = []
+        for labels, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = _format_labels(self.label_names, labels, f'le="{_format_value(bound)}"')
+                lines.append(f'{self.name}_bucket{le} {cumulative}')
+            label_text = _format_labels(self.label_names, labels)
+            lines.append(f'{self.name}_sum{label_text} {_format_value(total)}')
+            lines.append(f'{self.name}_count{label_text} {cumulative}')
+        return lines
+
+
+class Registry:
+    """
+    Набор метрик приложения.
+    """
+
+    def __init__(self):
+        self._metrics: list[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        """
+        Добавляет метрику в набор и возвращает ее.
+        """
+        self._metrics.append(metric)
+        return metric
+
+    def expose(self) -> str:
+        """
+        Возвращает все метрики в формате Prometheus.
+        """
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.expose())
+        return '\n'.join(lines) + '\n'
+
+
+# Общий набор метрик приложения
+registry = Registry()
+
+http_requests_total = registry.register(Counter(
+    'http_requests_total', 'Количество обработанных HTTP-запросов.', ('method', 'route', 'status')))
+http_request_duration_seconds = registry.register(Histogram(
+    'http_request_duration_seconds', 'Время обработки HTTP-запроса в секундах.', ('method', 'route')))
+http_requests_in_progress = registry.register(Gauge(
+    'http_requests_in_progress', 'Количество HTTP-запросов, обрабатываемых в данный момент.'))
+db_query_duration_seconds = registry.register(Histogram(
+    'db_query_duration_seconds', 'Время выполнения одного запроса к базе данных в секундах.'))
+db_queries_per_request = registry.register(Histogram(
+    'db_queries_per_request', 'Количество запросов к базе данных на один HTTP-запрос.', ('route',),
+    buckets=COUNT_BUCKETS))
+db_time_per_request_seconds = registry.register(Histogram(
+    'db_time_per_request_seconds', 'Суммарное время запросов к базе данных на один HTTP-запрос в секундах.',
+    ('route',)))
+template_render_duration_seconds = registry.register(Histogram(
+    'template_render_duration_seconds', 'Время отрисовки шаблона Jinja2 в секундах.', ('template',)))
+sse_subscribers = registry.register(Gauge(
+    'sse_subscribers', 'Количество открытых потоков событий об изменении свободных мест.'))
+upload_bytes_total = registry.register(Counter(
+    'upload_bytes_total', 'Суммарный объем загруженных изображений в байтах.'))
+upload_size_bytes = registry.register(Histogram(
+    'upload_size_bytes', 'Размер загруженного изображения в байтах.', buckets=SIZE_BUCKETS))
+admission_requests_total = registry.register(Counter(
+    'admission_requests_total', 'Количество запросов по классам и результату контроля нагрузки (admitted, '
+    'rate_limited, overloaded).', ('class', 'result')))
+admission_in_flight = registry.register(Gauge(
+    'admission_in_flight', 'Количество принятых запросов, обрабатываемых в данный момент, по классам.', ('class',)))
+job_queue_depth = registry.register(Gauge(
+    'job_queue_depth', 'Количество фоновых задач по статусам (pending, running, failed).', ('status',)))
+jobs_total = registry.register(Counter(
+    'jobs_total', 'Количество попыток выполнения фоновых задач по результату (done, retry, failed).',
+    ('kind', 'result')))
+job_duration_seconds = registry.register(Histogram(
+    'job_duration_seconds', 'Время выполнения одной попытки фоновой задачи в секундах.', ('kind',)))
+job_latency_seconds = registry.register(Histogram(
+    'job_latency_seconds', 'Время от создания фоновой задачи до ее выполнения в секундах (с учетом повторов).',
+    ('kind',)))
+
+# Счетчики запросов к базе данных текущего HTTP-запроса: [количество, суммарное время]
+_request_db_stats: ContextVar[Optional[list]] = ContextVar('request_db_stats', default=None)
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    """
+    Обработчик события SQLAlchemy: запоминает время начала запроса к базе данных.
+    """
+    conn.info.setdefault('query_started_at', []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    """
+    Обработчик события SQLAlchemy: учитывает время выполнения запроса к базе данных.
+    """
+    elapsed = time.perf_counter() - conn.info['query_started_at'].pop()
+    db_query_duration_seconds.observe(elapsed)
+    stats = _request_db_stats.get()
+    if stats is not None:
+        stats[0] += 1
+        stats[1] += elapsed
+
+
+def observe_upload(size: int):
+    """
+    Учитывает размер загруженного изображения.
+
+    Параметры:
+        size (int): Размер файла в байтах.
+    """
+    upload_bytes_total.inc(amount=size)
+    upload_size_bytes.observe(size)
+
+
+class TimedTemplate(Template):
+    """
+    Шаблон Jinja2, учитывающий время отрисовки в метрике template_render_duration_seconds и в записи
+    профилирования запроса.
+
+    При потоковой отрисовке (generate) учитывается только время получения частей шаблона, без времени,
+    пока часть передается клиенту.
+    """
+
+    def render(self, *args, **kwargs) -> str:
+        started = time.perf_counter()
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            self._observe(time.perf_counter() - started)
+
+    def generate(self, *args, **kwargs) -> Iterator[str]:
+        pieces = super().generate(*args, **kwargs)
+        elapsed = 0.0
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    piece = next(pieces)
+                except StopIteration:
+                    return
+                finally:
+                    elapsed += time.perf_counter() - started
+                yield piece
+        finally:
+            pieces.close()
+            self._observe(elapsed)
+
+    def _observe(self, elapsed: float):
+        """
+        Записывает время отрисовки шаблона в метрику и в запись профилирования запроса.
+        """
+        template_render_duration_seconds.observe(elapsed, self.name or '<string>')
+        record_template(self.name or '<string>', elapsed)
+
+
+def route_label(scope: dict) -> str:
+    """
+    Возвращает метку маршрута запроса: шаблон пути (например, /views/tours/current_tour/{tour_id}),
+    а не фактический путь, чтобы количество наборов меток не росло с количеством туров.
+
+    Параметры:
+        scope (dict): ASGI scope запроса после маршрутизации.
+
+    Возвращает:
+        str: Метка маршрута.
+    """
+    route = scope.get('route')
+    if route is not None:
+        return getattr(route, 'path', '<unknown>')
+    if scope.get('path', '').startswith('/static/'):
+        return '/static'
+    return '<unmatched>'
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware, учитывающий время обработки и код состояния каждого HTTP-запроса, а также
+    количество и время запросов к базе данных, выполненных при его обработке.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        status = ['500']
+
+        async def send_with_status(message):
+            if message['type'] == 'http.response.start':
+                status[0] = str(message['status'])
+            await send(message)
+
+        stats = [0, 0.0]
+        token = _request_db_stats.set(stats)
+        http_requests_in_progress.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_requests_in_progress.dec()
+            _request_db_stats.reset(token)
+            route = route_label(scope)
+            http_requests_total.inc(scope['method'], route, status[0])
+            http_request_duration_seconds.observe(elapsed, scope['method'], route)
+            db_queries_per_request.observe(stats[0], route)
+            db_time_per_request_seconds.observe(stats[1], route)
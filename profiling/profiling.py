@@ -0,0 +1,308 @@
+"""
+Этот файл содержит профилирование запросов: запись запросов к базе данных, времени отрисовки шаблонов и
+(по требованию) выборочного профиля стека для отдельных HTTP-запросов.
+
+Запись (trace) сохраняется:
+    - по требованию: для запроса с заголовком X-Profile или параметром profile, равным PROFILE_TOKEN. Во время
+      такого запроса отдельный поток каждые PROFILE_SAMPLE_INTERVAL_MS миллисекунд снимает стек потока цикла
+      событий, а номер записи возвращается в заголовке ответа X-Profile-Id;
+    - автоматически: для любого запроса дольше PROFILE_SLOW_REQUEST_MS миллисекунд (без профиля стека).
+
+Каждая запись содержит запросы к базе данных (текст без параметров и время) и время отрисовки шаблонов.
+Записи хранятся в памяти процесса в кольцевом буфере из PROFILE_BUFFER_SIZE записей и доступны по адресу
+/admin/profiles_admin с заголовком X-Profile-Token.
+
+Цикл событий обрабатывает несколько запросов одновременно, поэтому профиль стека может содержать и работу
+других запросов; для точного профиля запрос следует выполнять без параллельной нагрузки.
+"""
+
+import hmac
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Optional
+from urllib.parse import parse_qs
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from settings import settings
+
+# Префиксы путей, медленные запросы к которым не записываются: поток событий открыт долго по назначению,
+# а статические файлы и метрики не обращаются к базе данных
+SLOW_EXEMPT_PREFIXES = ('/views/tours/events', '/static/', '/metrics', '/admin/profiles_admin')
+# Максимальная глубина стека в выборочном профиле
+MAX_STACK_DEPTH = 64
+# Максимальная длина текста запроса к базе данных в записи
+MAX_STATEMENT_LENGTH = 1000
+# Количество стеков и функций в подробной записи
+TOP_STACKS = 100
+TOP_FUNCTIONS = 30
+# Подробные поля записи, которые не выводятся в списке записей
+DETAIL_KEYS = ('sql', 'sql_by_statement', 'templates', 'stacks', 'top_functions')
+
+
+class RequestTrace:
+    """
+    Запись о выполнении HTTP-запроса.
+
+    Атрибуты:
+        sql (list[tuple[str, float]]): Запросы к базе данных и их время в миллисекундах.
+        sql_dropped (int): Количество запросов к базе данных сверх PROFILE_MAX_SQL (не записаны).
+        templates (list[tuple[str, float]]): Отрисованные шаблоны и время отрисовки в миллисекундах.
+    """
+    __slots__ = ('sql', 'sql_dropped', 'templates')
+
+    def __init__(self):
+        self.sql: list[tuple[str, float]] = []
+        self.sql_dropped = 0
+        self.templates: list[tuple[str, float]] = []
+
+
+# Запись текущего HTTP-запроса (None, если запрос не профилируется)
+_current_trace: ContextVar[Optional[RequestTrace]] = ContextVar('current_trace', default=None)
+
+
+def is_enabled() -> bool:
+    """
+    Возвращает True, если профилирование включено (задан PROFILE_TOKEN или порог медленных запросов).
+    """
+    return bool(settings.PROFILE_TOKEN) or settings.PROFILE_SLOW_REQUEST_MS > 0
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    """
+    Обработчик события SQLAlchemy: запоминает время начала запроса к базе данных профилируемого HTTP-запроса.
+    """
+    if _current_trace.get() is not None:
+        conn.info.setdefault('profile_started_at', []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    """
+    Обработчик события SQLAlchemy: записывает текст и время запроса к базе данных в запись HTTP-запроса.
+    """
+    trace = _current_trace.get()
+    started = conn.info.get('profile_started_at')
+    if trace is None or not started:
+        return
+    elapsed = (time.perf_counter() - started.pop()) * 1000
+    if len(trace.sql) < settings.PROFILE_MAX_SQL:
+        trace.sql.append((statement, elapsed))
+    else:
+        trace.sql_dropped += 1
+
+
+def record_template(name: str, elapsed: float):
+    """
+    Записывает время отрисовки шаблона в запись текущего HTTP-запроса.
+
+    Параметры:
+        name (str): Имя шаблона.
+        elapsed (float): Время отрисовки в секундах.
+    """
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.templates.append((name, elapsed * 1000))
+
+
+class StackSampler(threading.Thread):
+    """
+    Поток, снимающий стек указанного потока через равные интервалы (выборочный профиль).
+
+    Стеки хранятся в свернутом виде (collapsed stacks: функции от корня через ';' и количество выборок),
+    который принимают flamegraph.pl и speedscope.
+    """
+
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(name='profile-sampler', daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                code = frame.f_code
+                stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self) -> Counter:
+        """
+        Останавливает поток и возвращает собранные стеки.
+        """
+        self._stopped.set()
+        self.join()
+        return self.stacks
+
+
+class ProfileStore:
+    """
+    Кольцевой буфер последних записей профилирования.
+    """
+
+    def __init__(self, size: int):
+        self._traces: deque[dict] = deque(maxlen=size)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def next_id(self) -> int:
+        """
+        Возвращает номер новой записи.
+        """
+        return next(self._ids)
+
+    def add(self, trace: dict):
+        """
+        Добавляет запись; при заполненном буфере вытесняется самая старая.
+        """
+        with self._lock:
+            self._traces.append(trace)
+
+    def summaries(self) -> list[dict]:
+        """
+        Возвращает краткие сведения о записях (без запросов к базе данных и стеков), новые первыми.
+        """
+        with self._lock:
+            traces = list(self._traces)
+        return [{key: value for key, value in trace.items() if key not in DETAIL_KEYS} for trace in reversed(traces)]
+
+    def get(self, trace_id: int) -> Optional[dict]:
+        """
+        Возвращает запись по номеру или None, если она вытеснена или не существует.
+        """
+        with self._lock:
+            for trace in self._traces:
+                if trace['id'] == trace_id:
+                    return trace
+        return None
+
+
+# Общий буфер записей профилирования процесса
+profile_store = ProfileStore(settings.PROFILE_BUFFER_SIZE)
+
+
+def is_valid_token(token: Optional[str]) -> bool:
+    """
+    Проверяет токен профилирования (сравнение за постоянное время).
+
+    Параметры:
+        token (str | None): Переданный токен.
+
+    Возвращает:
+        bool: True, если PROFILE_TOKEN задан и совпадает с переданным токеном.
+    """
+    return bool(settings.PROFILE_TOKEN) and token is not None and hmac.compare_digest(
+        token.encode('utf-8'), settings.PROFILE_TOKEN.encode('utf-8'))
+
+
+def _requested_token(scope: Scope) -> Optional[str]:
+    """
+    Возвращает токен профилирования из заголовка X-Profile или параметра запроса profile.
+    """
+    token = Headers(scope=scope).get('x-profile')
+    if token is None and b'profile=' in scope.get('query_string', b''):
+        token = parse_qs(scope['query_string'].decode('latin-1')).get('profile', [None])[0]
+    return token
+
+
+def _build_trace(trace_id: int, kind: str, scope: Scope, status: int, duration: float, trace: RequestTrace,
+                 stacks: Optional[Counter]) -> dict:
+    """
+    Формирует запись для буфера: сведения о запросе, запросы к базе данных (по порядку и суммарно по тексту),
+    шаблоны и стеки.
+    """
+    statements = [(' '.join(statement.split())[:MAX_STATEMENT_LENGTH], elapsed) for statement, elapsed in trace.sql]
+    by_statement: dict[str, list] = {}
+    for statement, elapsed in statements:
+        entry = by_statement.setdefault(statement, [0, 0.0])
+        entry[0] += 1
+        entry[1] += elapsed
+    record = {
+        'id': trace_id,
+        'kind': kind,
+        'time': datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+        'method': scope['method'],
+        'path': scope['path'],
+        'route': getattr(scope.get('route'), 'path', None),
+        'status': status,
+        'duration_ms': round(duration * 1000, 2),
+        'sql_count': len(trace.sql) + trace.sql_dropped,
+        'sql_ms': round(sum(elapsed for _, elapsed in trace.sql), 2),
+        'template_ms': round(sum(elapsed for _, elapsed in trace.templates), 2),
+        'sql': [{'statement': statement, 'ms': round(elapsed, 3)} for statement, elapsed in statements],
+        'sql_by_statement': sorted(
+            ({'statement': statement, 'count': count, 'ms': round(total, 3)}
+             for statement, (count, total) in by_statement.items()),
+            key=lambda item: item['ms'], reverse=True),
+        'templates': [{'template': name, 'ms': round(elapsed, 3)} for name, elapsed in trace.templates],
+    }
+    if trace.sql_dropped:
+        record['sql_dropped'] = trace.sql_dropped
+    if stacks is not None:
+        leaves = Counter()
+        for stack, count in stacks.items():
+            leaves[stack.rsplit(';', 1)[-1]] += count
+        record['samples'] = sum(stacks.values())
+        record['sample_interval_ms'] = settings.PROFILE_SAMPLE_INTERVAL_MS
+        record['top_functions'] = [{'function': name, 'samples': count}
+                                   for name, count in leaves.most_common(TOP_FUNCTIONS)]
+        record['stacks'] = [f'{stack} {count}' for stack, count in stacks.most_common(TOP_STACKS)]
+    return record
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware, записывающий запросы к базе данных и шаблоны профилируемых HTTP-запросов и сохраняющий
+    записи медленных запросов и запросов, профилируемых по требованию.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        on_demand = is_valid_token(_requested_token(scope))
+        slow_capture = settings.PROFILE_SLOW_REQUEST_MS > 0 and not scope['path'].startswith(SLOW_EXEMPT_PREFIXES)
+        if not on_demand and not slow_capture:
+            await self.app(scope, receive, send)
+            return
+
+        trace = RequestTrace()
+        trace_id = profile_store.next_id() if on_demand else None
+        status = [500]
+
+        async def send_with_trace(message: Message):
+            if message['type'] == 'http.response.start':
+                status[0] = message['status']
+                if trace_id is not None:
+                    MutableHeaders(scope=message)['X-Profile-Id'] = str(trace_id)
+            await send(message)
+
+        sampler = None
+        if on_demand:
+            sampler = StackSampler(threading.get_ident(), settings.PROFILE_SAMPLE_INTERVAL_MS / 1000)
+            sampler.start()
+        token = _current_trace.set(trace)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_trace)
+        finally:
+            duration = time.perf_counter() - started
+            _current_trace.reset(token)
+            stacks = sampler.stop() if sampler is not None else None
+            if on_demand:
+                profile_store.add(_build_trace(trace_id, 'on_demand', scope, status[0], duration, trace, stacks))
+            elif duration * 1000 >= settings.PROFILE_SLOW_REQUEST_MS:
+                profile_store.add(_build_trace(profile_store.next_id(), 'slow', scope, status[0], duration, trace,
+                                               None))
@@ -3,137 +3,263 @@
 Он может включать функции для управления турами и другие административные действия.
 """
 
-import os
-import shutil
 import logging
-from typing import Annotated
-from sqlalchemy import select
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
-from fastapi.templating import Jinja2Templates
-from database.db import SessionLocal, TourTable
-from schemas.schem import SchemaTour, TourUpdate
+from typing import Annotated, Literal, Optional
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.exc import StaleDataError
+from fastapi import APIRouter, Depends, UploadFile, File, Header, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from cache.cache import fragment_cache, tour_cache
+from events.broker import availability_broker
+from database.bulk import FORMATS, detect_format, export_tours, import_tours
+from database.db import TourTable, get_session, utcnow
+from database.queries import fetch_tours_page_data, fetch_tours_page_versions, tours_validators
+from images.storage import release_image, save_upload
+from jobs.queue import enqueue_job, job_queue
+from profiling.profiling import is_valid_token, profile_store
+from schemas.schem import SchemaTour, TourFilter, TourOut, TourPatch, TourUpdate, TourUpdated
+from snapshot.snapshot import snapshot_updater
+from utils.conditional import is_not_modified, not_modified_response, validator_headers
 
 # Настройка логирования
 logger = logging.getLogger('log')
 
-# Настройка шаблонов Jinja2
-templates = Jinja2Templates(directory='templates')
-
 # Создание маршрутизатора для администратора
 router = APIRouter(prefix='/admin', tags=['Админ панель'])
 
 
-@router.get('/get_tours_admin')
-async def get_tours():
+@router.get('/get_tours_admin', response_model=list[TourOut])
+async def get_tours(request: Request, response: Response, filters: Annotated[TourFilter, Depends()],
+                    session: Annotated[AsyncSession, Depends(get_session)]):
     """
-    Получает список всех туров из базы данных.
+    Получает страницу списка туров из базы данных.
+
+    Курсор следующей страницы передается в заголовке ответа X-Next-Cursor
+    (заголовок отсутствует, если страница последняя). Результат запроса берется из кеша туров.
+    Ответ содержит заголовки ETag и Last-Modified; при актуальной версии у клиента возвращается
+    304 Not Modified без загрузки и сериализации туров.
+
+    Параметры:
+        request (Request): Объект запроса.
+        response (Response): Объект ответа для установки заголовков.
+        filters (TourFilter): Параметры фильтрации и постраничного вывода.
+        session (AsyncSession): Асинхронная сессия базы данных.
 
     Возвращает:
-        list: Список объектов туров.
+        list[TourOut]: Список туров.
     """
-    with SessionLocal() as session:
-        logger.debug("Открытие сессии базы данных")
-        query = select(TourTable)
-        result = session.execute(query)
-        logger.debug(f"Выполнение запроса: {query}")
-        tour_models = result.scalars().all()
-        logger.info(f"Найдено {len(tour_models)} туров")
-        return tour_models
+    params = filters.model_dump_json()
+    data_key = await tour_cache.list_key('data', params)
+    data = await tour_cache.get(data_key)
+    if data is None:
+        etag, last_modified = tours_validators(params, await fetch_tours_page_versions(session, filters))
+        if is_not_modified(request, etag, last_modified):
+            return not_modified_response(etag, last_modified)
+        data = await fetch_tours_page_data(session, filters)
+        await tour_cache.set(data_key, data)
+    tour_models, next_cursor = data
+    etag, last_modified = tours_validators(params, tour_models)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(etag, last_modified)
+
+    response.headers.update(validator_headers(etag, last_modified))
+    if next_cursor is not None:
+        response.headers['X-Next-Cursor'] = str(next_cursor)
+    logger.info("Найдено %s туров", len(tour_models))
+    return tour_models
 
 
 @router.post('/upload_tour_admin')
-async def upload_tour(tour: Annotated[SchemaTour, Depends()], image: UploadFile = File(...)):
+async def upload_tour(tour: Annotated[SchemaTour, Depends()],
+                      session: Annotated[AsyncSession, Depends(get_session)],
+                      image: UploadFile = File(...)):
     """
     Загружает новый тур в базу данных.
 
+    Изображение сохраняется под именем, вычисленным по его содержимому; для нового изображения
+    создаются уменьшенные копии в форматах AVIF, WebP и JPEG.
+
     Параметры:
         tour (SchemaTour): Данные о туре.
+        session (AsyncSession): Асинхронная сессия базы данных.
         image (UploadFile): Изображение тура.
 
     Возвращает:
         int: ID загруженного тура.
     """
     logger.debug("Запрос на загрузку нового тура")
-    with SessionLocal() as session:
-        image_path = os.path.join(
-            'static', 'image', 'img_tour', image.filename)
-
-        with open(image_path, 'wb') as buffer:
-            shutil.copyfileobj(image.file, buffer)
-
-        tours_dict = tour.model_dump()
-        tours_dict['image'] = image.filename
-
-        tour = TourTable(**tours_dict)
-        session.add(tour)
-        session.flush()
-        session.commit()
-        logger.info(f"Тур загружен с ID: {tour.id}")
-        return tour.id
-
-
-@router.put('/update_tour_admin')
-async def update_tour(tour_id: int, tour_update: Annotated[TourUpdate, Depends()], new_image: UploadFile = File(...)):
+    image_name, image_created = await save_upload(image)
+
+    tours_dict = tour.model_dump()
+    tours_dict['image'] = image_name
+
+    tour = TourTable(**tours_dict)
+    session.add(tour)
+    if image_created:
+        enqueue_job(session, 'process_image', filename=image_name)
+    await session.flush()
+    await session.commit()
+    job_queue.wake()
+    await tour_cache.invalidate_lists()
+    availability_broker.publish(tour.id, tour.available_places, tour.version)
+    snapshot_updater.request_update()
+    logger.info("Тур загружен с ID: %s", tour.id)
+    return tour.id
+
+
+@router.put('/update_tour_admin', response_model=TourUpdated)
+async def update_tour(tour_id: int, tour_update: Annotated[TourUpdate, Depends()],
+                      session: Annotated[AsyncSession, Depends(get_session)],
+                      new_image: UploadFile = File(...)):
     """
     Обновляет существующий тур в базе данных.
 
+    Прежнее изображение удаляется только в том случае, если на него не ссылаются другие туры.
+
+    Тур сохраняется с проверкой версии строки: если его изменил другой запрос (бронирование, частичное
+    обновление, фоновая задача) после чтения, изменения не записываются, новое изображение удаляется и
+    возвращается 409 Conflict.
+
     Параметры:
         tour_id (int): ID тура, который необходимо обновить.
         tour_update (TourUpdate): Новые данные о туре.
+        session (AsyncSession): Асинхронная сессия базы данных.
         new_image (UploadFile): Новое изображение тура.
 
     Возвращает:
-            dict: Подтверждение обновления и обновленный объект тура.
+        TourUpdated: Подтверждение обновления и обновленный тур.
 
     Исключения:
-        HTTPException: Если тур с указанным ID не найден.
+        HTTPException: 404, если тур с указанным ID не найден; 409, если тур изменен другим запросом.
+    """
+    logger.debug("Запрос на обновление тура с ID: %s", tour_id)
+    query = select(TourTable).where(TourTable.id == tour_id)
+    logger.debug("Выполнение запроса: %s", query)
+    result = await session.execute(query)
+    tour_model = result.scalars().first()
+
+    if not tour_model:
+        logger.warning("Тур с ID %s не найден", tour_id)
+        raise HTTPException(status_code=404, detail="Тур не найден")
+
+    image_name, image_created = await save_upload(new_image)
+
+    logger.info("Обновление тура с ID: %s", tour_id)
+    tour_model.title = tour_update.new_title
+    tour_model.description = tour_update.new_description
+    tour_model.place = tour_update.new_place
+    tour_model.start_date_tour = tour_update.new_start_date_tour
+    tour_model.duration = tour_update.new_duration
+    tour_model.max_people = tour_update.new_max_people
+    tour_model.available_places = tour_update.new_available_places
+    tour_model.occupied_places = tour_update.new_occupied_places
+    tour_model.price_per_person = tour_update.new_price_per_person
+    old_image = tour_model.image
+    tour_model.image = image_name
+    if old_image and old_image != image_name:
+        enqueue_job(session, 'release_image', filename=old_image)
+    if image_created:
+        enqueue_job(session, 'process_image', filename=image_name)
+
+    try:
+        await session.commit()
+    except StaleDataError:
+        await session.rollback()
+        logger.warning("Тур с ID %s изменен другим запросом во время обновления", tour_id)
+        if image_created:
+            await release_image(session, image_name, min_age=0)
+        raise HTTPException(status_code=409, detail="Тур изменен другим запросом, повторите обновление")
+    job_queue.wake()
+    await tour_cache.invalidate_tour(tour_id)
+    availability_broker.publish(tour_id, tour_model.available_places, tour_model.version)
+    snapshot_updater.request_update()
+    logger.info("Тур с ID: %s успешно обновлён", tour_id)
+    return {"detail": "Tour updated successfully", "tour": tour_model}
+
+
+@router.patch('/update_tour_admin', response_model=TourUpdated)
+async def patch_tour(tour_id: int, tour_patch: Annotated[TourPatch, Depends()],
+                     session: Annotated[AsyncSession, Depends(get_session)],
+                     new_image: Optional[UploadFile] = File(None)):
     """
-    logger.debug(f"Запрос на обновление тура с ID: {tour_id}")
-    with SessionLocal() as session:
-        image_path = os.path.join(
-            'static', 'image', 'img_tour', new_image.filename)
+    Частично обновляет тур: изменяются только переданные поля, изображение передавать не обязательно.
 
-        with open(image_path, 'wb') as buffer:
-            shutil.copyfileobj(new_image.file, buffer)
+    Тур не загружается в сессию: переданные поля, версия и время изменения записываются одним запросом
+    UPDATE ... RETURNING, который возвращает обновленный тур. Без нового изображения файлы не читаются и
+    не записываются; прежнее изображение удаляется, только если оно заменено и на него не ссылаются другие туры.
+    Тур без изображения тоже можно обновить с новым изображением. Если тур удален другим запросом во время
+    сохранения изображения, только что сохраненный файл удаляется.
 
-        logger.debug("Открытие сессии базы данных")
-        query = select(TourTable).where(TourTable.id == tour_id)
-        logger.debug(f"Выполнение запроса: {query}")
-        result = session.execute(query)
-        tour_model = result.scalars().first()
+    Параметры:
+        tour_id (int): ID тура, который необходимо обновить.
+        tour_patch (TourPatch): Изменяемые поля тура.
+        session (AsyncSession): Асинхронная сессия базы данных.
+        new_image (UploadFile | None): Новое изображение тура.
 
-        if not tour_model:
-            logger.warning(f"Тур с ID {tour_id} не найден")
-            raise HTTPException(status_code=404, detail="Тур не найден")
+    Возвращает:
+        TourUpdated: Подтверждение обновления и обновленный тур.
 
-        logger.info(f"Обновление тура с ID: {tour_id}")
-        tour_model.title = tour_update.new_title
-        tour_model.description = tour_update.new_description
-        tour_model.place = tour_update.new_place
-        tour_model.start_date_tour = tour_update.new_start_date_tour
-        tour_model.duration = tour_update.new_duration
-        tour_model.max_people = tour_update.new_max_people
-        tour_model.available_places = tour_update.new_available_places
-        tour_model.occupied_places = tour_update.new_occupied_places
-        tour_model.price_per_person = tour_update.new_price_per_person
-        image_path_deleted = os.path.join(
-            'static', 'image', 'img_tour', tour_model.image)
-        if os.path.exists(image_path_deleted):
-            os.remove(image_path_deleted)
-        tour_model.image = new_image.filename
-
-        session.commit()
-        logger.info(f"Тур с ID: {tour_id} успешно обновлён")
-        return {"detail": "Tour updated successfully", "tour": tour_model}
+    Исключения:
+        HTTPException: 400, если не передано ни одного поля; 404, если тур с указанным ID не найден.
+    """
+    logger.debug("Запрос на частичное обновление тура с ID: %s", tour_id)
+    changes = tour_patch.changes()
+    if not changes and new_image is None:
+        raise HTTPException(status_code=400, detail="Не переданы поля для обновления")
+
+    old_image = image_created = None
+    if new_image is not None:
+        row = (await session.execute(
+            select(TourTable.id, TourTable.image).where(TourTable.id == tour_id))).one_or_none()
+        if row is None:
+            logger.warning("Тур с ID %s не найден", tour_id)
+            raise HTTPException(status_code=404, detail="Тур не найден")
+        old_image = row.image
+        changes['image'], image_created = await save_upload(new_image)
+
+    query = (
+        update(TourTable)
+        .where(TourTable.id == tour_id)
+        .values(**changes, version=TourTable.version + 1, updated_at=utcnow())
+        .returning(*TourTable.__table__.columns)
+        .execution_options(synchronize_session=False)
+    )
+    tour = (await session.execute(query)).mappings().one_or_none()
+    if tour is None:
+        # Тур удален другим запросом после проверки: сохраненное изображение никому не нужно
+        await session.rollback()
+        logger.warning("Тур с ID %s не найден", tour_id)
+        if image_created:
+            await release_image(session, changes['image'], min_age=0)
+        raise HTTPException(status_code=404, detail="Тур не найден")
+    if old_image and old_image != tour['image']:
+        enqueue_job(session, 'release_image', filename=old_image)
+    if image_created:
+        enqueue_job(session, 'process_image', filename=tour['image'])
+    await session.commit()
+
+    job_queue.wake()
+    await tour_cache.invalidate_tour(tour_id)
+    availability_broker.publish(tour_id, tour['available_places'], tour['version'])
+    snapshot_updater.request_update()
+    logger.info("Тур с ID: %s обновлён, изменены поля: %s", tour_id, ', '.join(changes))
+    return {"detail": "Tour updated successfully", "tour": tour}
 
 
 @router.delete('/delete_tour_admin')
-async def deleted_tour(tour_id: int):
+async def deleted_tour(tour_id: int, session: Annotated[AsyncSession, Depends(get_session)]):
     """
     Удаляет тур из базы данных.
 
+    Изображение тура удаляется, если на него не ссылаются другие туры.
+
+    Тур удаляется одним запросом DELETE ... RETURNING без загрузки в сессию, поэтому одновременное
+    изменение тура (бронирование, фоновая задача) не приводит к конфликту версий.
+
     Параметры:
         tour_id (int): ID тура, который необходимо удалить.
+        session (AsyncSession): Асинхронная сессия базы данных.
 
     Возвращает:
         dict: Подтверждение удаления тура.
@@ -141,21 +267,149 @@ async def deleted_tour(tour_id: int):
     Исключения:
         HTTPException: Если тур с указанным ID не найден.
     """
-    logger.debug(f"Запрос на удаление тура с ID: {tour_id}")
-    with SessionLocal() as session:
-        logger.debug("Открытие сессии базы данных")
-        query = select(TourTable).where(TourTable.id == tour_id)
-        logger.debug(f"Выполнение запроса: {query}")
+    logger.debug("Запрос на удаление тура с ID: %s", tour_id)
+    query = delete(TourTable).where(TourTable.id == tour_id).returning(TourTable.image)
+    logger.debug("Выполнение запроса: %s", query)
+
+    deleted = (await session.execute(query)).one_or_none()
+    if deleted is None:
+        logger.warning("Тур с ID %s не найден", tour_id)
+        raise HTTPException(status_code=404, detail="Тур не найден")
+
+    if deleted.image:
+        enqueue_job(session, 'release_image', filename=deleted.image)
+    logger.info("Тур с ID: %s успешно удалён", tour_id)
+    await session.commit()
+    job_queue.wake()
+    await tour_cache.invalidate_tour(tour_id)
+    availability_broker.publish(tour_id, None, deleted=True)
+    snapshot_updater.request_update()
+
+    return {"detail": "Tour deleted successfully"}
+
+
+@router.post('/import_tours_admin')
+async def import_tours_bulk(session: Annotated[AsyncSession, Depends(get_session)],
+                            file: UploadFile = File(...),
+                            file_format: Optional[Literal['ndjson', 'csv']] = None):
+    """
+    Массово импортирует туры из файла NDJSON или CSV.
 
-        result = session.execute(query)
-        tour_model = result.scalars().first()
+    Каждая строка файла описывает один тур полями схемы SchemaTour и необязательным полем image (имя уже
+    загруженного файла изображения). Поле id игнорируется: туры получают новые ID. Строки вставляются
+    пакетами в отдельных транзакциях; строки с ошибками пропускаются и перечисляются в отчете.
 
-        if not tour_model:
-            logger.warning(f"Тур с ID {tour_id} не найден")
-            raise HTTPException(status_code=404, detail="Тур не найден")
+    Параметры:
+        session (AsyncSession): Асинхронная сессия базы данных.
+        file (UploadFile): Файл импорта.
+        file_format (str | None): Формат файла ('ndjson' или 'csv'). По умолчанию определяется по расширению.
+
+    Возвращает:
+        dict: Количество импортированных и отклоненных строк и описание ошибок.
+
+    Исключения:
+        HTTPException: 415, если формат файла не удалось определить.
+    """
+    logger.debug("Запрос на импорт туров из файла %s", file.filename)
+    file_format = detect_format(file.filename, file_format)
+    if file_format is None:
+        logger.warning("Неподдерживаемый формат файла импорта: %s", file.filename)
+        raise HTTPException(status_code=415, detail="Поддерживаются файлы NDJSON и CSV")
+
+    report = await import_tours(session, file.file, file_format)
+    if report['imported']:
+        enqueue_job(session, 'optimize_search_index')
+        await session.commit()
+        job_queue.wake()
+        await tour_cache.invalidate_lists()
+        snapshot_updater.request_update()
+    return report
+
+
+@router.get('/export_tours_admin')
+async def export_tours_bulk(file_format: Literal['ndjson', 'csv'] = 'ndjson'):
+    """
+    Выгружает все туры в формате NDJSON или CSV.
+
+    Ответ передается потоком: туры читаются из базы данных пакетами и отправляются клиенту по мере чтения.
+
+    Параметры:
+        file_format (str): Формат файла ('ndjson' или 'csv').
+
+    Возвращает:
+        StreamingResponse: Файл экспорта.
+    """
+    logger.debug("Запрос на экспорт туров в формате %s", file_format)
+    headers = {'Content-Disposition': f'attachment; filename="tours.{file_format}"'}
+    return StreamingResponse(export_tours(file_format), media_type=FORMATS[file_format], headers=headers)
+
+
+@router.get('/cache_stats_admin')
+async def cache_stats():
+    """
+    Возвращает счетчики попаданий и промахов кеша туров и кеша карточек туров текущего процесса.
+
+    Возвращает:
+        dict: Тип хранилища, попадания, промахи и доля попаданий; в поле fragments - количество карточек,
+            попадания и промахи кеша карточек.
+    """
+    return {**tour_cache.stats(), 'fragments': fragment_cache.stats()}
 
-        session.delete(tour_model)
-        logger.info(f"Тур с ID: {tour_id} успешно удалён")
-        session.commit()
 
-        return {"detail": "Tour deleted successfully"}
+@router.get('/jobs_admin')
+async def jobs_stats():
+    """
+    Возвращает состояние очереди фоновых задач.
+
+    Возвращает:
+        dict: Количество задач по статусам (pending, running, failed) и последние задачи, которые не удалось
+            выполнить, с текстом ошибки.
+    """
+    return await job_queue.stats()
+
+
+def check_profile_token(x_profile_token: Annotated[Optional[str], Header()] = None):
+    """
+    Зависимость FastAPI: разрешает просмотр записей профилирования только с токеном PROFILE_TOKEN
+    в заголовке X-Profile-Token.
+
+    Исключения:
+        HTTPException: 403, если токен не задан в настройках или не совпадает.
+    """
+    if not is_valid_token(x_profile_token):
+        raise HTTPException(status_code=403, detail="Неверный токен профилирования")
+
+
+@router.get('/profiles_admin', dependencies=[Depends(check_profile_token)])
+async def profiles():
+    """
+    Возвращает список записей профилирования текущего процесса: медленные запросы (kind='slow') и запросы,
+    профилируемые по требованию (kind='on_demand').
+
+    Возвращает:
+        list[dict]: Краткие сведения о записях (маршрут, код ответа, время, количество и время запросов к базе
+            данных и отрисовки шаблонов), новые первыми.
+    """
+    return profile_store.summaries()
+
+
+@router.get('/profiles_admin/{trace_id}', dependencies=[Depends(check_profile_token)])
+async def profile_details(trace_id: int):
+    """
+    Возвращает запись профилирования: запросы к базе данных по порядку и суммарно по тексту запроса, время
+    отрисовки шаблонов, а для профилирования по требованию - функции, чаще всего встречавшиеся на вершине
+    стека, и свернутые стеки (формат flamegraph.pl и speedscope).
+
+    Параметры:
+        trace_id (int): Номер записи (заголовок X-Profile-Id ответа профилируемого запроса).
+
+    Возвращает:
+        dict: Запись профилирования.
+
+    Исключения:
+        HTTPException: 404, если запись не найдена (вытеснена из буфера).
+    """
+    trace = profile_store.get(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Запись профилирования не найдена")
+    return trace
@@ -0,0 +1,128 @@
+"""
+Этот файл содержит маршруты для бронирования мест в турах.
+
+Места списываются одним условным запросом UPDATE ("available_places >= запрошенного количества"), поэтому
+при одновременных запросах тур не может быть перебронирован. Повторные запросы с тем же ключом
+идемпотентности (заголовок Idempotency-Key) возвращают уже созданное бронирование.
+"""
+
+import logging
+import uuid
+from typing import Annotated, Optional
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+from cache.cache import tour_cache
+from events.broker import availability_broker
+from database.db import BookingTable, TourTable, get_session, utcnow
+from schemas.schem import Booking, BookingCreate
+from snapshot.snapshot import snapshot_updater
+
+# Настройка логирования
+logger = logging.getLogger('log')
+
+# Создание маршрутизатора для бронирования туров
+router = APIRouter(prefix='/booking', tags=['Бронирование туров'])
+
+
+async def replay_booking(session: AsyncSession, record: BookingTable, tour_id: int, seats: int,
+                         response: Response) -> Booking:
+    """
+    Возвращает ранее созданное бронирование для повторного запроса с тем же ключом идемпотентности.
+
+    Параметры:
+        session (AsyncSession): Асинхронная сессия базы данных.
+        record (BookingTable): Найденное бронирование.
+        tour_id (int): ID тура из повторного запроса.
+        seats (int): Количество мест из повторного запроса.
+        response (Response): Объект ответа для установки заголовков.
+
+    Возвращает:
+        Booking: Ранее созданное бронирование.
+
+    Исключения:
+        HTTPException: Если ключ уже использован для другого тура или другого количества мест.
+    """
+    if record.tour_id != tour_id or record.seats != seats:
+        logger.warning("Ключ идемпотентности %s использован с другими параметрами", record.idempotency_key)
+        raise HTTPException(status_code=422, detail="Ключ идемпотентности уже использован для другого запроса")
+    available_places = await session.scalar(select(TourTable.available_places).where(TourTable.id == tour_id))
+    response.headers['Idempotent-Replayed'] = 'true'
+    logger.info("Повторный запрос бронирования %s", record.id)
+    return Booking(id=record.id, tour_id=record.tour_id, seats=record.seats, customer_name=record.customer_name,
+                   created_at=record.created_at, available_places=available_places or 0)
+
+
+@router.post('/tours/{tour_id}', status_code=201, response_model=Booking)
+async def book_tour(tour_id: int, booking: BookingCreate, response: Response,
+                    session: Annotated[AsyncSession, Depends(get_session)],
+                    idempotency_key: Annotated[Optional[str], Header(max_length=100)] = None):
+    """
+    Бронирует места в туре.
+
+    Параметры:
+        tour_id (int): ID тура.
+        booking (BookingCreate): Количество мест и контакты клиента.
+        response (Response): Объект ответа для установки заголовков.
+        session (AsyncSession): Асинхронная сессия базы данных.
+        idempotency_key (str | None): Ключ идемпотентности из заголовка Idempotency-Key. Клиент должен
+            передавать один и тот же ключ при повторах одного запроса.
+
+    Возвращает:
+        Booking: Созданное бронирование и оставшееся количество свободных мест.
+
+    Исключения:
+        HTTPException: 404, если тур не найден; 409, если свободных мест недостаточно.
+    """
+    logger.debug("Запрос на бронирование %s мест в туре с ID: %s", booking.seats, tour_id)
+    key = idempotency_key or uuid.uuid4().hex
+    existing = await session.scalar(select(BookingTable).where(BookingTable.idempotency_key == key))
+    if existing:
+        return await replay_booking(session, existing, tour_id, booking.seats, response)
+
+    # Быстрая проверка без блокировки записи: распроданный тур не должен занимать блокировку базы данных.
+    # Окончательную проверку выполняет условие запроса UPDATE.
+    current_places = await session.scalar(select(TourTable.available_places).where(TourTable.id == tour_id))
+    if current_places is None:
+        logger.warning("Тур с ID %s не найден", tour_id)
+        raise HTTPException(status_code=404, detail="Тур не найден")
+    if current_places < booking.seats:
+        logger.info("Недостаточно свободных мест в туре с ID: %s", tour_id)
+        raise HTTPException(status_code=409, detail="Недостаточно свободных мест")
+
+    query = (
+        update(TourTable)
+        .where(TourTable.id == tour_id, TourTable.available_places >= booking.seats)
+        .values(available_places=TourTable.available_places - booking.seats,
+                occupied_places=TourTable.occupied_places + booking.seats,
+                version=TourTable.version + 1,
+                updated_at=utcnow())
+        .returning(TourTable.available_places, TourTable.version)
+        .execution_options(synchronize_session=False)
+    )
+    updated = (await session.execute(query)).one_or_none()
+    if updated is None:
+        await session.rollback()
+        logger.info("Недостаточно свободных мест в туре с ID: %s", tour_id)
+        raise HTTPException(status_code=409, detail="Недостаточно свободных мест")
+
+    available_places, version = updated
+    record = BookingTable(tour_id=tour_id, seats=booking.seats, customer_name=booking.customer_name,
+                          customer_phone=booking.customer_phone, idempotency_key=key)
+    session.add(record)
+    try:
+        await session.commit()
+    except IntegrityError:
+        # Одновременный запрос с тем же ключом успел создать бронирование: откат возвращает списанные места
+        await session.rollback()
+        existing = await session.scalar(select(BookingTable).where(BookingTable.idempotency_key == key))
+        return await replay_booking(session, existing, tour_id, booking.seats, response)
+
+    await tour_cache.invalidate_tour(tour_id)
+    availability_broker.publish(tour_id, available_places, version)
+    snapshot_updater.request_update()
+    logger.info("Бронирование %s: %s мест в туре с ID %s, осталось %s",
+                record.id, booking.seats, tour_id, available_places)
+    return Booking(id=record.id, tour_id=tour_id, seats=record.seats, customer_name=record.customer_name,
+                   created_at=record.created_at, available_places=available_places)
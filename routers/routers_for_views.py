@@ -3,63 +3,299 @@
 пользователей приложения.
 """
 
+import asyncio
+import json
 import logging
+from typing import Annotated, AsyncIterator, Optional
 from sqlalchemy import select
-from fastapi import APIRouter, Request, HTTPException
-from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
-from database.db import SessionLocal, TourTable
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, Request, HTTPException, Depends
+from fastapi.responses import HTMLResponse, StreamingResponse
+from cache.cache import tour_cache
+from events.broker import availability_broker
+from database.db import AsyncSessionLocal, TourTable, get_session
+from database.queries import (fetch_tour_facets, fetch_tour_version, fetch_tours_page_data,
+                              fetch_tours_page_versions, search_tours, tour_as_dict, tours_validators)
+from schemas.schem import TourFacets, TourFilter, TourSearch
+from settings import settings
+from templating.templating import render_template, stream_template, templates
+from utils.conditional import is_not_modified, not_modified_response, validator_headers
 
 # Настройка логирования
 logger = logging.getLogger('log')
 
-# Настройка шаблонов Jinja2
-templates = Jinja2Templates(directory='templates')
-
 # Создание маршрутизатора для отображения туров
 router = APIRouter(prefix='/views', tags=['Отображение туров'])
 
 
+async def load_facets(session: AsyncSession, filters: TourFilter) -> dict:
+    """
+    Получает фасеты списка туров из кеша или считает их запросами GROUP BY.
+
+    Параметры:
+        session (AsyncSession): Асинхронная сессия базы данных.
+        filters (TourFilter): Параметры фильтрации (курсор и размер страницы не учитываются).
+
+    Возвращает:
+        dict: Фасеты в формате схемы TourFacets.
+    """
+    params = filters.model_dump_json(exclude={'after_id', 'limit'})
+    facets_key = await tour_cache.list_key('facets', params)
+    return await tour_cache.get_or_load(facets_key, lambda: fetch_tour_facets(session, filters))
+
+
 @router.get('/tours/', response_class=HTMLResponse)
-async def tours_page(request: Request):
+async def tours_page(request: Request, filters: Annotated[TourFilter, Depends()],
+                     session: Annotated[AsyncSession, Depends(get_session)]):
     """
-    Отображает страницу со списком всех туров.
+    Отображает страницу со списком туров.
+
+    Туры выводятся постранично (по курсору after_id) с учетом фильтров по месту, цене,
+    дате начала и наличию свободных мест. Готовый HTML и результат запроса хранятся в кеше
+    до изменения туров через административные маршруты.
+
+    Ответ содержит заголовки ETag и Last-Modified, вычисленные по версиям туров страницы. Если версия
+    у клиента актуальна, возвращается 304 Not Modified без загрузки туров и отрисовки шаблона.
+
+    Если страницы нет в кеше, она отрисовывается по частям и отправляется клиенту во время отрисовки:
+    начало страницы и первые карточки туров приходят сразу. Карточки берутся из кеша фрагментов, а готовая
+    страница сохраняется в кеш после отправки.
 
     Параметры:
         request (Request): Объект запроса FastAPI.
+        filters (TourFilter): Параметры фильтрации и постраничного вывода.
+        session (AsyncSession): Асинхронная сессия базы данных.
 
     Возвращает:
-        HTMLResponse: HTML-страница со списком туров или страница с сообщением о пустом списке.
+        HTMLResponse | StreamingResponse: HTML-страница со списком туров или страница с сообщением
+            о пустом списке.
     """
     logger.debug("Запрос на страницу туров")
-    with SessionLocal() as session:
-        logger.debug("Открытие сессии базы данных")
-        query = select(TourTable)
-        logger.debug(f"Выполнение запроса: {query}")
-        result = session.execute(query)
-        tour_models = result.scalars().all()
+    params = filters.model_dump_json()
+    html_key = await tour_cache.list_key('html', f'{request.base_url}|{params}')
+    page = await tour_cache.get(html_key)
+    if page is None:
+        data_key = await tour_cache.list_key('data', params)
+        data = await tour_cache.get(data_key)
+        if data is None:
+            etag, last_modified = tours_validators(params, await fetch_tours_page_versions(session, filters))
+            if is_not_modified(request, etag, last_modified):
+                return not_modified_response(etag, last_modified)
+            data = await fetch_tours_page_data(session, filters)
+            await tour_cache.set(data_key, data)
+        tour_models, next_cursor = data
+        etag, last_modified = tours_validators(params, tour_models)
+        if is_not_modified(request, etag, last_modified):
+            return not_modified_response(etag, last_modified)
+
         if not tour_models:
             logger.info("Список туров пуст")
             context = {
                 'request': request,
             }
-            return templates.TemplateResponse('empty_list_tours_page.html', context)
-        logger.info(f"Найдено {len(tour_models)} туров")
-        context = {
-            'request': request,
-            'tour_models': tour_models,
-        }
-        return templates.TemplateResponse('list_tours_page.html', context)
+            html = render_template('empty_list_tours_page.html', context)
+        else:
+            logger.info("Найдено %s туров", len(tour_models))
+            next_url = None
+            if next_cursor is not None:
+                next_url = str(request.url.include_query_params(after_id=next_cursor))
+            context = {
+                'request': request,
+                'tour_models': tour_models,
+                'filters': filters,
+                'facets': await load_facets(session, filters),
+                'next_url': next_url,
+            }
+
+            async def save_page(html: str):
+                await tour_cache.set(html_key, {'html': html, 'etag': etag, 'last_modified': last_modified})
+
+            return StreamingResponse(stream_template('list_tours_page.html', context, on_complete=save_page),
+                                     media_type='text/html', headers=validator_headers(etag, last_modified))
+        page = {'html': html, 'etag': etag, 'last_modified': last_modified}
+        await tour_cache.set(html_key, page)
+
+    if is_not_modified(request, page['etag'], page['last_modified']):
+        return not_modified_response(page['etag'], page['last_modified'])
+    return HTMLResponse(page['html'], headers=validator_headers(page['etag'], page['last_modified']))
+
+
+@router.get('/tours/facets', response_model=TourFacets)
+async def tours_facets(filters: Annotated[TourFilter, Depends()],
+                       session: Annotated[AsyncSession, Depends(get_session)]):
+    """
+    Возвращает фасеты списка туров для панели фильтров: количество туров по местам, ценовым диапазонам,
+    месяцам начала и длительности с учетом выбранных фильтров.
+
+    Фасеты считаются запросами GROUP BY и хранятся в кеше до изменения туров.
+
+    Параметры:
+        filters (TourFilter): Параметры фильтрации.
+        session (AsyncSession): Асинхронная сессия базы данных.
+
+    Возвращает:
+        TourFacets: Фасеты списка туров.
+    """
+    logger.debug("Запрос фасетов списка туров")
+    return await load_facets(session, filters)
+
+
+@router.get('/tours/search', response_class=HTMLResponse)
+async def search_page(request: Request, search: Annotated[TourSearch, Depends()],
+                      session: Annotated[AsyncSession, Depends(get_session)]):
+    """
+    Отображает результаты полнотекстового поиска туров по названию, описанию и месту проведения.
+
+    Поиск выполняется по индексу FTS5, результаты упорядочены по релевантности, а совпадения в описании
+    выделены. Результаты хранятся в кеше до изменения туров.
+
+    Параметры:
+        request (Request): Объект запроса FastAPI.
+        search (TourSearch): Строка поиска и количество результатов.
+        session (AsyncSession): Асинхронная сессия базы данных.
+
+    Возвращает:
+        HTMLResponse: HTML-страница с найденными турами.
+    """
+    logger.debug("Поиск туров: %s", search.q)
+    params = search.model_dump_json()
+    data_key = await tour_cache.list_key('search', params)
+    tour_models = await tour_cache.get_or_load(data_key, lambda: search_tours(session, search.q, search.limit))
+    etag, last_modified = tours_validators(params, tour_models)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(etag, last_modified)
+
+    logger.info("По запросу найдено %s туров", len(tour_models))
+    context = {
+        'request': request,
+        'tour_models': tour_models,
+        'filters': TourFilter(),
+        'search': search.q,
+    }
+    html = render_template('list_tours_page.html', context)
+    return HTMLResponse(html, headers=validator_headers(etag, last_modified))
+
+
+def format_event(payload: dict) -> str:
+    """
+    Формирует событие Server-Sent Events об изменении свободных мест в туре.
+
+    Параметры:
+        payload (dict): Данные события (ID тура, количество свободных мест, версия).
+
+    Возвращает:
+        str: Текст события.
+    """
+    return f"event: availability\ndata: {json.dumps(payload, separators=(',', ':'))}\n\n"
+
+
+async def availability_events(tour_id: Optional[int], initial: Optional[dict]) -> AsyncIterator[str]:
+    """
+    Формирует поток событий об изменении свободных мест для одного клиента.
+
+    Пока изменений нет, каждые SSE_HEARTBEAT_INTERVAL секунд отправляется комментарий-heartbeat. Поток
+    завершается через SSE_MAX_STREAM_SECONDS или при закрытии подписки (браузер переподключается сам),
+    поэтому соединения не мешают перезапуску воркера. Подписка создается при начале передачи потока и
+    удаляется при любом его завершении, в том числе при отключении клиента; если ответ так и не начал
+    передаваться, подписка не создается.
+
+    Параметры:
+        tour_id (int | None): ID тура; если не указан, передаются изменения всех туров.
+        initial (dict | None): Текущее состояние тура, отправляемое сразу после подключения.
+
+    Возвращает:
+        AsyncIterator[str]: События в формате text/event-stream.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.SSE_MAX_STREAM_SECONDS
+    subscription = availability_broker.subscribe(tour_id)
+    try:
+        yield f'retry: {settings.SSE_RETRY_MS}\n\n'
+        if initial is not None:
+            yield format_event(initial)
+        while not subscription.closed:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            events = await subscription.wait(min(settings.SSE_HEARTBEAT_INTERVAL, remaining))
+            if events:
+                yield ''.join(format_event(event) for event in events)
+            else:
+                yield ': heartbeat\n\n'
+    finally:
+        availability_broker.unsubscribe(subscription)
+
+
+@router.get('/tours/events')
+async def tours_events(tour_id: Optional[int] = None):
+    """
+    Поток Server-Sent Events с изменениями количества свободных мест в туре или во всех турах.
+
+    Изменения публикуют маршруты бронирования, загрузки, обновления и удаления туров. Для одного тура
+    сразу после подключения отправляется его текущее состояние. Соединение не удерживает сессию базы данных:
+    ожидающий клиент стоит только подписки в памяти воркера.
+
+    Параметры:
+        tour_id (int | None): ID тура; если не указан, передаются изменения всех туров.
+
+    Возвращает:
+        StreamingResponse: Поток событий (text/event-stream).
+
+    Исключения:
+        HTTPException: Если тур с указанным ID не найден.
+    """
+    logger.debug("Подписка на изменения свободных мест, ID тура: %s", tour_id)
+    initial = None
+    if tour_id is not None:
+        async with AsyncSessionLocal() as session:
+            row = (await session.execute(
+                select(TourTable.available_places, TourTable.version).where(TourTable.id == tour_id))).one_or_none()
+        if row is None:
+            logger.warning("Тур с ID %s не найден", tour_id)
+            raise HTTPException(status_code=404, detail="Тур не найден")
+        initial = {'tour_id': tour_id, 'available_places': row.available_places, 'version': row.version}
+
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    return StreamingResponse(availability_events(tour_id, initial), media_type='text/event-stream',
+                             headers=headers)
+
+
+async def load_tour(session: AsyncSession, tour_id: int) -> dict:
+    """
+    Получает тур по ID в виде словаря.
+
+    Параметры:
+        session (AsyncSession): Асинхронная сессия базы данных.
+        tour_id (int): ID тура.
+
+    Возвращает:
+        dict: Значения столбцов тура.
+
+    Исключения:
+        HTTPException: Если тур с указанным ID не найден.
+    """
+    query = select(TourTable).where(TourTable.id == tour_id)
+    logger.debug("Выполнение запроса: %s", query)
+    result = await session.execute(query)
+    tour = result.scalars().first()
+    if not tour:
+        logger.warning("Тур с ID %s не найден", tour_id)
+        raise HTTPException(status_code=404, detail="Тур не найден")
+    return tour_as_dict(tour)
 
 
 @router.get('/tours/current_tour/{tour_id}')
-async def current_tour_page(request: Request, tour_id: int):
+async def current_tour_page(request: Request, tour_id: int, session: Annotated[AsyncSession, Depends(get_session)]):
     """
     Отображает страницу с информацией о текущем туре по его ID.
 
+    Готовый HTML и данные тура хранятся в кеше до изменения или удаления тура. Ответ содержит заголовки
+    ETag и Last-Modified по версии тура, при актуальной версии у клиента возвращается 304 Not Modified.
+
     Параметры:
         request (Request): Объект запроса FastAPI.
         tour_id (int): ID тура, который необходимо отобразить.
+        session (AsyncSession): Асинхронная сессия базы данных.
 
     Возвращает:
         HTMLResponse: HTML-страница с информацией о туре или страница ошибки, если тур не найден.
@@ -67,26 +303,39 @@ async def current_tour_page(request: Request, tour_id: int):
     Исключения:
         HTTPException: Если тур с указанным ID не найден.
     """
-    logger.debug(f"Запрос на страницу текущего тура с ID: {tour_id}")
+    logger.debug("Запрос на страницу текущего тура с ID: %s", tour_id)
+    html_key = await tour_cache.tour_key(tour_id, 'html', str(request.base_url))
+    page = await tour_cache.get(html_key)
     try:
-        with SessionLocal() as session:
-            logger.debug("Открытие сессии базы данных")
-            query = select(TourTable).where(TourTable.id == tour_id)
-            logger.debug(f"Выполнение запроса: {query}")
-            result = session.execute(query)
-            tour = result.scalars().first()
-            if not tour:
-                logger.warning(f"Тур с ID {tour_id} не найден")
-                raise HTTPException(status_code=404, detail="Тур не найден")
-
-            logger.info(f"Тур с ID {tour_id} найден")
+        if page is None:
+            data_key = await tour_cache.tour_key(tour_id, 'data')
+            tour = await tour_cache.get(data_key)
+            if tour is None:
+                version = await fetch_tour_version(session, tour_id)
+                if version is not None:
+                    etag, last_modified = tours_validators('tour', [version], with_last_modified=True)
+                    if is_not_modified(request, etag, last_modified):
+                        return not_modified_response(etag, last_modified)
+                tour = await load_tour(session, tour_id)
+                await tour_cache.set(data_key, tour)
+            etag, last_modified = tours_validators('tour', [tour], with_last_modified=True)
+            if is_not_modified(request, etag, last_modified):
+                return not_modified_response(etag, last_modified)
+
+            logger.info("Тур с ID %s найден", tour_id)
             context = {
                 'request': request,
                 'tour': tour,
             }
-            return templates.TemplateResponse('book_tour_page.html', context)
+            html = render_template('book_tour_page.html', context)
+            page = {'html': html, 'etag': etag, 'last_modified': last_modified}
+            await tour_cache.set(html_key, page)
+
+        if is_not_modified(request, page['etag'], page['last_modified']):
+            return not_modified_response(page['etag'], page['last_modified'])
+        return HTMLResponse(page['html'], headers=validator_headers(page['etag'], page['last_modified']))
     except HTTPException as e:
-        logger.error(f"Ошибка: {e.detail} - ID тура: {tour_id}")
+        logger.error("Ошибка: %s - ID тура: %s", e.detail, tour_id)
         context = {
             'request': request,
         }
@@ -5,9 +5,10 @@
 """
 
 import logging
-from typing import Any
+from datetime import date, datetime
+from typing import Any, Optional
 from fastapi import Path
-from pydantic import BaseModel, field_validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 
 # Настройка логирования
 logger = logging.getLogger('log')
@@ -21,7 +22,7 @@ class SchemaTour(BaseModel):
         title (str): Название тура (максимум 17 символов).
         description (str): Описание тура (максимум 1100 символов).
         place (str): Место проведения тура (максимум 27 символов).
-        start_date_tour (str): Дата начала тура.
+        start_date_tour (date): Дата начала тура.
         duration (int): Длительность тура в днях (должно быть больше 0).
         max_people (int): Максимальное количество участников тура (должно быть больше 0).
         available_places (int): Количество доступных мест (должно быть больше 0).
@@ -31,7 +32,7 @@ class SchemaTour(BaseModel):
     title: str = Path(max_length=17)
     description: str = Path(max_length=1100)
     place: str = Path(max_length=27)
-    start_date_tour: str
+    start_date_tour: date
     duration: int = Path(gt=0)
     max_people: int = Path(gt=0)
     available_places: int = Path(gt=0)
@@ -140,7 +141,7 @@ class TourUpdate(BaseModel):
         new_title (str): Новое название тура (максимум 17 символов).
         new_description (str): Новое описание тура (максимум 1100 символов).
         new_place (str): Новое место проведения тура (максимум 27 символов).
-        new_start_date_tour (str): Новая дата начала тура.
+        new_start_date_tour (date): Новая дата начала тура.
         new_duration (int): Новая длительность тура в днях (должно быть больше 0).
         new_max_people (int): Новое максимальное количество участников тура (должно быть больше 0).
         new_available_places (int): Новое количество доступных мест (должно быть больше 0).
@@ -150,7 +151,7 @@ class TourUpdate(BaseModel):
     new_title: str = Path(max_length=17)
     new_description: str = Path(max_length=1100)
     new_place: str = Path(max_length=27)
-    new_start_date_tour: str
+    new_start_date_tour: date
     new_duration: int = Path(gt=0)
     new_max_people: int = Path(gt=0)
     new_available_places: int = Path(gt=0)
@@ -236,3 +237,208 @@ class TourUpdate(BaseModel):
             logger.warning('В поле new_price_per_person введено отрицательное значение')
             raise ValueError("Данное значение должно быть больше 0.")
         return value
+
+
+class TourPatch(BaseModel):
+    """
+    Схема частичного обновления тура: передаются только изменяемые поля.
+
+    Ограничения полей совпадают со схемой SchemaTour. Поля, которые не переданы (None), не изменяются.
+
+    Атрибуты:
+        title (str | None): Новое название тура (максимум 17 символов).
+        description (str | None): Новое описание тура (максимум 1100 символов).
+        place (str | None): Новое место проведения тура (максимум 27 символов).
+        start_date_tour (date | None): Новая дата начала тура.
+        duration (int | None): Новая длительность тура в днях (больше 0).
+        max_people (int | None): Новое максимальное количество участников тура (больше 0).
+        available_places (int | None): Новое количество доступных мест (больше 0).
+        occupied_places (int | None): Новое количество занятых мест (не меньше 0).
+        price_per_person (int | None): Новая цена за человека (больше 0).
+    """
+    title: Optional[str] = Field(default=None, max_length=17)
+    description: Optional[str] = Field(default=None, max_length=1100)
+    place: Optional[str] = Field(default=None, max_length=27)
+    start_date_tour: Optional[date] = None
+    duration: Optional[int] = Field(default=None, gt=0)
+    max_people: Optional[int] = Field(default=None, gt=0)
+    available_places: Optional[int] = Field(default=None, gt=0)
+    occupied_places: Optional[int] = Field(default=None, ge=0)
+    price_per_person: Optional[int] = Field(default=None, gt=0)
+
+    def changes(self) -> dict[str, Any]:
+        """
+        Возвращает переданные поля и их значения для запроса UPDATE.
+
+        Возвращает:
+            dict[str, Any]: Имя столбца -> новое значение.
+        """
+        return self.model_dump(exclude_none=True)
+
+
+class TourOut(BaseModel):
+    """
+    Схема тура в ответах API.
+
+    Содержит поля схемы Tour, а также имя изображения, версию и время изменения тура. В отличие от Tour
+    не проверяет ограничения ввода: у распроданного тура количество свободных мест равно 0.
+
+    Атрибуты:
+        id (int): Уникальный идентификатор тура.
+        title (str): Название тура.
+        description (str): Описание тура.
+        place (str): Место проведения тура.
+        start_date_tour (date): Дата начала тура.
+        duration (int): Длительность тура в днях.
+        max_people (int): Максимальное количество участников тура.
+        available_places (int): Количество свободных мест.
+        occupied_places (int): Количество занятых мест.
+        price_per_person (int): Цена за человека.
+        image (str | None): Имя файла изображения тура.
+        version (int): Номер версии тура.
+        updated_at (datetime | None): Время последнего изменения тура (UTC).
+    """
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    title: str
+    description: str
+    place: str
+    start_date_tour: date
+    duration: int
+    max_people: int
+    available_places: int
+    occupied_places: int
+    price_per_person: int
+    image: Optional[str] = None
+    version: int
+    updated_at: Optional[datetime] = None
+
+
+class TourUpdated(BaseModel):
+    """
+    Схема ответа на обновление тура.
+
+    Атрибуты:
+        detail (str): Сообщение об успешном обновлении.
+        tour (TourOut): Обновленный тур.
+    """
+    detail: str
+    tour: TourOut
+
+
+class TourFilter(BaseModel):
+    """
+    Схема параметров постраничного вывода и фильтрации списка туров.
+
+    Постраничный вывод выполняется по ключу (keyset): вместо смещения передается ID последнего тура
+    предыдущей страницы, поэтому стоимость запроса не зависит от номера страницы.
+
+    Атрибуты:
+        after_id (int | None): ID последнего тура предыдущей страницы (курсор).
+        limit (int): Количество туров на странице (от 1 до 100).
+        place (str | None): Место проведения тура (точное совпадение).
+        price_min (int | None): Минимальная цена за человека.
+        price_max (int | None): Максимальная цена за человека.
+        start_date_from (date | None): Дата начала тура не раньше указанной.
+        start_date_to (date | None): Дата начала тура не позже указанной.
+        has_places (bool): Только туры со свободными местами.
+    """
+    after_id: Optional[int] = Field(default=None, ge=0)
+    limit: int = Field(default=20, gt=0, le=100)
+    place: Optional[str] = Field(default=None, max_length=27)
+    price_min: Optional[int] = Field(default=None, ge=0)
+    price_max: Optional[int] = Field(default=None, ge=0)
+    start_date_from: Optional[date] = None
+    start_date_to: Optional[date] = None
+    has_places: bool = False
+
+
+class TourSearch(BaseModel):
+    """
+    Схема параметров полнотекстового поиска туров.
+
+    Атрибуты:
+        q (str): Строка поиска (слова из названия, описания или места проведения тура).
+        limit (int): Максимальное количество результатов (от 1 до 100).
+    """
+    q: str = Field(min_length=1, max_length=100)
+    limit: int = Field(default=20, gt=0, le=100)
+
+
+class FacetCount(BaseModel):
+    """
+    Схема значения фасета и количества туров с этим значением.
+
+    Атрибуты:
+        value (str | int): Значение (место, месяц начала тура, длительность).
+        count (int): Количество туров.
+    """
+    value: str | int
+    count: int
+
+
+class PriceBand(BaseModel):
+    """
+    Схема ценового диапазона фасета.
+
+    Атрибуты:
+        min (int): Нижняя граница цены за человека (включительно).
+        max (int): Верхняя граница цены за человека (не включительно).
+        count (int): Количество туров.
+    """
+    min: int
+    max: int
+    count: int
+
+
+class TourFacets(BaseModel):
+    """
+    Схема фасетов списка туров: количество туров по местам, ценовым диапазонам, месяцам начала и длительности.
+
+    Атрибуты:
+        total (int): Общее количество туров, удовлетворяющих фильтрам.
+        places (list[FacetCount]): Количество туров по местам проведения.
+        price_bands (list[PriceBand]): Количество туров по ценовым диапазонам.
+        start_months (list[FacetCount]): Количество туров по месяцам начала (YYYY-MM).
+        durations (list[FacetCount]): Количество туров по длительности в днях.
+    """
+    total: int
+    places: list[FacetCount]
+    price_bands: list[PriceBand]
+    start_months: list[FacetCount]
+    durations: list[FacetCount]
+
+
+class BookingCreate(BaseModel):
+    """
+    Схема запроса на бронирование мест в туре.
+
+    Атрибуты:
+        seats (int): Количество мест (от 1 до 50).
+        customer_name (str): Имя клиента (максимум 100 символов).
+        customer_phone (str): Телефон клиента (максимум 30 символов).
+    """
+    seats: int = Field(default=1, gt=0, le=50)
+    customer_name: str = Field(min_length=1, max_length=100)
+    customer_phone: str = Field(min_length=1, max_length=30)
+
+
+class Booking(BaseModel):
+    """
+    Схема созданного бронирования.
+
+    Атрибуты:
+        id (int): Уникальный идентификатор бронирования.
+        tour_id (int): ID тура.
+        seats (int): Количество забронированных мест.
+        customer_name (str): Имя клиента.
+        created_at (datetime): Время создания бронирования (UTC).
+        available_places (int): Количество свободных мест в туре после бронирования.
+    """
+    id: int
+    tour_id: int
+    seats: int
+    customer_name: str
+    created_at: datetime
+    available_places: int
@@ -0,0 +1,197 @@
+"""
+Этот файл содержит настройки приложения. Значения читаются из переменных окружения, поэтому одну и ту же сборку
+можно запускать с разной конфигурацией (разработка, нагрузочное тестирование, production) без правки кода.
+"""
+
+import os
+from pathlib import Path
+
+# Определяем BASE_DIR как путь к корневой директории проекта.
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def _env_int(name: str, default: int) -> int:
+    """
+    Читает целочисленное значение из переменной окружения.
+
+    Параметры:
+        name (str): Имя переменной окружения.
+        default (int): Значение по умолчанию, если переменная не задана.
+
+    Возвращает:
+        int: Значение переменной окружения или значение по умолчанию.
+    """
+    value = os.getenv(name)
+    return int(value) if value not in (None, '') else default
+
+
+# Путь к файлу базы данных SQLite.
+DATABASE_PATH = os.getenv('DATABASE_PATH', './data.db')
+
+# Применять ли миграции базы данных при запуске приложения. В production миграции можно выполнять
+# один раз при развертывании (python -m database.migrations) и отключить их при запуске воркеров.
+DB_MIGRATE_ON_STARTUP = bool(_env_int('DB_MIGRATE_ON_STARTUP', 1))
+
+# Размер пула соединений с базой данных.
+DB_POOL_SIZE = _env_int('DB_POOL_SIZE', 5)
+# Количество соединений, которые могут быть открыты сверх размера пула при пиковой нагрузке.
+DB_MAX_OVERFLOW = _env_int('DB_MAX_OVERFLOW', 10)
+# Время ожидания свободного соединения из пула в секундах.
+DB_POOL_TIMEOUT = _env_int('DB_POOL_TIMEOUT', 30)
+
+# Режим журнала SQLite. WAL позволяет читателям не блокироваться на время записи.
+SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+# Режим синхронизации с диском. NORMAL в режиме WAL безопасен и заметно быстрее FULL.
+SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+# Размер области файла базы данных, отображаемой в память (в байтах).
+SQLITE_MMAP_SIZE = _env_int('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)
+# Размер страничного кеша. Отрицательное значение задает размер в килобайтах (здесь 64 МБ на соединение).
+SQLITE_CACHE_SIZE = _env_int('SQLITE_CACHE_SIZE', -64000)
+# Время ожидания снятия блокировки базы данных в миллисекундах вместо немедленной ошибки "database is locked".
+SQLITE_BUSY_TIMEOUT = _env_int('SQLITE_BUSY_TIMEOUT', 5000)
+
+# Хранилище кеша страниц туров: 'memory' (в памяти процесса) или 'sqlite' (общий файл для нескольких воркеров).
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'memory')
+# Путь к файлу кеша для хранилища 'sqlite'.
+CACHE_SQLITE_PATH = os.getenv('CACHE_SQLITE_PATH', './cache.db')
+# Время жизни записи кеша в секундах.
+CACHE_TTL = _env_int('CACHE_TTL', 300)
+# Максимальное количество записей в кеше. При превышении вытесняются давно не использовавшиеся записи (LRU).
+CACHE_MAX_ENTRIES = _env_int('CACHE_MAX_ENTRIES', 1024)
+
+# Максимальное количество готовых карточек туров в кеше фрагментов HTML (в памяти каждого воркера).
+FRAGMENT_CACHE_MAX_ENTRIES = _env_int('FRAGMENT_CACHE_MAX_ENTRIES', 5000)
+# Размер части страницы в символах, после накопления которой она отправляется клиенту при потоковой отрисовке.
+TEMPLATE_STREAM_CHUNK_SIZE = _env_int('TEMPLATE_STREAM_CHUNK_SIZE', 8192)
+
+# Каталог изображений туров (относительно корня проекта).
+TOUR_IMAGE_DIR = os.getenv('TOUR_IMAGE_DIR', os.path.join('static', 'image', 'img_tour'))
+# Каталог уменьшенных копий изображений туров.
+TOUR_IMAGE_VARIANTS_DIR = os.path.join(TOUR_IMAGE_DIR, 'variants')
+# Адрес, по которому раздаются уменьшенные копии (каталог TOUR_IMAGE_VARIANTS_DIR), например адрес CDN.
+TOUR_IMAGE_VARIANTS_URL = os.getenv('TOUR_IMAGE_VARIANTS_URL', '/static/image/img_tour/variants').rstrip('/')
+# Максимальный размер загружаемого изображения в байтах.
+MAX_UPLOAD_SIZE = _env_int('MAX_UPLOAD_SIZE', 5 * 1024 * 1024)
+# Размер блока, которым загружаемый файл записывается на диск.
+UPLOAD_CHUNK_SIZE = _env_int('UPLOAD_CHUNK_SIZE', 64 * 1024)
+# Время в секундах после последнего сохранения изображения, в течение которого оно не удаляется, даже если на него
+# еще не ссылается ни один тур: запрос, повторно загрузивший тот же файл, может еще не зафиксировать ссылку.
+IMAGE_RELEASE_GRACE_SECONDS = _env_int('IMAGE_RELEASE_GRACE_SECONDS', 300)
+# Допустимые расширения загружаемых изображений.
+ALLOWED_IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.avif')
+
+# Количество строк, вставляемых одной транзакцией при массовом импорте туров.
+BULK_BATCH_SIZE = _env_int('BULK_BATCH_SIZE', 500)
+# Максимальное количество ошибок строк, возвращаемых в отчете об импорте (остальные только подсчитываются).
+BULK_MAX_ERRORS = _env_int('BULK_MAX_ERRORS', 100)
+
+# Окружение запуска: 'development' или 'production'. Определяет уровень и формат логов по умолчанию.
+APP_ENV = os.getenv('APP_ENV', 'production')
+# Уровень логирования приложения. Сообщения ниже этого уровня отбрасываются до форматирования.
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'DEBUG' if APP_ENV == 'development' else 'INFO').upper()
+# Формат записей в файле логов: 'json' (одна запись JSON на строку) или 'text'.
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text' if APP_ENV == 'development' else 'json')
+# Путь к файлу логов.
+LOG_FILE = os.getenv('LOG_FILE', str(BASE_DIR / 'logs.log'))
+# Размер файла логов в байтах, после которого он переименовывается и начинается новый файл.
+LOG_MAX_BYTES = _env_int('LOG_MAX_BYTES', 10 * 1024 * 1024)
+# Количество хранимых предыдущих файлов логов.
+LOG_BACKUP_COUNT = _env_int('LOG_BACKUP_COUNT', 5)
+
+# Собирать ли метрики приложения (время запросов, запросы к базе данных, отрисовка шаблонов) для /metrics.
+METRICS_ENABLED = bool(_env_int('METRICS_ENABLED', 1))
+
+# Ширина ценового диапазона в фасетах списка туров (в рублях).
+FACET_PRICE_BAND = _env_int('FACET_PRICE_BAND', 10000)
+
+# Интервал отправки пустых сообщений (heartbeat) в потоке Server-Sent Events, в секундах. Не дает прокси
+# закрыть неактивное соединение и позволяет обнаружить отключившихся клиентов.
+SSE_HEARTBEAT_INTERVAL = _env_int('SSE_HEARTBEAT_INTERVAL', 15)
+# Максимальная длительность одного потока событий в секундах, после которой браузер переподключается.
+SSE_MAX_STREAM_SECONDS = _env_int('SSE_MAX_STREAM_SECONDS', 600)
+# Задержка переподключения браузера после обрыва потока событий, в миллисекундах.
+SSE_RETRY_MS = _env_int('SSE_RETRY_MS', 3000)
+# Максимальное количество неотправленных изменений туров у одного подписчика. При превышении подписка закрывается.
+SSE_MAX_PENDING = _env_int('SSE_MAX_PENDING', 1000)
+
+# Каталог статических файлов (относительно корня проекта).
+STATIC_DIR = 'static'
+# Каталог собранных статических файлов: копии с хешем содержимого в имени и их сжатые варианты (gzip, brotli).
+STATIC_BUILD_DIR = os.path.join(STATIC_DIR, 'dist')
+# Собирать статические файлы при запуске приложения (1) или только командой python -m assets.assets (0).
+STATIC_BUILD_ON_STARTUP = _env_int('STATIC_BUILD_ON_STARTUP', 1)
+# Время кеширования собранных статических файлов браузером в секундах (Cache-Control: max-age).
+STATIC_MAX_AGE = _env_int('STATIC_MAX_AGE', 365 * 24 * 60 * 60)
+
+# Минимальный размер ответа в байтах, начиная с которого ответ сжимается (gzip или brotli).
+COMPRESSION_MIN_SIZE = _env_int('COMPRESSION_MIN_SIZE', 1024)
+# Уровень сжатия gzip (1-9) для ответов приложения.
+COMPRESSION_GZIP_LEVEL = _env_int('COMPRESSION_GZIP_LEVEL', 6)
+# Качество сжатия brotli (0-11) для ответов приложения. Высокие значения слишком медленны для сжатия на лету.
+COMPRESSION_BROTLI_QUALITY = _env_int('COMPRESSION_BROTLI_QUALITY', 4)
+
+# Каталог HTML-шаблонов Jinja2 (относительно корня проекта).
+TEMPLATES_DIR = 'templates'
+# Проверять изменение файлов шаблонов при каждом обращении (1 при разработке, 0 в production).
+TEMPLATES_AUTO_RELOAD = _env_int('TEMPLATES_AUTO_RELOAD', 1 if APP_ENV == 'development' else 0)
+# Каталог кеша скомпилированных шаблонов. Новые воркеры загружают из него готовый байт-код вместо компиляции.
+TEMPLATES_CACHE_DIR = os.getenv('TEMPLATES_CACHE_DIR', str(BASE_DIR / '.template_cache'))
+
+# Каталог статической копии публичной части сайта (для раздачи nginx или CDN).
+SNAPSHOT_DIR = os.getenv('SNAPSHOT_DIR', str(BASE_DIR / 'snapshot_site'))
+# Адрес сайта, с которым формируются абсолютные ссылки на страницах статической копии.
+SNAPSHOT_BASE_URL = os.getenv('SNAPSHOT_BASE_URL', 'http://127.0.0.1:8000')
+# Обновлять статическую копию после изменения туров (1) или только командой python -m snapshot.snapshot (0).
+SNAPSHOT_ENABLED = _env_int('SNAPSHOT_ENABLED', 0)
+
+# Количество воркеров фоновых задач в каждом процессе приложения (0 - задачи выполняет только отдельный процесс
+# python -m jobs.worker).
+JOB_WORKERS = _env_int('JOB_WORKERS', 2)
+# Максимальное количество попыток выполнения фоновой задачи.
+JOB_MAX_ATTEMPTS = _env_int('JOB_MAX_ATTEMPTS', 5)
+# Задержка перед повторной попыткой в секундах; удваивается после каждой неудачной попытки.
+JOB_RETRY_DELAY = _env_int('JOB_RETRY_DELAY', 2)
+# Интервал проверки таблицы задач в секундах (новые задачи этого процесса запускаются сразу, без ожидания).
+JOB_POLL_INTERVAL = _env_int('JOB_POLL_INTERVAL', 5)
+# Время в секундах, после которого выполняемая задача считается прерванной (например, при остановке процесса)
+# и выполняется заново.
+JOB_LEASE_SECONDS = _env_int('JOB_LEASE_SECONDS', 300)
+
+# Ограничивать частоту запросов клиентов и количество одновременно обрабатываемых запросов (utils/admission.py).
+ADMISSION_ENABLED = _env_int('ADMISSION_ENABLED', 1)
+# Брать адрес клиента из заголовка X-Forwarded-For (только если приложение работает за доверенным прокси).
+ADMISSION_TRUST_FORWARDED = _env_int('ADMISSION_TRUST_FORWARDED', 0)
+# Максимальное количество клиентов, для которых хранится запас запросов (в каждом классе запросов).
+ADMISSION_MAX_CLIENTS = _env_int('ADMISSION_MAX_CLIENTS', 10000)
+# Максимальное время ожидания запроса в очереди на обработку в миллисекундах.
+ADMISSION_QUEUE_TIMEOUT_MS = _env_int('ADMISSION_QUEUE_TIMEOUT_MS', 2000)
+# Значение заголовка Retry-After ответа 503 в секундах.
+ADMISSION_RETRY_AFTER = _env_int('ADMISSION_RETRY_AFTER', 2)
+# Ограничения классов запросов: read (GET, HEAD), write (изменения без файлов), upload (загрузка файлов).
+# RATE_LIMIT_*_PER_MINUTE и RATE_LIMIT_*_BURST - частота запросов одного клиента в минуту и допустимая серия
+# запросов подряд; CONCURRENCY_*_LIMIT - количество одновременно обрабатываемых запросов класса в процессе,
+# CONCURRENCY_*_QUEUE - количество запросов, ожидающих обработки. Значение 0 отключает ограничение.
+RATE_LIMIT_READ_PER_MINUTE = _env_int('RATE_LIMIT_READ_PER_MINUTE', 600)
+RATE_LIMIT_READ_BURST = _env_int('RATE_LIMIT_READ_BURST', 100)
+CONCURRENCY_READ_LIMIT = _env_int('CONCURRENCY_READ_LIMIT', 64)
+CONCURRENCY_READ_QUEUE = _env_int('CONCURRENCY_READ_QUEUE', 256)
+RATE_LIMIT_WRITE_PER_MINUTE = _env_int('RATE_LIMIT_WRITE_PER_MINUTE', 120)
+RATE_LIMIT_WRITE_BURST = _env_int('RATE_LIMIT_WRITE_BURST', 20)
+CONCURRENCY_WRITE_LIMIT = _env_int('CONCURRENCY_WRITE_LIMIT', 8)
+CONCURRENCY_WRITE_QUEUE = _env_int('CONCURRENCY_WRITE_QUEUE', 32)
+RATE_LIMIT_UPLOAD_PER_MINUTE = _env_int('RATE_LIMIT_UPLOAD_PER_MINUTE', 30)
+RATE_LIMIT_UPLOAD_BURST = _env_int('RATE_LIMIT_UPLOAD_BURST', 5)
+CONCURRENCY_UPLOAD_LIMIT = _env_int('CONCURRENCY_UPLOAD_LIMIT', 2)
+CONCURRENCY_UPLOAD_QUEUE = _env_int('CONCURRENCY_UPLOAD_QUEUE', 4)
+
+# Токен профилирования запросов по требованию (заголовок X-Profile или параметр profile) и просмотра записей
+# /admin/profiles_admin (заголовок X-Profile-Token). Пустое значение отключает профилирование по требованию.
+PROFILE_TOKEN = os.getenv('PROFILE_TOKEN', '')
+# Порог в миллисекундах, начиная с которого запросы записываются автоматически (0 - не записывать).
+PROFILE_SLOW_REQUEST_MS = _env_int('PROFILE_SLOW_REQUEST_MS', 1000)
+# Количество хранимых записей профилирования (в памяти каждого процесса).
+PROFILE_BUFFER_SIZE = _env_int('PROFILE_BUFFER_SIZE', 50)
+# Интервал снятия стека при профилировании по требованию в миллисекундах.
+PROFILE_SAMPLE_INTERVAL_MS = _env_int('PROFILE_SAMPLE_INTERVAL_MS', 2)
+# Максимальное количество запросов к базе данных в одной записи.
+PROFILE_MAX_SQL = _env_int('PROFILE_MAX_SQL', 200)
@@ -0,0 +1,273 @@
+"""
+Этот файл содержит создание статической копии публичной части сайта для раздачи через nginx или CDN.
+
+В копию входят главная страница, все страницы списка туров без фильтров, страницы всех туров и статические
+файлы (каталог static). Страницы запрашиваются у самого приложения (без сети, через ASGI), поэтому совпадают
+с ответами приложения:
+    - / -> index.html;
+    - /views/tours/ -> views/tours/index.html;
+    - /views/tours/?after_id=N -> views/tours/after_id/N.html;
+    - /views/tours/current_tour/N -> views/tours/current_tour/N.html.
+
+Копия обновляется частично: для каждой страницы хранится подпись (версии туров страницы, фасеты и версия
+шаблонов и статических файлов), и заново отрисовываются только страницы, подпись которых изменилась, а
+страницы удаленных туров удаляются. При включенной настройке SNAPSHOT_ENABLED обновление запускается в фоне
+после изменения туров через админ-панель и бронирования.
+
+Полная пересборка копии выполняется командой (из корня проекта):
+    python -m snapshot.snapshot [--full]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import shutil
+from typing import Optional
+import httpx
+from sqlalchemy import select
+from starlette.concurrency import run_in_threadpool
+from assets.assets import load_manifest
+from database.db import AsyncSessionLocal, TourTable
+from database.queries import fetch_tour_facets
+from schemas.schem import TourFilter
+from settings import settings
+from utils.admission import internal_app
+
+# Настройка логирования
+logger = logging.getLogger('log')
+
+# Имя файла с подписями страниц последнего обновления копии
+STATE_NAME = '.snapshot.json'
+# Адрес страницы списка туров
+LIST_URL = '/views/tours/'
+
+
+def _digest(*parts) -> str:
+    """
+    Возвращает подпись страницы по значениям, от которых зависит ее содержимое.
+    """
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+
+
+def site_fingerprint() -> str:
+    """
+    Возвращает версию оформления сайта: хеш шаблонов и соответствия собранных статических файлов.
+
+    При изменении шаблонов или статических файлов меняются подписи всех страниц, и копия отрисовывается заново.
+
+    Возвращает:
+        str: Хеш оформления.
+    """
+    sha = hashlib.sha1()
+    for name in sorted(os.listdir(settings.TEMPLATES_DIR)):
+        with open(os.path.join(settings.TEMPLATES_DIR, name), 'rb') as file:
+            sha.update(name.encode('utf-8') + b'\0' + file.read())
+    sha.update(json.dumps(load_manifest(), sort_keys=True).encode('utf-8'))
+    return sha.hexdigest()
+
+
+async def plan_pages() -> dict[str, tuple[str, str]]:
+    """
+    Определяет страницы копии и их подписи по текущему состоянию базы данных.
+
+    Страницы списка разбиваются так же, как при переходе по ссылкам "Следующая страница" (по курсору after_id
+    с размером страницы по умолчанию). Подпись страницы списка зависит от ID и версий ее туров, наличия
+    следующей страницы и фасетов, подпись страницы тура - от версии тура.
+
+    Возвращает:
+        dict[str, tuple[str, str]]: Путь файла относительно каталога копии -> (адрес страницы, подпись).
+    """
+    fingerprint = site_fingerprint()
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(select(TourTable.id, TourTable.version).order_by(TourTable.id))
+        tours = [(tour_id, version) for tour_id, version in result.all()]
+        facets = await fetch_tour_facets(session, TourFilter())
+    facets_digest = _digest(json.dumps(facets, sort_keys=True, default=str))
+
+    pages = {'index.html': ('/', _digest(fingerprint))}
+    limit = TourFilter().limit
+    after_id: Optional[int] = None
+    for start in range(0, max(len(tours), 1), limit):
+        chunk = tours[start:start + limit]
+        has_next = start + limit < len(tours)
+        if after_id is None:
+            path, url = 'views/tours/index.html', LIST_URL
+        else:
+            path, url = f'views/tours/after_id/{after_id}.html', f'{LIST_URL}?after_id={after_id}'
+        pages[path] = (url, _digest(fingerprint, facets_digest, chunk, has_next))
+        if chunk:
+            after_id = chunk[-1][0]
+    for tour_id, version in tours:
+        pages[f'views/tours/current_tour/{tour_id}.html'] = (f'/views/tours/current_tour/{tour_id}',
+                                                            _digest(fingerprint, version))
+    return pages
+
+
+def _write_file(path: str, content: bytes):
+    """
+    Атомарно записывает файл копии.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'wb') as file:
+        file.write(content)
+    os.replace(temp_path, path)
+
+
+async def render_pages(pages: dict[str, str]):
+    """
+    Запрашивает страницы у приложения и сохраняет их в каталог копии.
+
+    Параметры:
+        pages (dict[str, str]): Путь файла относительно каталога копии -> адрес страницы.
+
+    Исключения:
+        httpx.HTTPStatusError: Если приложение вернуло ошибку.
+    """
+    # Приложение импортируется здесь, так как его маршруты сами запускают обновление копии
+    from main import app
+
+    # Серия запросов копии не должна получать отказы контроля нагрузки
+    transport = httpx.ASGITransport(app=internal_app(app))
+    async with httpx.AsyncClient(transport=transport, base_url=settings.SNAPSHOT_BASE_URL) as client:
+        for path, url in pages.items():
+            response = await client.get(url, headers={'Accept-Encoding': 'identity'})
+            response.raise_for_status()
+            await run_in_threadpool(_write_file, os.path.join(settings.SNAPSHOT_DIR, path), response.content)
+
+
+def sync_static() -> int:
+    """
+    Копирует статические файлы в каталог копии: новые и измененные файлы копируются, удаленные - удаляются.
+
+    Возвращает:
+        int: Количество скопированных файлов.
+    """
+    target_root = os.path.join(settings.SNAPSHOT_DIR, 'static')
+    copied = 0
+    expected = set()
+    for directory, _, filenames in os.walk(settings.STATIC_DIR):
+        for name in filenames:
+            source = os.path.join(directory, name)
+            target = os.path.join(target_root, os.path.relpath(source, settings.STATIC_DIR))
+            expected.add(os.path.normpath(target))
+            source_stat = os.stat(source)
+            if os.path.exists(target):
+                target_stat = os.stat(target)
+                if (target_stat.st_size, int(target_stat.st_mtime)) == (source_stat.st_size,
+                                                                         int(source_stat.st_mtime)):
+                    continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copy2(source, target)
+            copied += 1
+    for directory, _, filenames in os.walk(target_root):
+        for name in filenames:
+            path = os.path.normpath(os.path.join(directory, name))
+            if path not in expected:
+                os.remove(path)
+    return copied
+
+
+def _load_state() -> dict[str, str]:
+    """
+    Загружает подписи страниц последнего обновления копии.
+    """
+    try:
+        with open(os.path.join(settings.SNAPSHOT_DIR, STATE_NAME), encoding='utf-8') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+
+
+async def update_snapshot(full: bool = False) -> dict:
+    """
+    Обновляет статическую копию сайта: отрисовывает новые и измененные страницы, удаляет страницы удаленных
+    туров и копирует статические файлы.
+
+    Параметры:
+        full (bool): Отрисовать заново все страницы.
+
+    Возвращает:
+        dict: Количество отрисованных, удаленных и неизмененных страниц и скопированных статических файлов.
+    """
+    plan = await plan_pages()
+    state = {} if full else _load_state()
+    changed = {
+        path: url for path, (url, signature) in plan.items()
+        if state.get(path) != signature or not os.path.exists(os.path.join(settings.SNAPSHOT_DIR, path))
+    }
+    await render_pages(changed)
+
+    removed = [path for path in state if path not in plan]
+    for path in removed:
+        full_path = os.path.join(settings.SNAPSHOT_DIR, path)
+        if os.path.exists(full_path):
+            os.remove(full_path)
+    copied = await run_in_threadpool(sync_static)
+
+    state = {path: signature for path, (_, signature) in plan.items()}
+    await run_in_threadpool(_write_file, os.path.join(settings.SNAPSHOT_DIR, STATE_NAME),
+                            json.dumps(state, indent=0, sort_keys=True).encode('utf-8'))
+    report = {'rendered': len(changed), 'removed': len(removed), 'unchanged': len(plan) - len(changed),
+              'static_files_copied': copied}
+    logger.info("Статическая копия сайта обновлена: %s", report)
+    return report
+
+
+class SnapshotUpdater:
+    """
+    Фоновое обновление статической копии после изменения туров.
+
+    Одновременно выполняется не больше одного обновления: изменения, сделанные во время обновления, учитываются
+    следующим обновлением, которое запускается сразу после текущего.
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._pending = False
+
+    def request_update(self):
+        """
+        Запрашивает обновление копии (если включена настройка SNAPSHOT_ENABLED).
+        """
+        if not settings.SNAPSHOT_ENABLED:
+            return
+        self._pending = True
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while self._pending:
+            self._pending = False
+            try:
+                await update_snapshot()
+            except Exception:
+                logger.exception("Не удалось обновить статическую копию сайта")
+
+
+# Общий планировщик обновления статической копии
+snapshot_updater = SnapshotUpdater()
+
+
+async def _run_command(full: bool) -> dict:
+    """
+    Обновляет копию при запуске из командной строки: как при запуске приложения, применяются миграции,
+    собираются статические файлы и загружаются шаблоны, а в конце закрываются соединения пула.
+    """
+    from main import app, lifespan
+
+    async with lifespan(app):
+        return await update_snapshot(full=full)
+
+
+if __name__ == '__main__':
+    from log_settings.log_settings import setup_logging
+
+    setup_logging()
+    parser = argparse.ArgumentParser(description='Создание статической копии публичной части сайта')
+    parser.add_argument('--full', action='store_true', help='Отрисовать заново все страницы')
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(_run_command(args.full)), ensure_ascii=False))
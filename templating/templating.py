@@ -0,0 +1,157 @@
+"""
+Этот файл содержит общее окружение шаблонов Jinja2 приложения.
+
+Все маршруты используют один объект templates, поэтому каждый шаблон компилируется и хранится в памяти
+воркера один раз. В production (TEMPLATES_AUTO_RELOAD=0) Jinja2 не проверяет изменение файлов шаблонов при
+каждом обращении. Скомпилированный байт-код шаблонов сохраняется в TEMPLATES_CACHE_DIR, поэтому новые
+воркеры не компилируют шаблоны заново, а при запуске приложения все шаблоны загружаются заранее
+(warm_up_templates), и первый запрос к странице не тратит время на их загрузку.
+
+Карточки туров отрисовываются функцией render_card и хранятся в кеше фрагментов по ID и версии тура, а
+длинные страницы можно отдавать по частям во время отрисовки (stream_template).
+"""
+
+import logging
+import os
+import time
+from typing import AsyncIterator, Awaitable, Callable, Optional
+from fastapi.templating import Jinja2Templates
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+from markupsafe import Markup, escape
+from assets.assets import static_url
+from cache.cache import fragment_cache
+from database.queries import SNIPPET_END, SNIPPET_START
+from images.processing import image_sources
+from metrics.metrics import TimedTemplate
+from settings import settings
+
+# Настройка логирования
+logger = logging.getLogger('log')
+
+
+def highlight(snippet: str) -> Markup:
+    """
+    Фильтр Jinja2: экранирует фрагмент результата поиска и выделяет совпадения тегом <mark>.
+
+    Параметры:
+        snippet (str): Фрагмент описания тура с маркерами совпадений.
+
+    Возвращает:
+        Markup: Безопасный HTML.
+    """
+    return Markup(str(escape(snippet)).replace(SNIPPET_START, '<mark>').replace(SNIPPET_END, '</mark>'))
+
+
+def render_card(tour: dict) -> Markup:
+    """
+    Возвращает HTML карточки тура из кеша фрагментов или отрисовывает шаблон tour_card.html.
+
+    Карточка зависит только от данных тура, поэтому ключом служат ID и версия тура (и фрагмент результата
+    поиска, если он есть): после изменения тура его карточка отрисовывается заново.
+
+    Параметры:
+        tour (dict): Значения столбцов тура.
+
+    Возвращает:
+        Markup: HTML карточки.
+    """
+    key = (tour['id'], tour.get('version'), tour.get('snippet'))
+    return fragment_cache.get_or_render(
+        key, lambda: Markup(templates.get_template('tour_card.html').render({'tour': tour})))
+
+
+def create_environment() -> Environment:
+    """
+    Создает окружение Jinja2 с кешем байт-кода и общими функциями и фильтрами шаблонов.
+
+    Возвращает:
+        Environment: Окружение шаблонов.
+    """
+    os.makedirs(settings.TEMPLATES_CACHE_DIR, exist_ok=True)
+    environment = Environment(
+        loader=FileSystemLoader(settings.TEMPLATES_DIR),
+        autoescape=True,
+        auto_reload=bool(settings.TEMPLATES_AUTO_RELOAD),
+        bytecode_cache=FileSystemBytecodeCache(settings.TEMPLATES_CACHE_DIR),
+    )
+    # Учет времени отрисовки шаблонов в метриках приложения
+    environment.template_class = TimedTemplate
+    # Функция формирования srcset уменьшенных копий изображений туров
+    environment.globals['image_sources'] = image_sources
+    # Адреса статических файлов с хешем содержимого
+    environment.globals['static_url'] = static_url
+    # Выделение совпадений во фрагментах результатов поиска
+    environment.filters['highlight'] = highlight
+    # Карточки туров из кеша фрагментов
+    environment.globals['render_card'] = render_card
+    return environment
+
+
+# Общие шаблоны Jinja2 приложения
+templates = Jinja2Templates(env=create_environment())
+
+
+def render_template(name: str, context: dict) -> str:
+    """
+    Отрисовывает шаблон Jinja2 в строку, чтобы результат можно было сохранить в кеше.
+
+    Параметры:
+        name (str): Имя шаблона.
+        context (dict): Контекст шаблона (должен содержать request для url_for).
+
+    Возвращает:
+        str: Готовый HTML.
+    """
+    return templates.get_template(name).render(context)
+
+
+async def stream_template(name: str, context: dict,
+                          on_complete: Optional[Callable[[str], Awaitable]] = None) -> AsyncIterator[str]:
+    """
+    Отрисовывает шаблон Jinja2 по частям (Template.generate) для StreamingResponse.
+
+    Части объединяются до TEMPLATE_STREAM_CHUNK_SIZE символов, чтобы не отправлять клиенту множество мелких
+    фрагментов: начало страницы и первые карточки отправляются, не дожидаясь отрисовки остальных.
+
+    Параметры:
+        name (str): Имя шаблона.
+        context (dict): Контекст шаблона.
+        on_complete (Callable | None): Асинхронная функция, получающая готовый HTML целиком после отправки
+            последней части (например, для сохранения страницы в кеше). Не вызывается, если клиент отключился.
+
+    Возвращает:
+        AsyncIterator[str]: Части HTML.
+    """
+    parts = []
+    buffer = []
+    size = 0
+    for piece in templates.get_template(name).generate(context):
+        buffer.append(piece)
+        size += len(piece)
+        if size >= settings.TEMPLATE_STREAM_CHUNK_SIZE:
+            chunk = ''.join(buffer)
+            parts.append(chunk)
+            buffer.clear()
+            size = 0
+            yield chunk
+    if buffer:
+        chunk = ''.join(buffer)
+        parts.append(chunk)
+        yield chunk
+    if on_complete is not None:
+        await on_complete(''.join(parts))
+
+
+def warm_up_templates() -> list[str]:
+    """
+    Загружает все шаблоны в память окружения (из кеша байт-кода или с компиляцией).
+
+    Возвращает:
+        list[str]: Имена загруженных шаблонов.
+    """
+    started = time.perf_counter()
+    names = templates.env.list_templates(extensions=['html'])
+    for name in names:
+        templates.get_template(name)
+    logger.info("Загружено шаблонов: %s за %.1f мс", len(names), (time.perf_counter() - started) * 1000)
+    return names
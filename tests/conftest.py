@@ -0,0 +1,109 @@
+"""
+Этот файл содержит общие настройки и фикстуры тестов.
+
+Настройки приложения читаются из переменных окружения при импорте settings, поэтому база данных, каталоги
+изображений, логов и кеша шаблонов тестов задаются во временном каталоге до импорта модулей приложения.
+Фоновые задачи в тестах выполняются явно (JOB_WORKERS=0), ограничения нагрузки и запись медленных запросов
+отключены и проверяются отдельно.
+
+Запуск из корня проекта:
+    python -m pytest
+"""
+
+import os
+import sys
+import tempfile
+from datetime import date
+from pathlib import Path
+import pytest
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+TEST_DIR = tempfile.mkdtemp(prefix='tours-tests-')
+
+os.environ.update({
+    'DATABASE_PATH': os.path.join(TEST_DIR, 'test.db'),
+    'TOUR_IMAGE_DIR': os.path.join(TEST_DIR, 'img_tour'),
+    'LOG_FILE': os.path.join(TEST_DIR, 'test.log'),
+    'TEMPLATES_CACHE_DIR': os.path.join(TEST_DIR, 'template_cache'),
+    'SNAPSHOT_DIR': os.path.join(TEST_DIR, 'snapshot_site'),
+    'CACHE_BACKEND': 'memory',
+    'STATIC_BUILD_ON_STARTUP': '0',
+    'SNAPSHOT_ENABLED': '0',
+    'JOB_WORKERS': '0',
+    'ADMISSION_ENABLED': '0',
+    'PROFILE_SLOW_REQUEST_MS': '0',
+    'PROFILE_TOKEN': '',
+})
+os.chdir(BASE_DIR)
+sys.path.insert(0, str(BASE_DIR))
+
+# Поля тура по умолчанию для фикстуры make_tour
+TOUR_DEFAULTS = {
+    'title': 'Тестовый тур',
+    'description': 'Описание тестового тура',
+    'place': 'Карелия',
+    'start_date_tour': date(2030, 6, 1),
+    'duration': 5,
+    'max_people': 10,
+    'available_places': 10,
+    'occupied_places': 0,
+    'price_per_person': 25000,
+    'image': 'test.jpg',
+}
+
+
+@pytest.fixture
+def anyio_backend():
+    return 'asyncio'
+
+
+@pytest.fixture(scope='session', autouse=True)
+def database():
+    """
+    Создает базу данных тестов миграциями.
+    """
+    from database.migrations import run_migrations
+
+    run_migrations()
+
+
+@pytest.fixture(autouse=True)
+async def dispose_engine(anyio_backend):
+    """
+    Закрывает соединения пула после каждого теста: соединения aiosqlite работают в отдельных потоках, которые
+    иначе не дают процессу тестов завершиться.
+    """
+    from database.db import async_engine
+
+    yield
+    await async_engine.dispose()
+
+
+@pytest.fixture
+async def client(anyio_backend):
+    """
+    Клиент HTTP, отправляющий запросы приложению без запуска сервера.
+    """
+    import httpx
+    from main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://test') as http_client:
+        yield http_client
+
+
+@pytest.fixture
+def make_tour(anyio_backend):
+    """
+    Возвращает асинхронную функцию, добавляющую тур в базу данных и возвращающую его ID.
+    """
+    from database.db import AsyncSessionLocal, TourTable
+
+    async def create(**fields) -> int:
+        async with AsyncSessionLocal() as session:
+            tour = TourTable(**{**TOUR_DEFAULTS, **fields})
+            session.add(tour)
+            await session.commit()
+            return tour.id
+
+    return create
@@ -0,0 +1,106 @@
+"""
+Тесты маршрутов админ-панели: загрузка, обновление и удаление туров.
+"""
+
+import os
+import pytest
+from sqlalchemy import delete, update
+from database.db import AsyncSessionLocal, TourTable
+from routers import routers_for_admin
+from settings import settings
+
+pytestmark = pytest.mark.anyio
+
+# Поля полного обновления тура (PUT)
+TOUR_UPDATE = {
+    'new_title': 'Обновленный', 'new_description': 'Новое описание', 'new_place': 'Алтай',
+    'new_start_date_tour': '2031-07-01', 'new_duration': 7, 'new_max_people': 12, 'new_available_places': 12,
+    'new_occupied_places': 0, 'new_price_per_person': 30000,
+}
+
+
+async def bump_version(tour_id: int):
+    """
+    Изменяет версию тура отдельным запросом, как бронирование или фоновая задача.
+    """
+    async with AsyncSessionLocal() as session:
+        await session.execute(update(TourTable).where(TourTable.id == tour_id)
+                              .values(version=TourTable.version + 1))
+        await session.commit()
+
+
+async def test_put_conflicts_with_concurrent_change(client, make_tour, monkeypatch):
+    tour_id = await make_tour()
+    saved = []
+
+    async def save_during_booking(upload):
+        result = await original_save_upload(upload)
+        saved.append(result[0])
+        await bump_version(tour_id)
+        return result
+
+    original_save_upload = routers_for_admin.save_upload
+    monkeypatch.setattr(routers_for_admin, 'save_upload', save_during_booking)
+    response = await client.put('/admin/update_tour_admin', params={'tour_id': tour_id, **TOUR_UPDATE},
+                                files={'new_image': ('conflict.jpg', b'conflict-image', 'image/jpeg')})
+
+    assert response.status_code == 409
+    assert not os.path.exists(os.path.join(settings.TOUR_IMAGE_DIR, saved[0]))
+
+
+async def test_put_updates_tour(client, make_tour):
+    tour_id = await make_tour()
+
+    response = await client.put('/admin/update_tour_admin', params={'tour_id': tour_id, **TOUR_UPDATE},
+                                files={'new_image': ('put.jpg', b'put-image', 'image/jpeg')})
+
+    assert response.status_code == 200
+    assert response.json()['tour']['title'] == 'Обновленный'
+    assert response.json()['tour']['version'] == 2
+
+
+async def test_delete_tolerates_concurrent_change(client, make_tour):
+    tour_id = await make_tour()
+    await bump_version(tour_id)
+
+    response = await client.delete('/admin/delete_tour_admin', params={'tour_id': tour_id})
+
+    assert response.status_code == 200
+    assert (await client.delete('/admin/delete_tour_admin', params={'tour_id': tour_id})).status_code == 404
+
+
+async def test_patch_adds_image_to_tour_without_image(client, make_tour):
+    tour_id = await make_tour(image=None)
+
+    response = await client.patch('/admin/update_tour_admin', params={'tour_id': tour_id},
+                                  files={'new_image': ('patch.jpg', b'patch-image', 'image/jpeg')})
+
+    assert response.status_code == 200
+    assert response.json()['tour']['image']
+
+
+async def test_patch_releases_image_of_concurrently_deleted_tour(client, make_tour, monkeypatch):
+    tour_id = await make_tour()
+    saved = []
+
+    async def save_during_delete(upload):
+        result = await original_save_upload(upload)
+        saved.append(result[0])
+        async with AsyncSessionLocal() as session:
+            await session.execute(delete(TourTable).where(TourTable.id == tour_id))
+            await session.commit()
+        return result
+
+    original_save_upload = routers_for_admin.save_upload
+    monkeypatch.setattr(routers_for_admin, 'save_upload', save_during_delete)
+    response = await client.patch('/admin/update_tour_admin', params={'tour_id': tour_id},
+                                  files={'new_image': ('deleted.jpg', b'deleted-image', 'image/jpeg')})
+
+    assert response.status_code == 404
+    assert not os.path.exists(os.path.join(settings.TOUR_IMAGE_DIR, saved[0]))
+
+
+async def test_patch_unknown_tour_is_not_found(client):
+    response = await client.patch('/admin/update_tour_admin', params={'tour_id': 999999, 'price_per_person': 1})
+
+    assert response.status_code == 404
@@ -0,0 +1,102 @@
+"""
+Тесты контроля нагрузки (utils/admission.py).
+"""
+
+import asyncio
+import os
+import httpx
+import pytest
+import main
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from settings import settings
+from snapshot.snapshot import render_pages
+from utils.admission import AdmissionMiddleware, internal_app
+
+pytestmark = pytest.mark.anyio
+
+
+async def page(request):
+    return PlainTextResponse('страница')
+
+
+async def slow(request):
+    await request.app.state.release_slow.wait()
+    return PlainTextResponse('медленная страница')
+
+
+def admitted_app(monkeypatch, **limits) -> AdmissionMiddleware:
+    """
+    Создает приложение с контролем нагрузки и указанными ограничениями запросов на чтение.
+    """
+    defaults = {'RATE_LIMIT_READ_PER_MINUTE': 0, 'RATE_LIMIT_READ_BURST': 1, 'CONCURRENCY_READ_LIMIT': 0,
+                'CONCURRENCY_READ_QUEUE': 0}
+    for name, value in {**defaults, **limits}.items():
+        monkeypatch.setattr(settings, name, value)
+    application = Starlette(routes=[Route('/page', page), Route('/slow', slow)])
+    # Событие, до которого задерживается обработка запроса /slow
+    application.state.release_slow = asyncio.Event()
+    return AdmissionMiddleware(application)
+
+
+async def test_internal_requests_bypass_rate_limit(monkeypatch):
+    app = admitted_app(monkeypatch, RATE_LIMIT_READ_PER_MINUTE=1)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=internal_app(app)),
+                                 base_url='http://test') as client:
+        statuses = [(await client.get('/page')).status_code for _ in range(3)]
+
+    assert statuses == [200, 200, 200]
+
+
+async def test_snapshot_pages_are_not_rate_limited(monkeypatch):
+    monkeypatch.setattr(main, 'app', admitted_app(monkeypatch, RATE_LIMIT_READ_PER_MINUTE=1))
+
+    await render_pages({f'page-{number}.html': '/page' for number in range(3)})
+
+    for number in range(3):
+        with open(os.path.join(settings.SNAPSHOT_DIR, f'page-{number}.html'), encoding='utf-8') as file:
+            assert file.read() == 'страница'
+
+
+async def test_rate_limited_client_gets_429(monkeypatch):
+    app = admitted_app(monkeypatch, RATE_LIMIT_READ_PER_MINUTE=6, RATE_LIMIT_READ_BURST=2)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test') as client:
+        responses = [await client.get('/page') for _ in range(3)]
+
+    assert [response.status_code for response in responses] == [200, 200, 429]
+    assert 'retry-after' not in responses[0].headers
+    assert responses[2].headers['retry-after'] == '10'
+
+
+async def test_full_queue_gets_503(monkeypatch):
+    monkeypatch.setattr(settings, 'ADMISSION_RETRY_AFTER', 3)
+    app = admitted_app(monkeypatch, CONCURRENCY_READ_LIMIT=1, CONCURRENCY_READ_QUEUE=1)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test') as client:
+        running = asyncio.create_task(client.get('/slow'))
+        queued = asyncio.create_task(client.get('/page'))
+        await asyncio.sleep(0.05)
+        rejected = await client.get('/page')
+        app.app.state.release_slow.set()
+        statuses = [(await running).status_code, (await queued).status_code]
+
+    assert rejected.status_code == 503
+    assert rejected.headers['retry-after'] == '3'
+    assert statuses == [200, 200]
+
+
+async def test_queue_timeout_gets_503(monkeypatch):
+    monkeypatch.setattr(settings, 'ADMISSION_QUEUE_TIMEOUT_MS', 50)
+    app = admitted_app(monkeypatch, CONCURRENCY_READ_LIMIT=1, CONCURRENCY_READ_QUEUE=1)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test') as client:
+        running = asyncio.create_task(client.get('/slow'))
+        await asyncio.sleep(0.05)
+        timed_out = await client.get('/page')
+        app.app.state.release_slow.set()
+        await running
+
+    assert timed_out.status_code == 503
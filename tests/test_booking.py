@@ -0,0 +1,64 @@
+"""
+Тесты бронирования мест (routers/routers_for_booking.py): отсутствие перепродажи мест при одновременных
+запросах и идемпотентность повторов.
+"""
+
+import anyio
+import pytest
+from sqlalchemy import func, select
+from database.db import AsyncSessionLocal, BookingTable, TourTable
+
+pytestmark = pytest.mark.anyio
+
+# Данные бронирования
+BOOKING = {'seats': 1, 'customer_name': 'Иван', 'customer_phone': '+79990000000'}
+
+
+async def test_concurrent_bookings_do_not_oversell(client, make_tour):
+    tour_id = await make_tour(available_places=5, max_people=5)
+    statuses = []
+
+    async def book():
+        response = await client.post(f'/booking/tours/{tour_id}', json=BOOKING)
+        statuses.append(response.status_code)
+
+    async with anyio.create_task_group() as group:
+        for _ in range(20):
+            group.start_soon(book)
+
+    assert statuses.count(201) == 5
+    assert statuses.count(409) == 15
+    async with AsyncSessionLocal() as session:
+        tour = await session.get(TourTable, tour_id)
+        booked = await session.scalar(select(func.sum(BookingTable.seats)).where(BookingTable.tour_id == tour_id))
+    assert (tour.available_places, tour.occupied_places, booked) == (0, 5, 5)
+
+
+async def test_repeated_request_with_same_key_books_once(client, make_tour):
+    tour_id = await make_tour(available_places=5)
+    headers = {'Idempotency-Key': f'repeat-{tour_id}'}
+
+    first = await client.post(f'/booking/tours/{tour_id}', json=BOOKING, headers=headers)
+    second = await client.post(f'/booking/tours/{tour_id}', json=BOOKING, headers=headers)
+
+    assert (first.status_code, second.status_code) == (201, 201)
+    assert second.headers['idempotent-replayed'] == 'true'
+    assert second.json()['id'] == first.json()['id']
+    async with AsyncSessionLocal() as session:
+        assert (await session.get(TourTable, tour_id)).available_places == 4
+
+
+async def test_same_key_with_other_parameters_is_rejected(client, make_tour):
+    tour_id = await make_tour(available_places=5)
+    headers = {'Idempotency-Key': f'reused-{tour_id}'}
+    await client.post(f'/booking/tours/{tour_id}', json=BOOKING, headers=headers)
+
+    response = await client.post(f'/booking/tours/{tour_id}', json={**BOOKING, 'seats': 2}, headers=headers)
+
+    assert response.status_code == 422
+
+
+async def test_booking_unknown_tour(client):
+    response = await client.post('/booking/tours/999999', json=BOOKING)
+
+    assert response.status_code == 404
@@ -0,0 +1,79 @@
+"""
+Тесты массового импорта туров (database/bulk.py).
+"""
+
+import json
+import os
+import pytest
+from sqlalchemy import select
+from database.db import AsyncSessionLocal, JobTable, TourTable
+from events.broker import availability_broker
+from settings import settings
+
+pytestmark = pytest.mark.anyio
+
+# Поля тура строки импорта
+TOUR_ROW = {
+    'title': 'Импорт тура', 'description': 'Описание', 'place': 'Камчатка',
+    'start_date_tour': '2031-08-01', 'duration': 10, 'max_people': 8, 'available_places': 8,
+    'occupied_places': 0, 'price_per_person': 90000,
+}
+
+
+async def import_file(client, filename: str, content: bytes):
+    return await client.post('/admin/import_tours_admin', files={'file': (filename, content)})
+
+
+def ndjson(*rows: dict) -> bytes:
+    return ''.join(json.dumps(row, ensure_ascii=False) + '\n' for row in rows).encode()
+
+
+async def test_invalid_encoding_is_reported_as_line_error(client):
+    content = 'title,description\nТур,Описание\n'.encode() + b'\xff\xfe,broken\n'
+
+    response = await import_file(client, 'tours.csv', content)
+
+    assert response.status_code == 200
+    report = response.json()
+    assert report['imported'] == 0
+    assert report['rejected'] == 1
+    assert 'импорт остановлен' in report['errors'][-1]['errors'][0]
+
+
+async def test_missing_image_file_is_rejected(client):
+    response = await import_file(client, 'tours.ndjson', ndjson({**TOUR_ROW, 'image': 'missing.jpg'}))
+
+    assert response.json() == {
+        'imported': 0, 'rejected': 1,
+        'errors': [{'line': 1, 'errors': ['Файл изображения не найден: missing.jpg']}],
+    }
+
+
+async def test_import_processes_images_and_publishes_availability(client):
+    os.makedirs(settings.TOUR_IMAGE_DIR, exist_ok=True)
+    with open(os.path.join(settings.TOUR_IMAGE_DIR, 'imported.jpg'), 'wb') as file:
+        file.write(b'image')
+    subscription = availability_broker.subscribe()
+    try:
+        response = await import_file(client, 'tours.ndjson',
+                                     ndjson({**TOUR_ROW, 'image': 'imported.jpg'}, {**TOUR_ROW, 'image': 'imported.jpg'}))
+        events = await subscription.wait(0)
+    finally:
+        availability_broker.unsubscribe(subscription)
+
+    assert response.json()['imported'] == 2
+    async with AsyncSessionLocal() as session:
+        tour_ids = (await session.scalars(select(TourTable.id).where(TourTable.image == 'imported.jpg'))).all()
+        jobs = (await session.scalars(select(JobTable.payload).where(JobTable.kind == 'process_image'))).all()
+    assert sorted(event['tour_id'] for event in events) == sorted(tour_ids)
+    assert [json.loads(payload) for payload in jobs].count({'filename': 'imported.jpg'}) == 1
+
+
+async def test_tour_without_image_renders(client):
+    response = await import_file(client, 'tours.ndjson', ndjson(TOUR_ROW))
+    async with AsyncSessionLocal() as session:
+        tour_id = await session.scalar(select(TourTable.id).where(TourTable.image.is_(None)))
+
+    assert response.json()['imported'] == 1
+    assert (await client.get(f'/views/tours/current_tour/{tour_id}')).status_code == 200
+    assert (await client.get('/views/tours/')).status_code == 200
@@ -0,0 +1,63 @@
+"""
+Тесты кеша туров (cache/cache.py) и его инвалидации при изменении туров.
+"""
+
+import pytest
+from cache.cache import CacheBackend, MemoryCacheBackend, TourCache, tour_cache
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_tour_entry_loaded_before_invalidation_is_not_served():
+    cache = TourCache(MemoryCacheBackend(100), ttl=300)
+    stale_key = await cache.tour_key(1, 'html')
+
+    # Запрос загрузил тур, затем тур изменен, и только после этого запрос сохраняет устаревшую страницу
+    await cache.invalidate_tour(1)
+    await cache.set(stale_key, 'устаревшая страница')
+
+    assert await cache.get(await cache.tour_key(1, 'html')) is None
+
+
+async def test_tour_invalidation_resets_lists_but_not_other_tours():
+    cache = TourCache(MemoryCacheBackend(100), ttl=300)
+    other_key = await cache.tour_key(2, 'data')
+    list_key = await cache.list_key('data', '{}')
+    await cache.set(other_key, {'id': 2})
+    await cache.set(list_key, [])
+
+    await cache.invalidate_tour(1)
+
+    assert await cache.get(await cache.tour_key(2, 'data')) == {'id': 2}
+    assert await cache.get(await cache.list_key('data', '{}')) is None
+
+
+async def test_tour_html_key_depends_on_base_url():
+    cache = TourCache(MemoryCacheBackend(100), ttl=300)
+
+    assert await cache.tour_key(1, 'html', 'http://a/') != await cache.tour_key(1, 'html', 'http://b/')
+
+
+async def test_tour_page_reflects_update(client, make_tour):
+    tour_id = await make_tour(title='До изменения')
+    first = await client.get(f'/views/tours/current_tour/{tour_id}')
+    assert 'До изменения' in first.text
+    hits = tour_cache.hits
+    assert (await client.get(f'/views/tours/current_tour/{tour_id}')).text == first.text
+    assert tour_cache.hits == hits + 1
+
+    response = await client.patch('/admin/update_tour_admin', params={'tour_id': tour_id, 'title': 'После'})
+    assert response.status_code == 200
+
+    page = await client.get(f'/views/tours/current_tour/{tour_id}')
+    assert 'После' in page.text
+    assert page.headers['etag'] != first.headers['etag']
+
+
+def test_cache_backend_requires_all_methods():
+    class PartialBackend(CacheBackend):
+        async def get(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        PartialBackend()
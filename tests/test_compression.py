@@ -0,0 +1,102 @@
+"""
+Тесты сжатия HTTP-ответов (utils/compression.py).
+"""
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Route
+from utils.compression import CompressionMiddleware, choose_encoding
+
+pytestmark = pytest.mark.anyio
+
+# Тело ответа больше минимального размера сжатия
+TEXT = 'Тур по Карелии. ' * 100
+
+
+async def big(request):
+    return PlainTextResponse(TEXT, headers={'ETag': '"abc"'})
+
+
+async def small(request):
+    return PlainTextResponse('короткий ответ')
+
+
+async def stream(request):
+    async def parts():
+        for _ in range(3):
+            yield TEXT
+    return StreamingResponse(parts(), media_type='text/html')
+
+
+async def events(request):
+    return StreamingResponse(iter([TEXT]), media_type='text/event-stream')
+
+
+async def image(request):
+    return Response(b'\x00' * 2000, media_type='image/jpeg')
+
+
+app = CompressionMiddleware(Starlette(routes=[
+    Route('/big', big), Route('/small', small), Route('/stream', stream), Route('/events', events),
+    Route('/image', image),
+]), minimum_size=1024)
+
+
+async def get(path: str, accept_encoding: str) -> httpx.Response:
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test') as client:
+        return await client.get(path, headers={'Accept-Encoding': accept_encoding})
+
+
+@pytest.mark.parametrize('header, expected', [
+    ('gzip, deflate, br', 'br'),
+    ('gzip', 'gzip'),
+    ('br;q=0, gzip;q=0.5', 'gzip'),
+    ('identity', None),
+    ('', None),
+])
+def test_choose_encoding(header, expected):
+    assert choose_encoding(header) == expected
+
+
+@pytest.mark.parametrize('accept_encoding', ['br', 'gzip'])
+async def test_large_response_is_compressed(accept_encoding):
+    response = await get('/big', accept_encoding)
+
+    assert response.headers['content-encoding'] == accept_encoding
+    assert int(response.headers['content-length']) < len(TEXT.encode())
+    assert response.headers['etag'] == 'W/"abc"'
+    assert 'Accept-Encoding' in response.headers['vary']
+    assert response.text == TEXT
+
+
+async def test_identity_response_is_not_compressed():
+    response = await get('/big', 'identity')
+
+    assert 'content-encoding' not in response.headers
+    assert response.headers['etag'] == '"abc"'
+    assert 'Accept-Encoding' in response.headers['vary']
+    assert response.text == TEXT
+
+
+async def test_small_response_is_not_compressed():
+    response = await get('/small', 'gzip')
+
+    assert 'content-encoding' not in response.headers
+    assert response.text == 'короткий ответ'
+
+
+async def test_streaming_response_is_compressed_by_parts():
+    response = await get('/stream', 'gzip')
+
+    assert response.headers['content-encoding'] == 'gzip'
+    assert 'content-length' not in response.headers
+    assert response.text == TEXT * 3
+
+
+@pytest.mark.parametrize('path', ['/events', '/image'])
+async def test_event_stream_and_binary_are_not_compressed(path):
+    response = await get(path, 'br, gzip')
+
+    assert 'content-encoding' not in response.headers
@@ -0,0 +1,80 @@
+"""
+Тесты условных ответов: заголовки ETag и Last-Modified и ответ 304 Not Modified для страниц туров и списка
+туров админ-панели.
+"""
+
+import pytest
+from cache.cache import tour_cache
+
+pytestmark = pytest.mark.anyio
+
+# Данные бронирования для изменения версии тура
+BOOKING = {'seats': 1, 'customer_name': 'Иван', 'customer_phone': '+79990000000'}
+
+
+async def test_tour_page_not_modified(client, make_tour):
+    tour_id = await make_tour()
+    url = f'/views/tours/current_tour/{tour_id}'
+    response = await client.get(url)
+    assert response.status_code == 200
+    etag = response.headers['etag']
+    assert response.headers['last-modified']
+
+    not_modified = await client.get(url, headers={'If-None-Match': etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b''
+    assert not_modified.headers['etag'] == etag
+
+    since = await client.get(url, headers={'If-Modified-Since': response.headers['last-modified']})
+    assert since.status_code == 304
+
+
+async def test_tour_page_etag_changes_after_booking(client, make_tour):
+    tour_id = await make_tour()
+    url = f'/views/tours/current_tour/{tour_id}'
+    etag = (await client.get(url)).headers['etag']
+
+    booked = await client.post(f'/booking/tours/{tour_id}', json=BOOKING)
+    assert booked.status_code == 201
+
+    response = await client.get(url, headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['etag'] != etag
+
+
+async def test_admin_listing_not_modified(client, make_tour):
+    await make_tour(place='Условный')
+    params = {'place': 'Условный'}
+    response = await client.get('/admin/get_tours_admin', params=params)
+    assert response.status_code == 200
+    etag = response.headers['etag']
+
+    not_modified = await client.get('/admin/get_tours_admin', params=params, headers={'If-None-Match': etag})
+    assert not_modified.status_code == 304
+
+    await make_tour(place='Условный')
+    # Тур добавлен в обход админ-панели, поэтому кеш списков сбрасывается явно
+    await tour_cache.invalidate_lists()
+    changed = await client.get('/admin/get_tours_admin', params=params, headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert len(changed.json()) == 2
+
+
+async def test_list_page_is_validated_by_etag_only(client, make_tour):
+    first = await make_tour(place='Удаляемый')
+    await make_tour(place='Удаляемый')
+    params = {'place': 'Удаляемый'}
+    response = await client.get('/views/tours/', params=params)
+    assert response.status_code == 200
+    assert 'last-modified' not in response.headers
+    etag = response.headers['etag']
+
+    deleted = await client.delete('/admin/delete_tour_admin', params={'tour_id': first})
+    assert deleted.status_code == 200
+
+    since = await client.get('/views/tours/', params=params,
+                             headers={'If-Modified-Since': 'Fri, 01 Jan 2100 00:00:00 GMT'})
+    assert since.status_code == 200
+    changed = await client.get('/views/tours/', params=params, headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['etag'] != etag
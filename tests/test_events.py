@@ -0,0 +1,43 @@
+"""
+Тесты потока событий об изменении свободных мест (routers/routers_for_views.py, events/broker.py).
+"""
+
+import json
+import pytest
+from events.broker import availability_broker
+from routers.routers_for_views import availability_events
+
+pytestmark = pytest.mark.anyio
+
+
+def subscribers(tour_id) -> int:
+    return len(availability_broker._subscribers.get(tour_id, ()))
+
+
+async def test_stream_never_started_does_not_subscribe():
+    events = availability_events(901, None)
+
+    assert subscribers(901) == 0
+    await events.aclose()
+    assert subscribers(901) == 0
+
+
+async def test_stream_delivers_changes_and_unsubscribes_on_close():
+    initial = {'tour_id': 902, 'available_places': 5, 'version': 1}
+    events = availability_events(902, initial)
+
+    assert (await events.__anext__()).startswith('retry:')
+    assert subscribers(902) == 1
+    assert json.loads((await events.__anext__()).split('data: ')[1]) == initial
+    availability_broker.publish(902, 4, 2)
+    assert json.loads((await events.__anext__()).split('data: ')[1])['available_places'] == 4
+
+    await events.aclose()
+    assert subscribers(902) == 0
+
+
+async def test_unknown_tour_is_not_found(client):
+    response = await client.get('/views/tours/events', params={'tour_id': 999999})
+
+    assert response.status_code == 404
+    assert subscribers(999999) == 0
@@ -0,0 +1,102 @@
+"""
+Тесты уменьшенных копий изображений туров и формирования srcset (images/processing.py).
+"""
+
+import os
+from PIL import Image
+from images import processing
+from images.processing import (backfill, delete_variants, image_sources, manifest_path, process_image, supported_formats,
+                               variant_filename)
+from settings import settings
+
+
+def save_image(filename: str, width: int, height: int, color: str = 'red'):
+    """
+    Сохраняет изображение указанного размера в каталог изображений туров.
+    """
+    os.makedirs(settings.TOUR_IMAGE_DIR, exist_ok=True)
+    Image.new('RGB', (width, height), color).save(os.path.join(settings.TOUR_IMAGE_DIR, filename))
+
+
+def srcset_widths(source: dict) -> list[str]:
+    return [candidate.rsplit(' ', 1)[1] for candidate in source['srcset'].split(', ')]
+
+
+def test_srcset_lists_only_generated_widths():
+    save_image('small.jpg', 200, 100)
+
+    process_image('small.jpg')
+    sources = image_sources('small.jpg')
+
+    assert len(sources) == len(supported_formats())
+    for source in sources:
+        assert srcset_widths(source) == ['160w', '200w']
+        for candidate in source['srcset'].split(', '):
+            name = os.path.basename(candidate.rsplit(' ', 1)[0])
+            assert os.path.exists(os.path.join(settings.TOUR_IMAGE_VARIANTS_DIR, name))
+    assert not os.path.exists(os.path.join(settings.TOUR_IMAGE_VARIANTS_DIR,
+                                           variant_filename('small.jpg', 'card2x', 'jpeg')))
+
+
+def test_image_smaller_than_card_uses_largest_copy_as_src():
+    save_image('tiny.jpg', 120, 120)
+
+    process_image('tiny.jpg')
+    jpeg = next(source for source in image_sources('tiny.jpg') if source['type'] == 'image/jpeg')
+
+    assert srcset_widths(jpeg) == ['120w']
+    assert jpeg['src'].endswith(variant_filename('tiny.jpg', 'thumb', 'jpeg'))
+
+
+def test_variants_of_same_stem_do_not_collide():
+    save_image('same.jpg', 400, 300, 'red')
+    save_image('same.png', 400, 300, 'blue')
+
+    process_image('same.jpg')
+    process_image('same.png')
+
+    jpg_card = os.path.join(settings.TOUR_IMAGE_VARIANTS_DIR, variant_filename('same.jpg', 'card', 'jpeg'))
+    png_card = os.path.join(settings.TOUR_IMAGE_VARIANTS_DIR, variant_filename('same.png', 'card', 'jpeg'))
+    assert jpg_card != png_card
+    with Image.open(jpg_card) as red, Image.open(png_card) as blue:
+        assert red.getpixel((0, 0))[0] > 200
+        assert blue.getpixel((0, 0))[2] > 200
+    delete_variants('same.jpg')
+    assert os.path.exists(png_card)
+
+
+def test_sources_are_read_from_manifest_once():
+    assert image_sources('missing.jpg') == []
+    save_image('cached.jpg', 800, 600)
+    process_image('cached.jpg')
+    sources = image_sources('cached.jpg')
+
+    os.remove(manifest_path('cached.jpg'))
+
+    assert image_sources('cached.jpg') == sources
+    delete_variants('cached.jpg')
+    assert image_sources('cached.jpg') == []
+
+
+def test_srcset_urls_use_variants_url(monkeypatch):
+    monkeypatch.setattr(settings, 'TOUR_IMAGE_VARIANTS_URL', 'https://cdn.example.com/variants')
+    save_image('cdn.jpg', 400, 300)
+    process_image('cdn.jpg')
+
+    for source in image_sources('cdn.jpg'):
+        assert source['src'].startswith('https://cdn.example.com/variants/cdn.jpg-')
+        assert all(candidate.startswith('https://cdn.example.com/variants/')
+                   for candidate in source['srcset'].split(', '))
+
+
+def test_backfill_skips_uploads_in_progress(monkeypatch):
+    save_image('backfill.jpg', 300, 200)
+    with open(os.path.join(settings.TOUR_IMAGE_DIR, '.upload-inprogress.tmp'), 'wb') as file:
+        file.write(b'partial')
+    processed = []
+    monkeypatch.setattr(processing, 'process_image', lambda name, force=False: processed.append(name))
+
+    backfill()
+
+    assert 'backfill.jpg' in processed
+    assert not any(name.startswith('.upload-') for name in processed)
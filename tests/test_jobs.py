@@ -0,0 +1,134 @@
+"""
+Тесты очереди фоновых задач (jobs/queue.py).
+"""
+
+from datetime import timedelta
+import pytest
+from sqlalchemy import delete, select, update
+from database.db import AsyncSessionLocal, JobTable, utcnow
+from jobs.queue import enqueue_job, job_handler, job_queue
+from settings import settings
+
+pytestmark = pytest.mark.anyio
+
+# Параметры, с которыми вызывались обработчики тестовых задач
+calls = []
+
+
+@job_handler('test_succeeding')
+async def succeeding_job(value: int):
+    calls.append(value)
+
+
+@job_handler('test_failing')
+async def failing_job():
+    raise RuntimeError('сбой задачи')
+
+
+@pytest.fixture(autouse=True)
+async def empty_queue(anyio_backend):
+    """
+    Удаляет задачи, созданные другими тестами, чтобы claim получал только задачи теста.
+    """
+    async with AsyncSessionLocal() as session:
+        await session.execute(delete(JobTable))
+        await session.commit()
+    calls.clear()
+
+
+async def add_job(kind: str, **payload) -> int:
+    async with AsyncSessionLocal() as session:
+        enqueue_job(session, kind, **payload)
+        await session.commit()
+        return await session.scalar(select(JobTable.id).order_by(JobTable.id.desc()).limit(1))
+
+
+async def load_job(job_id: int):
+    async with AsyncSessionLocal() as session:
+        return await session.get(JobTable, job_id)
+
+
+async def expire(job_id: int):
+    """
+    Переносит время запуска задачи в прошлое (наступил повтор или истекла аренда).
+    """
+    async with AsyncSessionLocal() as session:
+        await session.execute(update(JobTable).where(JobTable.id == job_id)
+                              .values(run_at=utcnow() - timedelta(seconds=1)))
+        await session.commit()
+
+
+async def test_completed_job_is_deleted():
+    job_id = await add_job('test_succeeding', value=7)
+
+    job = await job_queue.claim()
+
+    assert job['id'] == job_id
+    assert await job_queue.execute(job)
+    assert calls == [7]
+    assert await load_job(job_id) is None
+
+
+async def retry_delay(job: dict) -> timedelta:
+    """
+    Выполняет неудачную попытку задачи и возвращает задержку до ее повтора.
+    """
+    started = utcnow()
+    assert not await job_queue.execute(job)
+    retried = await load_job(job['id'])
+    assert retried.status == 'pending'
+    return retried.run_at - started
+
+
+async def test_failed_attempt_is_retried_with_backoff():
+    job_id = await add_job('test_failing')
+
+    first_delay = await retry_delay(await job_queue.claim())
+    assert await job_queue.claim() is None
+    await expire(job_id)
+    second_delay = await retry_delay(await job_queue.claim())
+
+    delay = timedelta(seconds=settings.JOB_RETRY_DELAY)
+    assert delay <= first_delay < delay + timedelta(seconds=1)
+    assert 2 * delay <= second_delay < 2 * delay + timedelta(seconds=1)
+    job = await load_job(job_id)
+    assert job.attempts == 2
+    assert 'сбой задачи' in job.last_error
+
+
+async def test_job_fails_after_max_attempts(monkeypatch):
+    monkeypatch.setattr(settings, 'JOB_MAX_ATTEMPTS', 2)
+    job_id = await add_job('test_failing')
+
+    for _ in range(2):
+        await expire(job_id)
+        assert not await job_queue.execute(await job_queue.claim())
+
+    failed = await load_job(job_id)
+    assert failed.status == 'failed'
+    assert failed.attempts == 2
+    await expire(job_id)
+    assert await job_queue.claim() is None
+
+
+async def test_expired_lease_is_claimed_again():
+    job_id = await add_job('test_succeeding', value=1)
+
+    first = await job_queue.claim()
+    assert await job_queue.claim() is None
+    await expire(job_id)
+    second = await job_queue.claim()
+
+    assert (first['id'], first['attempts']) == (job_id, 1)
+    assert (second['id'], second['attempts']) == (job_id, 2)
+
+
+async def test_unknown_kind_fails_without_retry():
+    job_id = await add_job('test_unknown')
+
+    assert not await job_queue.execute(await job_queue.claim())
+
+    job = await load_job(job_id)
+    assert job.status == 'failed'
+    assert job.attempts == 1
+    assert 'LookupError' in job.last_error
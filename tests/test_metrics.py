@@ -0,0 +1,55 @@
+"""
+Тесты метрик приложения (metrics/metrics.py).
+"""
+
+import time
+import pytest
+from jinja2 import DictLoader, Environment
+from metrics.metrics import Metric, TimedTemplate, template_render_duration_seconds
+
+
+def template_observations(name: str) -> tuple[int, float]:
+    """
+    Возвращает количество наблюдений и суммарное время отрисовки шаблона из метрики.
+    """
+    counts, total = template_render_duration_seconds._values.get((name,), ([0], [0.0]))
+    return sum(counts), total[0]
+
+
+def load_template(name: str) -> TimedTemplate:
+    environment = Environment(loader=DictLoader({name: '{% for i in range(3) %}<p>{{ i }}</p>{% endfor %}'}))
+    environment.template_class = TimedTemplate
+    return environment.get_template(name)
+
+
+def test_metric_requires_samples():
+    with pytest.raises(TypeError):
+        Metric('metric', 'Метрика')
+
+
+def test_generate_excludes_time_between_pieces():
+    template = load_template('generate.html')
+
+    for _ in template.generate():
+        time.sleep(0.05)
+
+    count, total = template_observations('generate.html')
+    assert count == 1
+    assert total < 0.05
+
+
+def test_generate_closed_early_is_observed_once():
+    template = load_template('closed.html')
+
+    pieces = template.generate()
+    next(pieces)
+    pieces.close()
+
+    assert template_observations('closed.html')[0] == 1
+
+
+def test_render_is_observed():
+    template = load_template('render.html')
+
+    assert template.render() == '<p>0</p><p>1</p><p>2</p>'
+    assert template_observations('render.html')[0] == 1
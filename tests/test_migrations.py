@@ -0,0 +1,59 @@
+"""
+Тесты миграций схемы базы данных (database/migrations.py) на базе данных исходной версии.
+"""
+
+import sqlite3
+import pytest
+from database.migrations import MIGRATIONS, run_migrations
+
+
+def create_baseline(path: str, rows: list[tuple]):
+    """
+    Создает базу данных исходной версии (таблица tours со строковыми датами) с указанными турами.
+    """
+    connection = sqlite3.connect(path)
+    with connection:
+        MIGRATIONS[0][2](connection)
+        connection.executemany(
+            "INSERT INTO tours VALUES (?, 'Тур', 'Описание', 'Алтай', ?, 5, 10, 10, 0, 1000, 'a.jpg')", rows)
+        connection.execute("PRAGMA user_version = 1")
+    connection.close()
+
+
+def test_migrations_convert_legacy_dates(tmp_path):
+    path = str(tmp_path / 'baseline.db')
+    create_baseline(path, [(1, '2024-05-01'), (2, '01.06.2024'), (3, '15/07/2024'), (4, None), (5, ' ')])
+
+    assert run_migrations(path) == MIGRATIONS[-1][0]
+
+    connection = sqlite3.connect(path)
+    dates = connection.execute("SELECT id, start_date_tour FROM tours ORDER BY id").fetchall()
+    versions = connection.execute("SELECT DISTINCT version FROM tours").fetchall()
+    found = connection.execute("SELECT rowid FROM tours_fts WHERE tours_fts MATCH 'Алтай'").fetchall()
+    connection.close()
+    assert dates == [(1, '2024-05-01'), (2, '2024-06-01'), (3, '2024-07-15'), (4, None), (5, None)]
+    assert versions == [(1,)]
+    assert len(found) == 5
+
+
+def test_migrations_are_idempotent(tmp_path):
+    path = str(tmp_path / 'baseline.db')
+    create_baseline(path, [(1, '2024-05-01')])
+
+    assert run_migrations(path) == run_migrations(path)
+
+
+def test_unparsable_date_aborts_migration(tmp_path):
+    path = str(tmp_path / 'baseline.db')
+    create_baseline(path, [(1, '2024-05-01'), (7, 'в мае'), (9, '31.02.2024')])
+
+    with pytest.raises(ValueError) as error:
+        run_migrations(path)
+
+    assert "7: 'в мае'" in str(error.value)
+    assert "9: '31.02.2024'" in str(error.value)
+    connection = sqlite3.connect(path)
+    assert connection.execute("PRAGMA user_version").fetchone()[0] == 1
+    assert connection.execute("SELECT start_date_tour FROM tours WHERE id = 7").fetchone() == ('в мае',)
+    assert connection.execute("SELECT name FROM sqlite_master WHERE name = 'tours_new'").fetchone() is None
+    connection.close()
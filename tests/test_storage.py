@@ -0,0 +1,84 @@
+"""
+Тесты хранения загруженных изображений (images/storage.py) и задачи удаления изображений.
+"""
+
+import io
+import json
+import os
+import time
+import pytest
+from fastapi import UploadFile
+from sqlalchemy import select
+from database.db import AsyncSessionLocal, JobTable, utcnow
+from images.storage import release_image, save_upload
+from jobs.tasks import release_image_job
+from settings import settings
+
+pytestmark = pytest.mark.anyio
+
+
+def upload(content: bytes, filename: str = 'photo.jpg') -> UploadFile:
+    return UploadFile(file=io.BytesIO(content), filename=filename)
+
+
+def make_old(filename: str):
+    """
+    Переносит время изменения файла за пределы IMAGE_RELEASE_GRACE_SECONDS.
+    """
+    past = time.time() - settings.IMAGE_RELEASE_GRACE_SECONDS - 60
+    os.utime(os.path.join(settings.TOUR_IMAGE_DIR, filename), (past, past))
+
+
+async def test_same_content_is_stored_once_and_refreshed():
+    name, created = await save_upload(upload(b'same-content'))
+    make_old(name)
+
+    again, created_again = await save_upload(upload(b'same-content'))
+
+    assert (created, created_again) == (True, False)
+    assert again == name
+    assert time.time() - os.path.getmtime(os.path.join(settings.TOUR_IMAGE_DIR, name)) < 60
+
+
+async def test_reuploaded_file_is_not_released_before_reference_is_committed():
+    name, _ = await save_upload(upload(b'reused-content'))
+    make_old(name)
+    # Новый тур повторно загружает тот же файл, но еще не зафиксировал ссылку на него
+    await save_upload(upload(b'reused-content'))
+
+    async with AsyncSessionLocal() as session:
+        retry_after = await release_image(session, name)
+
+    assert retry_after > 0
+    assert os.path.exists(os.path.join(settings.TOUR_IMAGE_DIR, name))
+
+
+async def test_unreferenced_old_file_is_released(make_tour):
+    name, _ = await save_upload(upload(b'old-content'))
+    used, _ = await save_upload(upload(b'used-content'))
+    await make_tour(image=used)
+    make_old(name)
+    make_old(used)
+
+    async with AsyncSessionLocal() as session:
+        assert await release_image(session, name) == 0
+        assert await release_image(session, used) == 0
+
+    assert not os.path.exists(os.path.join(settings.TOUR_IMAGE_DIR, name))
+    assert os.path.exists(os.path.join(settings.TOUR_IMAGE_DIR, used))
+
+
+async def test_release_job_is_postponed_for_recent_file():
+    name, _ = await save_upload(upload(b'recent-content'))
+
+    await release_image_job(name)
+
+    async with AsyncSessionLocal() as session:
+        jobs = (await session.execute(select(JobTable).where(JobTable.kind == 'release_image'))).scalars().all()
+        for job in jobs:
+            await session.delete(job)
+        await session.commit()
+    postponed = [job for job in jobs if json.loads(job.payload) == {'filename': name}]
+    assert len(postponed) == 1
+    assert postponed[0].run_at > utcnow()
+    assert os.path.exists(os.path.join(settings.TOUR_IMAGE_DIR, name))
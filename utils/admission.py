@@ -0,0 +1,248 @@
+"""
+Этот файл содержит контроль нагрузки: ограничение частоты запросов клиента и количества одновременно
+обрабатываемых запросов.
+
+Запросы делятся на классы:
+    - read: чтение (GET, HEAD) - страницы туров, список туров админ-панели, экспорт;
+    - write: изменение без загрузки файлов - бронирование, частичное обновление и удаление туров;
+    - upload: изменение с загрузкой файла (multipart/form-data) - загрузка и обновление туров, импорт.
+
+Для каждого класса действуют:
+    - ограничение частоты запросов одного клиента (token bucket): клиент может отправить до BURST запросов
+      подряд, затем - не больше PER_MINUTE запросов в минуту. Превышение - ответ 429 Too Many Requests;
+    - ограничение одновременно обрабатываемых запросов класса. Запросы сверх лимита ждут в очереди
+      ограниченного размера не дольше ADMISSION_QUEUE_TIMEOUT_MS; при заполненной очереди или по истечении
+      ожидания - ответ 503 Service Unavailable.
+
+Оба ответа содержат заголовок Retry-After и отправляются сразу, не занимая воркер базы данных, поэтому
+при всплеске нагрузки задержка принятых запросов не растет без ограничения. Ограничения действуют в памяти
+процесса: при запуске нескольких воркеров каждый из них считает свои запросы.
+
+Внутренние запросы самого приложения (например, отрисовка страниц статической копии) отправляются через
+internal_app и не ограничиваются: они не должны получать 429 и 503 из-за собственной серии запросов или
+нагрузки от клиентов.
+"""
+
+import asyncio
+import math
+import time
+from collections import OrderedDict
+from typing import Optional
+from fastapi.responses import ORJSONResponse
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+from metrics.metrics import admission_in_flight, admission_requests_total
+from settings import settings
+
+# Префиксы путей, к которым ограничения не применяются: метрики, статические файлы (отдаются без обращения
+# к базе данных) и поток событий (длительные соединения ограничиваются настройками SSE_*)
+EXEMPT_PREFIXES = ('/metrics', '/static/', '/views/tours/events')
+# Методы запросов на чтение
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+# Расширение ASGI scope, которым internal_app отмечает внутренние запросы приложения
+INTERNAL_EXTENSION = 'tours.internal'
+
+
+def internal_app(app: ASGIApp) -> ASGIApp:
+    """
+    Возвращает ASGI-приложение для внутренних запросов: запросы отмечаются расширением INTERNAL_EXTENSION
+    в scope, и ограничения к ним не применяются. Запросы клиентов через сервер ASGI такой отметки не имеют.
+
+    Параметры:
+        app (ASGIApp): Приложение.
+
+    Возвращает:
+        ASGIApp: Приложение, отмечающее запросы как внутренние.
+    """
+    async def mark_internal(scope: Scope, receive: Receive, send: Send):
+        scope = {**scope, 'extensions': {**(scope.get('extensions') or {}), INTERNAL_EXTENSION: {}}}
+        await app(scope, receive, send)
+
+    return mark_internal
+
+
+def request_class(scope: Scope) -> Optional[str]:
+    """
+    Определяет класс запроса для контроля нагрузки.
+
+    Параметры:
+        scope (Scope): ASGI scope запроса.
+
+    Возвращает:
+        str | None: 'read', 'write', 'upload' или None, если ограничения к запросу не применяются.
+    """
+    if INTERNAL_EXTENSION in (scope.get('extensions') or {}) or scope['path'].startswith(EXEMPT_PREFIXES):
+        return None
+    if scope['method'] in READ_METHODS:
+        return 'read'
+    if Headers(scope=scope).get('content-type', '').startswith('multipart/form-data'):
+        return 'upload'
+    return 'write'
+
+
+def client_address(scope: Scope) -> str:
+    """
+    Возвращает адрес клиента для ограничения частоты запросов.
+
+    Если приложение работает за прокси (ADMISSION_TRUST_FORWARDED=1), используется первый адрес заголовка
+    X-Forwarded-For, иначе - адрес соединения.
+
+    Параметры:
+        scope (Scope): ASGI scope запроса.
+
+    Возвращает:
+        str: Адрес клиента.
+    """
+    if settings.ADMISSION_TRUST_FORWARDED:
+        forwarded = Headers(scope=scope).get('x-forwarded-for')
+        if forwarded:
+            return forwarded.split(',')[0].strip()
+    client = scope.get('client')
+    return client[0] if client else 'unknown'
+
+
+class RateLimiter:
+    """
+    Ограничение частоты запросов по клиентам (token bucket).
+
+    У каждого клиента есть запас из burst запросов, который пополняется со скоростью per_minute запросов
+    в минуту. Хранятся запасы не более max_clients клиентов; давно не обращавшиеся клиенты вытесняются (их
+    запас при следующем запросе снова полный).
+    """
+
+    def __init__(self, per_minute: int, burst: int, max_clients: int = settings.ADMISSION_MAX_CLIENTS):
+        self.rate = per_minute / 60
+        self.burst = max(burst, 1)
+        self.max_clients = max_clients
+        # Клиент -> (запас запросов, время последнего пополнения)
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    def acquire(self, client: str) -> float:
+        """
+        Расходует один запрос из запаса клиента.
+
+        Параметры:
+            client (str): Адрес клиента.
+
+        Возвращает:
+            float: 0, если запрос разрешен, иначе время в секундах до появления запроса в запасе.
+        """
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(client, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / self.rate
+        self._buckets[client] = (tokens, now)
+        if len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+class ConcurrencyLimiter:
+    """
+    Ограничение количества одновременно обрабатываемых запросов с очередью ограниченного размера.
+    """
+
+    def __init__(self, limit: int, queue_size: int, timeout: float):
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.waiting = 0
+        self._semaphore = asyncio.Semaphore(limit)
+
+    async def acquire(self) -> bool:
+        """
+        Занимает место для обработки запроса, при необходимости ожидая в очереди.
+
+        Возвращает:
+            bool: True, если место занято (после обработки нужно вызвать release); False, если очередь
+                заполнена или время ожидания истекло.
+        """
+        if not self._semaphore.locked():
+            await self._semaphore.acquire()
+            return True
+        if self.waiting >= self.queue_size:
+            return False
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self.waiting -= 1
+
+    def release(self):
+        """
+        Освобождает место после обработки запроса.
+        """
+        self._semaphore.release()
+
+
+def _limits(name: str) -> tuple[Optional[RateLimiter], Optional[ConcurrencyLimiter]]:
+    """
+    Создает ограничения класса запросов по настройкам RATE_LIMIT_<CLASS>_* и CONCURRENCY_<CLASS>_*.
+    Нулевое значение отключает соответствующее ограничение.
+    """
+    prefix = name.upper()
+    per_minute = getattr(settings, f'RATE_LIMIT_{prefix}_PER_MINUTE')
+    limit = getattr(settings, f'CONCURRENCY_{prefix}_LIMIT')
+    rate_limiter = RateLimiter(per_minute, getattr(settings, f'RATE_LIMIT_{prefix}_BURST')) if per_minute else None
+    concurrency_limiter = ConcurrencyLimiter(limit, getattr(settings, f'CONCURRENCY_{prefix}_QUEUE'),
+                                             settings.ADMISSION_QUEUE_TIMEOUT_MS / 1000) if limit else None
+    return rate_limiter, concurrency_limiter
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware, ограничивающий частоту запросов клиентов и количество одновременно обрабатываемых
+    запросов каждого класса и отклоняющий лишние запросы ответами 429 и 503 с заголовком Retry-After.
+
+    Результат проверки каждого запроса учитывается в метрике admission_requests_total (admitted,
+    rate_limited, overloaded), количество обрабатываемых запросов - в admission_in_flight.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.limits = {name: _limits(name) for name in ('read', 'write', 'upload')}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        name = request_class(scope)
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+
+        rate_limiter, concurrency_limiter = self.limits[name]
+        if rate_limiter is not None:
+            wait = rate_limiter.acquire(client_address(scope))
+            if wait:
+                admission_requests_total.inc(name, 'rate_limited')
+                await self.reject(scope, receive, send, 429, "Слишком много запросов", wait)
+                return
+        if concurrency_limiter is not None and not await concurrency_limiter.acquire():
+            admission_requests_total.inc(name, 'overloaded')
+            await self.reject(scope, receive, send, 503, "Сервер перегружен", settings.ADMISSION_RETRY_AFTER)
+            return
+
+        admission_requests_total.inc(name, 'admitted')
+        admission_in_flight.inc(name)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admission_in_flight.dec(name)
+            if concurrency_limiter is not None:
+                concurrency_limiter.release()
+
+    @staticmethod
+    async def reject(scope: Scope, receive: Receive, send: Send, status_code: int, detail: str, retry_after: float):
+        """
+        Отправляет ответ об отклонении запроса с заголовком Retry-After (в целых секундах).
+        """
+        response = ORJSONResponse({'detail': detail}, status_code=status_code,
+                                  headers={'Retry-After': str(max(math.ceil(retry_after), 1))})
+        await response(scope, receive, send)
@@ -0,0 +1,170 @@
+"""
+Этот файл содержит сжатие HTTP-ответов (brotli или gzip) по заголовку Accept-Encoding клиента.
+
+Сжимаются только текстовые ответы (HTML, JSON, CSS, CSV и т.д.) размером не меньше COMPRESSION_MIN_SIZE байт:
+для маленьких ответов заголовки сжатия и время сжатия не окупаются. Ответы, которые уже сжаты (например,
+собранные статические файлы с Content-Encoding), и поток Server-Sent Events не изменяются. Потоковые ответы
+сжимаются по частям, и каждая часть сразу отправляется клиенту.
+"""
+
+import zlib
+import brotli
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from settings import settings
+
+# Поддерживаемые кодировки сжатия в порядке предпочтения
+ENCODINGS = ('br', 'gzip')
+# MIME-типы, ответы которых сжимаются (кроме text/event-stream)
+COMPRESSIBLE_TYPES = ('application/json', 'application/javascript', 'application/x-ndjson', 'application/xml',
+                      'image/svg+xml')
+
+
+def accepted_encodings(header: str) -> set[str]:
+    """
+    Возвращает кодировки сжатия, которые принимает клиент (по заголовку Accept-Encoding).
+
+    Параметры:
+        header (str): Значение заголовка Accept-Encoding.
+
+    Возвращает:
+        set[str]: Названия кодировок в нижнем регистре, кроме явно запрещенных (q=0).
+    """
+    encodings = set()
+    for item in header.split(','):
+        name, _, parameters = item.partition(';')
+        quality = parameters.strip().replace(' ', '')
+        if quality.startswith('q=') and not quality[2:].strip('0.'):
+            continue
+        encodings.add(name.strip().lower())
+    return encodings
+
+
+def choose_encoding(header: str) -> str | None:
+    """
+    Выбирает кодировку сжатия ответа.
+
+    Параметры:
+        header (str): Значение заголовка Accept-Encoding.
+
+    Возвращает:
+        str | None: 'br', 'gzip' или None, если клиент не принимает сжатые ответы.
+    """
+    accepted = accepted_encodings(header)
+    for encoding in ENCODINGS:
+        if encoding in accepted:
+            return encoding
+    return None
+
+
+def is_compressible(headers: Headers) -> bool:
+    """
+    Проверяет, нужно ли сжимать ответ с указанными заголовками.
+
+    Параметры:
+        headers (Headers): Заголовки ответа.
+
+    Возвращает:
+        bool: True для текстовых ответов без Content-Encoding, кроме потока Server-Sent Events.
+    """
+    if 'content-encoding' in headers:
+        return False
+    content_type = headers.get('content-type', '').split(';')[0].strip().lower()
+    if content_type == 'text/event-stream':
+        return False
+    return content_type.startswith('text/') or content_type in COMPRESSIBLE_TYPES
+
+
+class StreamCompressor:
+    """
+    Сжатие тела ответа по частям в формате brotli или gzip.
+    """
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+        else:
+            self._compressor = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        """
+        Сжимает часть тела ответа.
+
+        Параметры:
+            data (bytes): Часть тела ответа.
+            final (bool): Последняя часть: поток сжатия завершается.
+
+        Возвращает:
+            bytes: Сжатые данные, которые можно сразу отправить клиенту.
+        """
+        if self.encoding == 'br':
+            return self._compressor.process(data) + (self._compressor.finish() if final else self._compressor.flush())
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware, сжимающий ответы в формате brotli или gzip в зависимости от заголовка Accept-Encoding.
+
+    Решение о сжатии принимается по заголовкам и первой части тела ответа. У сжатого ответа заменяется
+    Content-Length, добавляются Content-Encoding и Vary: Accept-Encoding, а ETag становится слабым (сжатый
+    ответ не совпадает побайтно с несжатым).
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = settings.COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get('accept-encoding', ''))
+        start_message: Message | None = None
+        compressor: StreamCompressor | None = None
+
+        async def send_compressed(message: Message):
+            nonlocal start_message, compressor
+            if message['type'] == 'http.response.start':
+                start_message = message
+                return
+            if message['type'] != 'http.response.body':
+                await send(message)
+                return
+
+            body = message.get('body', b'')
+            more_body = message.get('more_body', False)
+            if start_message is not None:
+                start, start_message = start_message, None
+                headers = MutableHeaders(raw=start['headers'])
+                if not is_compressible(headers) or (not more_body and len(body) < self.minimum_size):
+                    await send(start)
+                    await send(message)
+                    return
+                headers.add_vary_header('Accept-Encoding')
+                if encoding is None:
+                    await send(start)
+                    await send(message)
+                    return
+                compressor = StreamCompressor(encoding)
+                body = compressor.compress(body, final=not more_body)
+                headers['Content-Encoding'] = encoding
+                if 'content-length' in headers:
+                    del headers['content-length']
+                if not more_body:
+                    headers['Content-Length'] = str(len(body))
+                etag = headers.get('etag')
+                if etag and not etag.startswith('W/'):
+                    headers['ETag'] = 'W/' + etag
+                await send(start)
+                await send({'type': 'http.response.body', 'body': body, 'more_body': more_body})
+                return
+
+            if compressor is not None:
+                body = compressor.compress(body, final=not more_body)
+                message = {'type': 'http.response.body', 'body': body, 'more_body': more_body}
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
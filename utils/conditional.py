@@ -0,0 +1,107 @@
+"""
+Этот файл содержит функции для условных HTTP-запросов: формирование заголовков ETag и Last-Modified и проверку
+заголовков If-None-Match и If-Modified-Since, по которым клиенту возвращается ответ 304 Not Modified.
+"""
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Iterable, Optional
+from fastapi import Request, Response
+
+
+def make_etag(*parts: Iterable) -> str:
+    """
+    Формирует слабый ETag по набору значений (например, парам ID и версий туров).
+
+    Параметры:
+        parts (Iterable): Значения, от которых зависит содержимое ответа.
+
+    Возвращает:
+        str: Значение заголовка ETag.
+    """
+    digest = hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+    return f'W/"{digest}"'
+
+
+def http_date(value: datetime) -> str:
+    """
+    Преобразует дату (в UTC) в формат HTTP-даты для заголовка Last-Modified.
+
+    Параметры:
+        value (datetime): Дата и время в UTC.
+
+    Возвращает:
+        str: Дата в формате RFC 7231.
+    """
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """
+    Проверяет, актуальна ли у клиента сохраненная версия ответа.
+
+    Заголовок If-None-Match имеет приоритет: если он передан, If-Modified-Since не учитывается.
+
+    Параметры:
+        request (Request): Объект запроса.
+        etag (str): Текущий ETag ответа.
+        last_modified (datetime | None): Время последнего изменения данных ответа (UTC).
+
+    Возвращает:
+        bool: True, если можно ответить 304 Not Modified.
+    """
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match is not None:
+        candidates = [candidate.strip() for candidate in if_none_match.split(',')]
+        weak_etag = etag.removeprefix('W/')
+        return '*' in candidates or any(candidate.removeprefix('W/') == weak_etag for candidate in candidates)
+
+    if_modified_since = request.headers.get('if-modified-since')
+    if if_modified_since is not None and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+
+def validator_headers(etag: str, last_modified: Optional[datetime]) -> dict:
+    """
+    Возвращает заголовки ETag и Last-Modified для ответа.
+
+    Cache-Control: no-cache разрешает клиенту и CDN хранить ответ, но требует проверять его
+    актуальность условным запросом перед каждым использованием.
+
+    Параметры:
+        etag (str): ETag ответа.
+        last_modified (datetime | None): Время последнего изменения данных ответа (UTC).
+
+    Возвращает:
+        dict: Заголовки ответа.
+    """
+    headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+    if last_modified is not None:
+        headers['Last-Modified'] = http_date(last_modified)
+    return headers
+
+
+def not_modified_response(etag: str, last_modified: Optional[datetime]) -> Response:
+    """
+    Формирует ответ 304 Not Modified без тела.
+
+    Параметры:
+        etag (str): ETag ответа.
+        last_modified (datetime | None): Время последнего изменения данных ответа (UTC).
+
+    Возвращает:
+        Response: Ответ 304.
+    """
+    return Response(status_code=304, headers=validator_headers(etag, last_modified))